@@ -1,26 +1,53 @@
 from django.contrib import admin
+from django.db import transaction
 
 from .models import ( MoneyFlow, Status,
                       Type, Category, Subcategory,)
+from .repositories import MoneyFlowRepository
+from .services import CatalogService
+
+
+class CatalogAdminMixin:
+    """Сброс версий каталога владельцев при правке справочника в админке."""
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            CatalogService().bump_owners_version(obj)
+
+    def delete_model(self, request, obj):
+        service = CatalogService()
+        owner_ids = service.owner_ids(obj)
+        super().delete_model(request, obj)
+        service.bump_versions(owner_ids)
+
+    def delete_queryset(self, request, queryset):
+        service = CatalogService()
+        owner_ids = {
+            user_id for obj in queryset for user_id in service.owner_ids(obj)
+        }
+        super().delete_queryset(request, queryset)
+        service.bump_versions(owner_ids)
+
 
 @admin.register(Status)
-class StatusAdmin(admin.ModelAdmin):
+class StatusAdmin(CatalogAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'name')
     search_fields = ('name',)
 
 @admin.register(Type)
-class TypeAdmin(admin.ModelAdmin):
+class TypeAdmin(CatalogAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'name')
     search_fields = ('name',)
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(CatalogAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'type')
     list_filter = ('type',)
     search_fields = ('name',)
 
 @admin.register(Subcategory)
-class SubcategoryAdmin(admin.ModelAdmin):
+class SubcategoryAdmin(CatalogAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'category')
     list_filter = ('category',)
     search_fields = ('name',)
@@ -30,3 +57,31 @@ class MoneyFlowAdmin(admin.ModelAdmin):
     list_display = ('id', 'created_at', 'type', 'category', 'amount')
     list_filter = ('type', 'category', 'status')
     search_fields = ('comment',)
+
+    # Записи идут мимо репозитория, поэтому агрегаты и версии отчетов
+    # пользователя обновляются здесь так же, как во вьюсете.
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        rollups = MoneyFlowRepository().rollups
+        if change:
+            rollups.subtract([obj.pk])
+        super().save_model(request, obj, form, change)
+        rollups.add([obj.pk])
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        MoneyFlowRepository().rollups.subtract([obj.pk])
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        MoneyFlowRepository().rollups.subtract(
+            list(queryset.values_list('id', flat=True))
+        )
+        super().delete_queryset(request, queryset)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по комментарию через полнотекстовый GIN-индекс."""
+        if not search_term:
+            return queryset, False
+        return MoneyFlowRepository().search(queryset, search_term), False
@@ -0,0 +1,135 @@
+"""Векторные метрики распределения сумм операций на NumPy.
+
+Операции читаются потоком values_list в компактные массивы целых
+чисел: день от начала эпохи, сумма в копейках и ID категории. Дальше
+все метрики считаются операциями над массивами, без циклов по строкам.
+"""
+from datetime import date, timedelta
+from itertools import chain
+from typing import Dict, List, NamedTuple, Sequence
+
+import numpy as np
+from django.db.models.sql.constants import MULTI
+
+from .constants import ANALYTICS_CHUNK_SIZE
+
+EPOCH = date(1970, 1, 1)
+
+
+class FlowArrays(NamedTuple):
+    """Операции пользователя в виде параллельных массивов."""
+    days: np.ndarray
+    cents: np.ndarray
+    categories: np.ndarray
+
+
+def load_flow_arrays(rows, chunk_size: int = ANALYTICS_CHUNK_SIZE) -> FlowArrays:
+    """Чтение строк (день, копейки, категория) пачками в массивы int64.
+
+    Пачки values_list берутся прямо из курсора: построчные конвертеры
+    Django для целых чисел здесь не нужны, а колонки SELECT идут в
+    порядке полей values_list (см. get_distribution_rows).
+    """
+    compiler = rows.query.get_compiler(using=rows.db)
+    chunks = [
+        np.fromiter(
+            chain.from_iterable(chunk), dtype=np.int64, count=len(chunk) * 3
+        ).reshape(-1, 3)
+        for chunk in compiler.execute_sql(
+            MULTI, chunked_fetch=True, chunk_size=chunk_size
+        )
+    ]
+    data = np.concatenate(chunks) if chunks else np.empty((0, 3), np.int64)
+    return FlowArrays(data[:, 0], data[:, 1], data[:, 2])
+
+
+def to_rubles(cents) -> float:
+    return round(float(cents) / 100, 2)
+
+
+def percentiles(cents: np.ndarray, quantiles: Sequence[float]) -> List[float]:
+    return [to_rubles(value) for value in np.percentile(cents, quantiles)]
+
+
+def summary(arrays: FlowArrays, quantiles: Sequence[float]) -> Dict:
+    """Количество, сумма, среднее и перцентили по всем операциям."""
+    count = len(arrays.cents)
+    if not count:
+        return {'count': 0, 'total': 0.0, 'mean': None,
+                **{f'p{q:g}': None for q in quantiles}}
+    return {
+        'count': count,
+        'total': to_rubles(arrays.cents.sum()),
+        'mean': to_rubles(arrays.cents.mean()),
+        **dict(zip((f'p{q:g}' for q in quantiles),
+                   percentiles(arrays.cents, quantiles))),
+    }
+
+
+def grouped_percentiles(arrays: FlowArrays,
+                        quantiles: Sequence[float]) -> List[Dict]:
+    """Перцентили сумм по категориям без цикла по группам.
+
+    Строки сортируются по (категория, сумма); границы групп дают для
+    каждой категории позицию перцентиля, значение интерполируется между
+    соседями так же, как np.percentile (метод linear).
+    """
+    if not len(arrays.cents):
+        return []
+    order = np.lexsort((arrays.cents, arrays.categories))
+    categories = arrays.categories[order]
+    cents = arrays.cents[order].astype(np.float64)
+    starts = np.flatnonzero(np.r_[True, categories[1:] != categories[:-1]])
+    counts = np.diff(np.r_[starts, len(cents)])
+    totals = np.add.reduceat(cents, starts)
+
+    result = {
+        'category_id': categories[starts].tolist(),
+        'count': counts.tolist(),
+        'total': (totals / 100).round(2).tolist(),
+        'mean': (totals / counts / 100).round(2).tolist(),
+    }
+    for q in quantiles:
+        position = starts + (counts - 1) * (q / 100)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        fraction = position - lower
+        values = cents[lower] + (cents[upper] - cents[lower]) * fraction
+        result[f'p{q:g}'] = (values / 100).round(2).tolist()
+    return [dict(zip(result, row)) for row in zip(*result.values())]
+
+
+def histogram(arrays: FlowArrays, bins: int) -> Dict:
+    """Гистограмма сумм с равными интервалами."""
+    if not len(arrays.cents):
+        return {'edges': [], 'counts': []}
+    counts, edges = np.histogram(arrays.cents, bins=bins)
+    return {
+        'edges': (edges / 100).round(2).tolist(),
+        'counts': counts.tolist(),
+    }
+
+
+def rolling_means(arrays: FlowArrays, start_date: date, end_date: date,
+                  windows: Sequence[int]) -> List[Dict]:
+    """Дневные суммы и скользящие средние по календарным дням.
+
+    Дни без операций входят в окно с нулем. В начале периода, пока
+    окно не заполнено, среднее берется по доступным дням.
+    """
+    first = (start_date - EPOCH).days
+    length = (end_date - start_date).days + 1
+    daily = np.bincount(
+        arrays.days - first, weights=arrays.cents, minlength=length
+    )[:length]
+    cumulative = np.r_[0.0, np.cumsum(daily)]
+    index = np.arange(1, length + 1)
+    series = {
+        'date': [start_date + timedelta(days=day) for day in range(length)],
+        'total': (daily / 100).round(2).tolist(),
+    }
+    for window in windows:
+        lower = np.maximum(index - window, 0)
+        means = (cumulative[index] - cumulative[lower]) / (index - lower)
+        series[f'mean_{window}'] = (means / 100).round(2).tolist()
+    return [dict(zip(series, row)) for row in zip(*series.values())]
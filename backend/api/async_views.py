@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import SyncToAsync, sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from rest_framework.permissions import SAFE_METHODS
+
+# В Django 3.2 нет асинхронного ORM, и синхронные вьюхи под ASGI
+# выполняются в одном общем потоке. Чтения уводим в отдельный пул:
+# его размер ограничивает число одновременных соединений с БД.
+read_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_READ_WORKERS,
+    thread_name_prefix='async-read',
+)
+
+
+def database_sync_to_async(func):
+    """Вызов синхронного кода с ORM из корутины в пуле чтения.
+
+    Соединения в потоках пула живут дольше запроса, поэтому, как и
+    обработчик request_finished, закрываем устаревшие до и после вызова.
+    """
+    def call(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return SyncToAsync(call, thread_sensitive=False, executor=read_executor)
+
+
+def async_read_view(view):
+    """Асинхронная обертка над DRF-вьюхой.
+
+    Под ASGI GET и HEAD обрабатываются в пуле чтения параллельно, не
+    занимая цикл событий. Записи, а под WSGI и все запросы, выполняются
+    в потоке запроса, как синхронная вьюха. Ответ рендерится там же,
+    где выполнялась вьюха, - сериализация списка не должна
+    возвращаться в общий поток.
+    """
+    def call(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response = response.render()
+        return response
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if (isinstance(request, ASGIRequest)
+                and request.method in SAFE_METHODS):
+            run = database_sync_to_async(call)
+        else:
+            run = sync_to_async(call)
+        return await run(request, *args, **kwargs)
+
+    return wrapper
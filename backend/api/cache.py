@@ -0,0 +1,196 @@
+import hashlib
+import json
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic, sleep, time
+from typing import Callable, Dict, Optional
+from weakref import WeakValueDictionary
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .constants import (REPORT_CACHE_LOCAL_SIZE, REPORT_CACHE_LOCAL_TIMEOUT,
+                        REPORT_CACHE_LOCK_TIMEOUT, REPORT_CACHE_TIMEOUT)
+from .db_router import pin_reads_to_primary
+from .metrics import cache_requests
+
+MISSING = object()
+
+
+class VersionCounter:
+    """Счетчик версий в общем кэше для инвалидации по ключу.
+
+    Начальное значение - метка времени в миллисекундах, поэтому после
+    вытеснения ключа версия не возвращается к старому значению, под
+    которым в кэше могут лежать устаревшие данные.
+    """
+
+    def __init__(self, key_template: str):
+        self.key_template = key_template
+
+    def key(self, owner) -> str:
+        return self.key_template.format(owner=owner)
+
+    def get(self, owner) -> int:
+        """Текущая версия; после свежей записи чтения идут в основную базу.
+
+        Под версией кэшируются отчеты, справочники и ETag ответов. Пока
+        после увеличения версии не прошло DATABASE_REPLICA_STICKY_SECONDS,
+        реплика может не содержать запись, и данные, прочитанные с нее,
+        закрепились бы под новой версией до следующей записи. Привязка
+        клиента-писателя этого не покрывает: читать может любой клиент.
+        """
+        key = self.key(owner)
+        values = cache.get_many([key, f'{key}:modified'])
+        version = values.get(key)
+        if version is None:
+            cache.add(key, int(time() * 1000), timeout=None)
+            version = cache.get(key, int(time() * 1000))
+        modified = values.get(f'{key}:modified')
+        # modified хранится с точностью до секунды, отсюда запас в секунду.
+        if (modified is not None and time() - modified
+                <= settings.DATABASE_REPLICA_STICKY_SECONDS + 1):
+            pin_reads_to_primary()
+        return version
+
+    def bump(self, owner) -> None:
+        key = self.key(owner)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time() * 1000), timeout=None)
+        cache.set(f'{key}:modified', int(time()), timeout=None)
+
+    def modified(self, owner) -> Optional[int]:
+        """Время последнего увеличения версии (Unix time) или None."""
+        return cache.get(f'{self.key(owner)}:modified')
+
+
+# Версия данных об операциях пользователя; 'all' - для общих отчетов.
+money_flow_versions = VersionCounter('money-flow-version:{owner}')
+GLOBAL_VERSION_OWNER = 'all'
+
+
+def bump_money_flow_versions(user_ids) -> None:
+    """Сброс кэшированных отчетов после записи операций.
+
+    Версия увеличивается сразу и еще раз после фиксации транзакции:
+    отчет, посчитанный конкурентным запросом по незафиксированным
+    данным, не переживет коммит.
+    """
+    owners = {*user_ids, GLOBAL_VERSION_OWNER}
+
+    def bump():
+        for owner in owners:
+            money_flow_versions.bump(owner)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+class ReportCache:
+    """Двухуровневый кэш отчетов: LRU в процессе перед общим кэшем.
+
+    Ключ строится из версии данных пользователя и параметров отчета,
+    поэтому запись операции делает все отчеты пользователя
+    недостижимыми без явного удаления. Одинаковые конкурентные запросы
+    вычисляются один раз: внутри процесса - под блокировкой ключа,
+    между процессами - под блокировкой в общем кэше.
+
+    Возвращаемые значения общие для всех вызовов и не должны изменяться.
+    """
+    poll_interval = 0.05
+
+    def __init__(self, local_size: int = REPORT_CACHE_LOCAL_SIZE,
+                 local_timeout: int = REPORT_CACHE_LOCAL_TIMEOUT,
+                 timeout: int = REPORT_CACHE_TIMEOUT,
+                 lock_timeout: int = REPORT_CACHE_LOCK_TIMEOUT):
+        self.local_size = local_size
+        self.local_timeout = local_timeout
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self._local = OrderedDict()
+        self._local_lock = Lock()
+        # Блокировка на ключ живет, пока ее держит хотя бы один поток:
+        # ожидание чужого вычисления не задерживает другие отчеты.
+        self._locks = WeakValueDictionary()
+
+    def make_key(self, user, name: str, params: Dict) -> str:
+        owner = user.pk if user is not None else GLOBAL_VERSION_OWNER
+        digest = hashlib.md5(
+            json.dumps(params, sort_keys=True, cls=DjangoJSONEncoder).encode()
+        ).hexdigest()
+        return f'report:{owner}:{money_flow_versions.get(owner)}:{name}:{digest}'
+
+    def get_or_compute(self, user, name: str, params: Dict,
+                       compute: Callable):
+        key = self.make_key(user, name, params)
+        value = self._local_get(key)
+        if value is not MISSING:
+            cache_requests.labels('report', 'local').inc()
+            return value
+        with self._key_lock(key):
+            value = self._local_get(key)
+            result = 'local'
+            if value is MISSING:
+                value = cache.get(key, MISSING)
+                result = 'shared'
+            if value is MISSING:
+                value = self._compute_once(key, compute)
+                result = 'miss'
+            self._local_set(key, value)
+        cache_requests.labels('report', result).inc()
+        return value
+
+    def _key_lock(self, key: str) -> Lock:
+        with self._local_lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = Lock()
+            return lock
+
+    def clear_local(self) -> None:
+        with self._local_lock:
+            self._local.clear()
+
+    def _compute_once(self, key: str, compute: Callable):
+        lock_key = f'{key}:lock'
+        deadline = monotonic() + self.lock_timeout
+        acquired = cache.add(lock_key, 1, timeout=self.lock_timeout)
+        while not acquired and monotonic() < deadline:
+            sleep(self.poll_interval)
+            value = cache.get(key, MISSING)
+            if value is not MISSING:
+                return value
+            acquired = cache.add(lock_key, 1, timeout=self.lock_timeout)
+        try:
+            value = compute()
+            cache.set(key, value, timeout=self.timeout)
+            return value
+        finally:
+            if acquired:
+                cache.delete(lock_key)
+
+    def _local_get(self, key: str):
+        with self._local_lock:
+            entry: Optional[tuple] = self._local.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at < monotonic():
+                del self._local[key]
+                return MISSING
+            self._local.move_to_end(key)
+            return value
+
+    def _local_set(self, key: str, value) -> None:
+        with self._local_lock:
+            self._local[key] = (monotonic() + self.local_timeout, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+
+report_cache = ReportCache()
@@ -0,0 +1,75 @@
+"""Условные GET-запросы по версиям данных.
+
+ETag строится из версий в общем кэше (см. api/cache.py), поэтому
+совпадение If-None-Match проверяется до обращения к БД за данными, а
+ответ 304 не содержит тела.
+"""
+from functools import wraps
+from hashlib import sha1
+from typing import Optional
+
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+
+def version_etag(*parts) -> str:
+    """ETag из частей ключа версии, например ('catalog', user_id, version)."""
+    return quote_etag('-'.join(map(str, parts)))
+
+
+def not_modified(request, etag: str, last_modified: Optional[int] = None):
+    """Ответ 304, если копия клиента актуальна, иначе None.
+
+    If-None-Match проверяется раньше If-Modified-Since: по времени с
+    точностью до секунды нельзя отличить записи внутри одной секунды.
+    """
+    request = getattr(request, '_request', request)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag: Optional[str] = None,
+                   last_modified: Optional[int] = None):
+    """ETag, Last-Modified и требование перепроверки копии.
+
+    private - ответ зависит от пользователя и не должен оседать в
+    общих кэшах; no-cache - браузер хранит копию, но каждый раз
+    перепроверяет ее условным запросом.
+    """
+    if etag is not None:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def conditional_get(method):
+    """Декоратор действия вьюсета с проверкой If-None-Match до запросов.
+
+    Валидаторы возвращает метод вьюсета get_validators(request):
+    (etag, last_modified). Они добавляются только к ответам 200.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            set_validators(response, etag, last_modified)
+        return response
+    return wrapper
+
+
+def request_fingerprint(request) -> str:
+    """Короткий хэш пути и параметров: у каждого представления свой ETag."""
+    return sha1(request.get_full_path().encode()).hexdigest()[:16]
@@ -6,3 +6,32 @@ PAGINATION_SIZE = 10
 MAX_PAGINATION = 10
 EXTRA_FIELD = 3
 REGEX = r'^[\w.@+-]+$'
+MAX_KEYSET_PAGINATION = 100
+SEARCH_CONFIG = 'russian'
+CATALOG_CACHE_TIMEOUT = 60 * 60
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_MAX_REPORTED_ERRORS = 1000
+EXPORT_CHUNK_SIZE = 2000
+REPORT_CACHE_TIMEOUT = 5 * 60
+REPORT_CACHE_LOCAL_SIZE = 256
+REPORT_CACHE_LOCAL_TIMEOUT = 30
+REPORT_CACHE_LOCK_TIMEOUT = 10
+PARTITION_MONTHS_AHEAD = 3
+TIME_SERIES_GRANULARITIES = ('day', 'week', 'month')
+TIME_SERIES_DEFAULT_DAYS = 365
+TIME_SERIES_MAX_DAYS = 10 * 366
+MONTHLY_REPORT_MAX_MONTHS = 120
+ANALYTICS_CHUNK_SIZE = 20000
+DISTRIBUTION_QUANTILES = (50, 90, 99)
+DISTRIBUTION_ROLLING_WINDOWS = (7, 30)
+DISTRIBUTION_DEFAULT_BINS = 20
+DISTRIBUTION_MAX_BINS = 200
+TYPE_SIGN_INCOME = 1
+TYPE_SIGN_NEUTRAL = 0
+TYPE_SIGN_EXPENSE = -1
+TYPE_SIGNS = (
+    (TYPE_SIGN_INCOME, 'Доход'),
+    (TYPE_SIGN_NEUTRAL, 'Не влияет на баланс'),
+    (TYPE_SIGN_EXPENSE, 'Расход'),
+)
+BALANCE_PAGE_DAYS = 366
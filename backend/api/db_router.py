@@ -0,0 +1,134 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class ReadRouting:
+    """Состояние маршрутизации чтений в рамках одного запроса."""
+
+    def __init__(self):
+        self.wrote = False
+        # Чтения, результат которых кэшируется под свежей версией.
+        self.primary = False
+        # Одна реплика на запрос: у разных реплик разное отставание.
+        self.replica: Optional[str] = None
+
+
+# Задается ReplicaRoutingMiddleware только для безопасных запросов без
+# недавних записей клиента. Вне запросов (команды, тесты, фоновые
+# задачи) переменная пуста и все идет в основную базу. ContextVar
+# копируется в потоки sync_to_async вместе с запросом.
+read_routing: ContextVar[Optional[ReadRouting]] = ContextVar(
+    'read_routing', default=None
+)
+
+
+@contextmanager
+def replica_reads():
+    """Разрешение читать с реплик внутри блока."""
+    token = read_routing.set(ReadRouting())
+    try:
+        yield
+    finally:
+        read_routing.reset(token)
+
+
+def pin_reads_to_primary() -> None:
+    """Оставшиеся чтения текущего запроса - из основной базы."""
+    routing = read_routing.get()
+    if routing is not None:
+        routing.primary = True
+
+
+class ReplicaHealth:
+    """Доступность реплик с паузой перед повторной проверкой.
+
+    Реплика, к которой не удалось подключиться, исключается из
+    маршрутизации на DATABASE_REPLICA_RETRY_SECONDS; затем следующее
+    чтение снова попробует подключиться. Удачная проверка действует
+    DATABASE_REPLICA_CHECK_SECONDS: в это время запросы не открывают
+    соединение заранее, а подключаются при первом чтении.
+    """
+
+    def __init__(self):
+        self.down_until: Dict[str, float] = {}
+        self.up_until: Dict[str, float] = {}
+
+    def choose(self, aliases) -> Optional[str]:
+        """Случайная доступная реплика; проверяются только кандидаты."""
+        candidates = list(aliases)
+        random.shuffle(candidates)
+        for alias in candidates:
+            if self.is_available(alias):
+                return alias
+        return None
+
+    def is_available(self, alias: str) -> bool:
+        now = time.monotonic()
+        if self.down_until.get(alias, 0) > now:
+            return False
+        if self.up_until.get(alias, 0) > now:
+            return True
+        try:
+            connections[alias].ensure_connection()
+        except Exception:
+            self.mark_down(alias)
+            return False
+        self.down_until.pop(alias, None)
+        self.up_until[alias] = now + settings.DATABASE_REPLICA_CHECK_SECONDS
+        return True
+
+    def mark_down(self, alias: str) -> None:
+        self.up_until.pop(alias, None)
+        self.down_until[alias] = (
+            time.monotonic() + settings.DATABASE_REPLICA_RETRY_SECONDS
+        )
+
+    def reset(self) -> None:
+        self.down_until.clear()
+        self.up_until.clear()
+
+
+replica_health = ReplicaHealth()
+
+
+class PrimaryReplicaRouter:
+    """Чтения безопасных запросов с реплик, все записи - в основную базу.
+
+    В основную базу уходят и чтения внутри транзакции, и чтения после
+    записи в том же запросе: они должны видеть свои изменения, - а также
+    чтения после pin_reads_to_primary (см. VersionCounter.get). Если
+    доступных реплик нет, чтения тоже идут в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = read_routing.get()
+        if (routing is None or routing.wrote or routing.primary
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        if routing.replica is None:
+            routing.replica = (
+                replica_health.choose(settings.DATABASE_REPLICAS)
+                or DEFAULT_DB_ALIAS
+            )
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = read_routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
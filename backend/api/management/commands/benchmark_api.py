@@ -0,0 +1,271 @@
+import json
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import combinations, islice
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api.models import MoneyFlow
+from api.repositories import MoneyFlowRepository, MoneyFlowRollupRepository
+from api.services import MoneyFlowService
+from api.synthetic import MoneyFlowGenerator, ensure_catalog, grant_catalog
+from users.models import User
+
+END_DATE = date(2024, 12, 31)
+PERIOD_DAYS = 3 * 365
+SEED_BATCH_SIZE = 10000
+BULK_CREATE_ROWS = 1000
+SEARCH_TEXT = 'кафе'
+BENCH_PROFILE = 'designer'
+CATALOG_PATHS = ('statuses', 'types', 'categories', 'subcategories',
+                 'my/statuses', 'my/types', 'my/categories',
+                 'my/subcategories')
+
+
+class Command(BaseCommand):
+    help = ('Воспроизводимые замеры API операций на 10k/100k/1M строк: '
+            'страницы списка, комбинации фильтров, статистика, массовое '
+            'создание и справочники. Результаты сохраняются в JSON и '
+            'сравниваются с базовой линией')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000],
+                            help='Объемы данных, например 10000 100000')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Замеров на случай; берется медиана')
+        parser.add_argument('--only', help='Только случаи с подстрокой')
+        parser.add_argument('--save-baseline', metavar='PATH',
+                            help='Записать результаты в JSON')
+        parser.add_argument('--baseline', metavar='PATH',
+                            help='Сравнить с базовой линией из JSON')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Допустимое замедление медианы (0.2 = 20%%)')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                            help='Замедления меньше этого не считаются')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as error:
+                raise CommandError(f'Не удалось прочитать базовую линию: {error}')
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for rows in options['rows']:
+                user, catalog = self.seed(rows, options['seed'])
+                results[str(rows)] = self.run_cases(
+                    user, catalog, options['repeat'], options['only']
+                )
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as file:
+                json.dump({
+                    'meta': {
+                        'seed': options['seed'],
+                        'repeat': options['repeat'],
+                        'created_at': datetime.now().isoformat(
+                            timespec='seconds'
+                        ),
+                    },
+                    'results': results,
+                }, file, ensure_ascii=False, indent=2, sort_keys=True)
+            self.stdout.write(f'Результаты записаны в {options["save_baseline"]}')
+
+        if baseline is not None:
+            self.compare(
+                baseline['results'], results,
+                options['threshold'], options['min_delta_ms']
+            )
+
+    def seed(self, rows, seed):
+        """Пользователь bench<rows> с детерминированными операциями.
+
+        Набор строится генератором generate_money_flows заново, только
+        если число операций изменилось: при том же seed он совпадает
+        строка в строку.
+        """
+        user, _ = User.objects.get_or_create(
+            username=f'bench{rows}',
+            defaults={'email': f'bench{rows}@example.com'}
+        )
+        catalog = ensure_catalog()
+        grant_catalog(catalog, [user.id])
+        if MoneyFlow.objects.filter(user=user).count() != rows:
+            self.stdout.write(f'Генерация {rows} операций...')
+            started = perf_counter()
+            MoneyFlow.objects.filter(user=user).delete()
+            generator = MoneyFlowGenerator(
+                catalog, END_DATE - timedelta(days=PERIOD_DAYS - 1),
+                END_DATE, seed
+            )
+            flows = generator.flows(user.id, 1, rows, BENCH_PROFILE)
+            repository = MoneyFlowRepository()
+            with transaction.atomic():
+                while repository.copy_rows(islice(flows, SEED_BATCH_SIZE)):
+                    pass
+                MoneyFlowRollupRepository().rebuild(user)
+            repository.analyze()
+            self.stdout.write(f'  готово за {perf_counter() - started:.1f} с')
+        return user, {
+            'statuses': list(catalog['statuses'].values()),
+            'subcategories': list(catalog['subcategories'].values()),
+        }
+
+    def run_cases(self, user, catalog, repeat, only):
+        client = APIClient()
+        client.force_authenticate(user)
+        cases = self.build_cases(user, catalog, client)
+        results = {}
+        for name, call in cases.items():
+            if only and only not in name:
+                continue
+            call()
+            timings = []
+            for _ in range(repeat):
+                started = perf_counter()
+                call()
+                timings.append((perf_counter() - started) * 1000)
+            results[name] = {
+                'median_ms': round(median(timings), 3),
+                'min_ms': round(min(timings), 3),
+            }
+            self.stdout.write(
+                f'{user.username:>12}  {name:<60} '
+                f'{results[name]["median_ms"]:10.2f} мс'
+            )
+        return results
+
+    def build_cases(self, user, catalog, client):
+        url = '/api/v1/money-flows/'
+
+        def get(path, params=None):
+            def call():
+                response = client.get(path, params or {})
+                if response.status_code != 200:
+                    raise CommandError(
+                        f'{path} {params}: ответ {response.status_code}'
+                    )
+            return call
+
+        cases = {
+            'list/page-1': get(url, {'limit': 10}),
+            'list/page-100': get(url, {'limit': 10, 'page': 100}),
+            'list/cursor': get(url, {'limit': 10, 'pagination': 'cursor'}),
+        }
+        for params_name, params in self.filter_cases(catalog):
+            cases[f'filter/{params_name}'] = get(url, {'limit': 10, **params})
+
+        service = MoneyFlowService()
+        period_start = END_DATE - timedelta(days=90)
+        cases['statistics/all'] = (
+            lambda: service.build_statistics_report(user)
+        )
+        cases['statistics/90d'] = (
+            lambda: service.build_statistics_report(
+                user, period_start, END_DATE
+            )
+        )
+        cases[f'bulk_create/{BULK_CREATE_ROWS}'] = (
+            lambda: self.bulk_create(service, user, catalog)
+        )
+        for path in CATALOG_PATHS:
+            cases[f'catalog/{path}'] = get(f'/api/v1/{path}/')
+        return cases
+
+    @staticmethod
+    def filter_cases(catalog):
+        """Все сочетания основных фильтров и каждый фильтр по отдельности."""
+        status = catalog['statuses'][0]
+        subcategory = catalog['subcategories'][0]
+        category = subcategory.category
+        categories = sorted({
+            item.category_id for item in catalog['subcategories']
+        })[:2]
+        dimensions = {
+            'period': {
+                'created_at_after': END_DATE - timedelta(days=90),
+                'created_at_before': END_DATE,
+            },
+            'status': {'status': status.name},
+            'type_id': {'type_id': category.type_id},
+            'category_id__in': {
+                'category_id__in': ','.join(map(str, categories))
+            },
+            'subcategory': {'subcategory': subcategory.name},
+            'q': {'q': SEARCH_TEXT},
+        }
+        for size in range(1, len(dimensions) + 1):
+            for names in combinations(dimensions, size):
+                params = {}
+                for name in names:
+                    params.update(dimensions[name])
+                yield '+'.join(names), params
+        singles = {
+            'created_at': END_DATE,
+            'status_id': status.id,
+            'status_id__in': status.id,
+            'type': category.type.name,
+            'type_id__in': category.type_id,
+            'category': category.name,
+            'category_id': category.id,
+            'subcategory_id': subcategory.id,
+            'subcategory_id__in': subcategory.id,
+        }
+        for name, value in singles.items():
+            yield name, {name: value}
+
+    @staticmethod
+    def bulk_create(service, user, catalog):
+        rng = random.Random(0)
+        flows = []
+        for _ in range(BULK_CREATE_ROWS):
+            subcategory = rng.choice(catalog['subcategories'])
+            flows.append({
+                'created_at': END_DATE,
+                'status': catalog['statuses'][0],
+                'type': subcategory.category.type,
+                'category': subcategory.category,
+                'subcategory': subcategory,
+                'amount': Decimal('100.00'),
+            })
+        with transaction.atomic():
+            service.bulk_create_money_flows(flows, user)
+            transaction.set_rollback(True)
+
+    def compare(self, baseline, results, threshold, min_delta_ms):
+        regressions = []
+        self.stdout.write(
+            f'{"объем":>8}  {"случай":<60} {"база, мс":>10} '
+            f'{"сейчас, мс":>11} {"изменение":>10}'
+        )
+        for rows, cases in results.items():
+            for name, result in cases.items():
+                base = baseline.get(rows, {}).get(name)
+                if base is None:
+                    continue
+                before, after = base['median_ms'], result['median_ms']
+                change = after / before - 1 if before else 0
+                self.stdout.write(
+                    f'{rows:>8}  {name:<60} {before:10.2f} '
+                    f'{after:11.2f} {change:+10.0%}'
+                )
+                if change > threshold and after - before > min_delta_ms:
+                    regressions.append(
+                        f'{rows} {name}: {before:.2f} -> {after:.2f} мс '
+                        f'({change:+.0%})'
+                    )
+        if regressions:
+            raise CommandError(
+                f'Замедление больше {threshold:.0%}:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Замедлений нет'))
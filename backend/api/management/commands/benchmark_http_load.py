@@ -0,0 +1,115 @@
+from concurrent.futures import ThreadPoolExecutor
+from statistics import median
+from time import perf_counter
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Нагружает запущенные серверы одинаковыми запросами и '
+            'сравнивает пропускную способность и задержки p50/p99 '
+            '(например, WSGI и ASGI развертывания)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            action='append',
+            required=True,
+            help='Сервер в виде имя=http://host:port, можно несколько раз'
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            help='Путь запроса, можно несколько раз '
+                 '(по умолчанию список операций и статистика)'
+        )
+        parser.add_argument(
+            '--token',
+            required=True,
+            help='Токен пользователя для заголовка Authorization'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[1, 8, 32],
+            help='Число одновременных клиентов'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Число запросов на каждый замер'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Таймаут одного запроса в секундах'
+        )
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, base_url = target.partition('=')
+            if not sep or not base_url.startswith('http'):
+                raise CommandError(
+                    f'Ожидается имя=http://host:port, получено {target}'
+                )
+            targets.append((name, base_url.rstrip('/')))
+        paths = options['path'] or [
+            '/api/v1/money-flows/',
+            '/api/v1/money-flows/statistics/',
+        ]
+        headers = {'Authorization': f'Token {options["token"]}'}
+
+        self.stdout.write(
+            f'{"сервер":<8} {"c":>4} {"rps":>8} {"p50, мс":>9} '
+            f'{"p99, мс":>9} {"ошибки":>7}  путь'
+        )
+        for path in paths:
+            for concurrency in options['concurrency']:
+                for name, base_url in targets:
+                    result = self.measure(
+                        base_url + path, headers, concurrency,
+                        options['requests'], options['timeout']
+                    )
+                    self.stdout.write(
+                        f'{name:<8} {concurrency:>4} {result["rps"]:>8.1f} '
+                        f'{result["p50"]:>9.1f} {result["p99"]:>9.1f} '
+                        f'{result["errors"]:>7}  {path}'
+                    )
+
+    def measure(self, url, headers, concurrency, requests, timeout):
+        """Замер одного сервера: задержки успешных запросов и ошибки."""
+        def fetch(_):
+            started = perf_counter()
+            try:
+                with urlopen(Request(url, headers=headers),
+                             timeout=timeout) as response:
+                    response.read()
+            except (HTTPError, URLError, OSError):
+                return None
+            return perf_counter() - started
+
+        # Прогрев: соединения с БД, кэши и импорт модулей в воркерах
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(fetch, range(concurrency)))
+            started = perf_counter()
+            latencies = list(executor.map(fetch, range(requests)))
+            elapsed = perf_counter() - started
+
+        succeeded = sorted(
+            latency for latency in latencies if latency is not None
+        )
+        if not succeeded:
+            raise CommandError(f'Ни один запрос к {url} не выполнен')
+        p99_index = min(len(succeeded) - 1, int(len(succeeded) * 0.99))
+        return {
+            'rps': len(succeeded) / elapsed,
+            'p50': median(succeeded) * 1000,
+            'p99': succeeded[p99_index] * 1000,
+            'errors': len(latencies) - len(succeeded),
+        }
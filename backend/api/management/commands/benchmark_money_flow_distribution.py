@@ -0,0 +1,152 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import analytics
+from api.constants import (DISTRIBUTION_DEFAULT_BINS, DISTRIBUTION_QUANTILES,
+                           DISTRIBUTION_ROLLING_WINDOWS)
+from api.models import MoneyFlow
+from api.repositories import MoneyFlowRepository
+from users.models import User
+
+
+def percentile(values, q):
+    """Перцентиль отсортированного списка (как np.percentile, linear)."""
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает расчет распределения сумм операций пользователя: '
+            'построчный Python против массивов NumPy')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, required=True,
+                            help='ID пользователя с операциями')
+        parser.add_argument('--start-date', type=date.fromisoformat,
+                            default=date(1970, 1, 1))
+        parser.add_argument('--end-date', type=date.fromisoformat,
+                            default=date.today())
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Число повторов; берется лучший результат')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(pk=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {options["user"]} не найден')
+        start_date, end_date = options['start_date'], options['end_date']
+        first_day = MoneyFlow.objects.filter(user=user).order_by(
+            'created_at'
+        ).values_list('created_at', flat=True).first()
+        if first_day is None:
+            raise CommandError('У пользователя нет операций')
+        start_date = max(start_date, first_day)
+
+        python_time, python_result = self.measure(
+            lambda: self.per_row_python(user, start_date, end_date),
+            options['repeat']
+        )
+        numpy_time, numpy_result = self.measure(
+            lambda: self.vectorized(user, start_date, end_date),
+            options['repeat']
+        )
+        if python_result != numpy_result:
+            raise CommandError(
+                f'Результаты различаются: {python_result} != {numpy_result}'
+            )
+        self.stdout.write(
+            f'{python_result["count"]} строк, {start_date} - {end_date}: '
+            f'Python {python_time:.2f} с, NumPy {numpy_time:.2f} с, '
+            f'ускорение x{python_time / numpy_time:.1f}'
+        )
+
+    @staticmethod
+    def measure(func, repeat):
+        best, result = None, None
+        for _ in range(repeat):
+            started = perf_counter()
+            result = func()
+            elapsed = perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    @staticmethod
+    def fingerprint(count, overall, by_category, histogram, rolling):
+        """Сводка результатов для сверки двух реализаций."""
+        return {
+            'count': count,
+            'overall': [round(value, 2) for value in overall],
+            'by_category': {
+                category: [round(value, 2) for value in values]
+                for category, values in by_category.items()
+            },
+            'histogram': histogram,
+            'rolling_last': [round(value, 2) for value in rolling],
+        }
+
+    def per_row_python(self, user, start_date, end_date):
+        rows = MoneyFlow.objects.filter(
+            user=user, created_at__range=(start_date, end_date)
+        ).values_list('created_at', 'amount', 'category_id')
+        amounts, by_category, daily = [], defaultdict(list), defaultdict(float)
+        for created_at, amount, category_id in rows.iterator(chunk_size=20000):
+            amounts.append(float(amount))
+            by_category[category_id].append(float(amount))
+            daily[created_at] += float(amount)
+
+        amounts.sort()
+        overall = [percentile(amounts, q) for q in DISTRIBUTION_QUANTILES]
+        categories = {}
+        for category_id, values in by_category.items():
+            values.sort()
+            categories[category_id] = [
+                percentile(values, q) for q in DISTRIBUTION_QUANTILES
+            ]
+
+        low, high = amounts[0], amounts[-1]
+        width = (high - low) / DISTRIBUTION_DEFAULT_BINS or 1
+        histogram = [0] * DISTRIBUTION_DEFAULT_BINS
+        for amount in amounts:
+            index = min(int((amount - low) / width),
+                        DISTRIBUTION_DEFAULT_BINS - 1)
+            histogram[index] += 1
+
+        days = (end_date - start_date).days + 1
+        totals = [daily.get(start_date + timedelta(days=day), 0.0)
+                  for day in range(days)]
+        rolling = []
+        for window in DISTRIBUTION_ROLLING_WINDOWS:
+            window_days = totals[max(days - window, 0):]
+            rolling.append(sum(window_days) / len(window_days))
+        return self.fingerprint(
+            len(amounts), overall, categories, histogram, rolling
+        )
+
+    def vectorized(self, user, start_date, end_date):
+        arrays = analytics.load_flow_arrays(
+            MoneyFlowRepository().get_distribution_rows(
+                user, start_date, end_date
+            )
+        )
+        summary = analytics.summary(arrays, DISTRIBUTION_QUANTILES)
+        keys = [f'p{q:g}' for q in DISTRIBUTION_QUANTILES]
+        categories = {
+            row['category_id']: [row[key] for key in keys]
+            for row in analytics.grouped_percentiles(
+                arrays, DISTRIBUTION_QUANTILES
+            )
+        }
+        histogram = analytics.histogram(arrays, DISTRIBUTION_DEFAULT_BINS)
+        rolling = analytics.rolling_means(
+            arrays, start_date, end_date, DISTRIBUTION_ROLLING_WINDOWS
+        )[-1]
+        return self.fingerprint(
+            summary['count'], [summary[key] for key in keys], categories,
+            histogram['counts'],
+            [rolling[f'mean_{window}'] for window in DISTRIBUTION_ROLLING_WINDOWS]
+        )
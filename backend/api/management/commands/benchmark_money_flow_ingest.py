@@ -0,0 +1,96 @@
+from datetime import date, timedelta
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from api.services import MoneyFlowService
+from api.synthetic import MoneyFlowGenerator, ensure_catalog, grant_catalog
+from users.models import User
+
+END_DATE = date(2024, 12, 31)
+PERIOD_DAYS = 3 * 365
+PROFILE = 'designer'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает массовое создание операций через bulk_create и '
+            'через COPY во временную таблицу. Данные каждого замера '
+            'откатываются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+',
+                            default=[10000, 100000],
+                            help='Размеры пакета, например 10000 100000 '
+                                 '1000000. bulk_create на 1M строк - один '
+                                 'INSERT с 9M параметров, серверу нужно '
+                                 'несколько ГБ памяти')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Число повторов; берется лучший результат')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        catalog = ensure_catalog()
+        user, _ = User.objects.get_or_create(
+            username='ingest_bench',
+            defaults={'email': 'ingest_bench@example.com'}
+        )
+        grant_catalog(catalog, [user.id])
+        generator = MoneyFlowGenerator(
+            catalog, END_DATE - timedelta(days=PERIOD_DAYS - 1), END_DATE,
+            options['seed']
+        )
+        statuses = {item.id: item for item in catalog['statuses'].values()}
+        subcategories = {
+            item.id: item for item in catalog['subcategories'].values()
+        }
+
+        for rows in options['rows']:
+            flows = [
+                (created_at, statuses[status_id], subcategories[subcategory_id],
+                 amount, comment)
+                for _, created_at, status_id, _, _, subcategory_id, amount,
+                comment in generator.flows(user.id, 1, rows, PROFILE)
+            ]
+            # Порог 0 - всегда COPY, порог больше пакета - всегда bulk_create.
+            bulk_time = self.measure(flows, user, rows + 1, options['repeat'])
+            copy_time = self.measure(flows, user, 0, options['repeat'])
+            self.stdout.write(
+                f'{rows} строк: bulk_create {bulk_time:.2f} с '
+                f'({rows / bulk_time:,.0f} строк/с), COPY {copy_time:.2f} с '
+                f'({rows / copy_time:,.0f} строк/с), '
+                f'ускорение x{bulk_time / copy_time:.1f}'
+            )
+
+    @staticmethod
+    def measure(flows, user, threshold, repeat):
+        service = MoneyFlowService()
+        best = None
+        for _ in range(repeat):
+            flows_data = [
+                {
+                    'created_at': created_at,
+                    'status': status,
+                    'type': subcategory.category.type,
+                    'category': subcategory.category,
+                    'subcategory': subcategory,
+                    'amount': amount,
+                    'comment': comment,
+                }
+                for created_at, status, subcategory, amount, comment in flows
+            ]
+            with override_settings(MONEY_FLOW_COPY_THRESHOLD=threshold):
+                with transaction.atomic():
+                    started = perf_counter()
+                    created = service.bulk_create_money_flows(
+                        flows_data, user
+                    )
+                    elapsed = perf_counter() - started
+                    transaction.set_rollback(True)
+            if len(created) != len(flows):
+                raise CommandError(
+                    f'Создано {len(created)} операций из {len(flows)}'
+                )
+            best = elapsed if best is None else min(best, elapsed)
+        return best
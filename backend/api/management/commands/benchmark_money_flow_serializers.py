@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.models import MoneyFlow, Status, Type, Category, Subcategory
+from api.serializers import MoneyFlowListSerializer, MoneyFlowSerializer
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает стоимость сериализации списка операций: '
+            'MoneyFlowSerializer против MoneyFlowListSerializer')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[1000, 10000],
+            help='Размеры списков для замера'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Число повторов; берется лучший результат'
+        )
+
+    def handle(self, *args, **options):
+        # Данные строятся в памяти: замеряется только сериализация.
+        request = APIRequestFactory().get('/api/v1/money-flows/')
+        request.user = User(id=1, username='benchmark')
+        context = {'request': request}
+        renderer = JSONRenderer()
+
+        for rows in options['rows']:
+            instances, projection = self.build_rows(rows)
+            before, before_json = self.measure(
+                lambda: MoneyFlowSerializer(
+                    instances, many=True, context=context
+                ).data,
+                renderer, options['repeat']
+            )
+            after, after_json = self.measure(
+                lambda: MoneyFlowListSerializer(
+                    projection, many=True, context=context
+                ).data,
+                renderer, options['repeat']
+            )
+            if before_json != after_json:
+                raise CommandError(f'JSON различается на {rows} строках')
+            self.stdout.write(
+                f'{rows} строк: до {before / rows * 1e6:.1f} мкс/строка, '
+                f'после {after / rows * 1e6:.1f} мкс/строка, '
+                f'ускорение x{before / after:.1f}'
+            )
+
+    @staticmethod
+    def measure(serialize, renderer, repeat):
+        best, content = None, None
+        for _ in range(repeat):
+            started = perf_counter()
+            content = renderer.render(serialize())
+            elapsed = perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, content
+
+    @staticmethod
+    def build_rows(rows):
+        type_obj = Type(id=1, name='Расход')
+        category = Category(id=1, name='Питание', type=type_obj)
+        subcategory = Subcategory(id=1, name='Продукты', category=category)
+        status = Status(id=1, name='Бизнес', description='')
+        first_day = date(2024, 1, 1)
+
+        instances, projection = [], []
+        for number in range(rows):
+            flow = MoneyFlow(
+                id=number + 1,
+                created_at=first_day + timedelta(days=number % 365),
+                status=status,
+                type=type_obj,
+                category=category,
+                subcategory=subcategory,
+                amount=Decimal(number % 1000) + Decimal('0.50'),
+                comment=f'Операция {number}'
+            )
+            instances.append(flow)
+            projection.append({
+                'id': flow.id,
+                'created_at': flow.created_at,
+                'status_id': status.id,
+                'status__name': status.name,
+                'status__description': status.description,
+                'type_id': type_obj.id,
+                'type__name': type_obj.name,
+                'type__sign': type_obj.sign,
+                'category_id': category.id,
+                'category__name': category.name,
+                'category__type_id': type_obj.id,
+                'category__type__name': type_obj.name,
+                'subcategory_id': subcategory.id,
+                'subcategory__name': subcategory.name,
+                'subcategory__category_id': category.id,
+                'subcategory__category__name': category.name,
+                'amount': flow.amount,
+                'comment': flow.comment,
+            })
+        return instances, projection
@@ -0,0 +1,126 @@
+import gzip
+from collections import OrderedDict
+from datetime import date, timedelta
+from io import BytesIO
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.middleware import BROTLI_QUALITY, brotli
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from api.repositories import MoneyFlowRepository
+from api.serializers import MoneyFlowSerializer
+from api.synthetic import MoneyFlowGenerator, ensure_catalog
+from users.models import User
+
+END_DATE = date(2024, 12, 31)
+PERIOD_DAYS = 365
+PROFILE = 'manager'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает JSONRenderer/JSONParser с FastJSONRenderer/'
+            'FastJSONParser и сжатие gzip и brotli на странице '
+            'MoneyFlowSerializer. Операции создаются в транзакции и '
+            'откатываются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000,
+                            help='Строк на странице')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Замеров на случай; берется медиана')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson не установлен: FastJSONRenderer работает как '
+                'JSONRenderer'
+            ))
+        self.repeat = options['repeat']
+        with transaction.atomic():
+            page = self.build_page(options['rows'], options['seed'])
+            transaction.set_rollback(True)
+
+        std = self.measure('render/JSONRenderer',
+                           lambda: JSONRenderer().render(page))
+        fast = self.measure('render/FastJSONRenderer',
+                            lambda: FastJSONRenderer().render(page))
+        body = FastJSONRenderer().render(page)
+        if body != JSONRenderer().render(page):
+            raise CommandError('FastJSONRenderer выдал другой JSON')
+        self.report_speedup(std, fast)
+
+        std = self.measure('parse/JSONParser',
+                           lambda: JSONParser().parse(BytesIO(body)))
+        fast = self.measure('parse/FastJSONParser',
+                            lambda: FastJSONParser().parse(BytesIO(body)))
+        if FastJSONParser().parse(BytesIO(body)) != page:
+            raise CommandError('FastJSONParser прочитал другие данные')
+        self.report_speedup(std, fast)
+
+        self.stdout.write(f'{"без сжатия":<28} {len(body):>10} байт')
+        compressors = {
+            # Уровень 6, как у CompressionMiddleware (django compress_string).
+            'gzip': lambda: gzip.compress(body, compresslevel=6, mtime=0),
+        }
+        if brotli is not None:
+            compressors[f'br (quality {BROTLI_QUALITY})'] = (
+                lambda: brotli.compress(body, quality=BROTLI_QUALITY)
+            )
+        else:
+            self.stdout.write('brotli не установлен, замер пропущен')
+        for name, compress in compressors.items():
+            elapsed = self.measure(f'compress/{name}', compress)
+            size = len(compress())
+            self.stdout.write(
+                f'{"":<28} {size:>10} байт, {size / len(body):.1%} '
+                f'исходного, {len(body) / elapsed / 1e6:.0f} МБ/с'
+            )
+
+    def build_page(self, rows, seed):
+        """Страница из rows операций в формате ответа списка."""
+        catalog = ensure_catalog()
+        user, _ = User.objects.get_or_create(
+            username='render_bench',
+            defaults={'email': 'render_bench@example.com'}
+        )
+        generator = MoneyFlowGenerator(
+            catalog, END_DATE - timedelta(days=PERIOD_DAYS - 1), END_DATE,
+            seed
+        )
+        repository = MoneyFlowRepository()
+        repository.copy_rows(generator.flows(user.id, 1, rows, PROFILE))
+        flows = repository.get_by_user(user).order_by('-created_at', '-id')
+        started = perf_counter()
+        results = MoneyFlowSerializer(flows, many=True).data
+        self.stdout.write(
+            f'{"serialize/MoneyFlowSerializer":<28} '
+            f'{(perf_counter() - started) * 1000:10.2f} мс, {rows} строк'
+        )
+        return OrderedDict((
+            ('count', rows),
+            ('next', None),
+            ('previous', None),
+            ('results', results),
+        ))
+
+    def measure(self, name, call):
+        """Медиана времени вызова в секундах."""
+        call()
+        timings = []
+        for _ in range(self.repeat):
+            started = perf_counter()
+            call()
+            timings.append(perf_counter() - started)
+        elapsed = median(timings)
+        self.stdout.write(f'{name:<28} {elapsed * 1000:10.2f} мс')
+        return elapsed
+
+    def report_speedup(self, before, after):
+        self.stdout.write(f'{"":<28} ускорение x{before / after:.1f}')
@@ -0,0 +1,146 @@
+from datetime import date, timedelta
+from itertools import islice
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import MoneyFlow
+from api.repositories import MoneyFlowRepository, MoneyFlowRollupRepository
+from api.synthetic import (PROFILE_NAMES, MoneyFlowGenerator, ensure_catalog,
+                           grant_catalog)
+from users.models import User
+
+USER_CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Генерирует N пользователей и M операций на каждого по '
+            'шаблонам частоты с фиксированным seed. Строки пишутся '
+            'порциями через COPY или bulk_create, память не зависит от '
+            'объема набора')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=4,
+                            help='Число пользователей')
+        parser.add_argument('--flows', type=int, default=1000,
+                            help='Операций на пользователя')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--end-date', type=date.fromisoformat,
+                            default=date.today(),
+                            help='Последний день периода, ГГГГ-ММ-ДД')
+        parser.add_argument('--days', type=int, default=3 * 365,
+                            help='Длина периода в днях')
+        parser.add_argument('--prefix', default='synthetic',
+                            help='Префикс имен пользователей')
+        parser.add_argument('--password', default='testpass123',
+                            help='Пароль всех созданных пользователей')
+        parser.add_argument('--batch-size', type=int, default=50000,
+                            help='Строк в одной порции записи')
+        parser.add_argument('--method', choices=('copy', 'bulk'),
+                            default='copy',
+                            help='Способ записи: COPY или bulk_create')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь')
+        if options['flows'] < 0:
+            raise CommandError('--flows не может быть отрицательным')
+        if options['batch_size'] < 1 or options['days'] < 1:
+            raise CommandError('Размер порции и период должны быть больше 0')
+        end_date = options['end_date']
+        catalog = ensure_catalog()
+        self.generator = MoneyFlowGenerator(
+            catalog, end_date - timedelta(days=options['days'] - 1),
+            end_date, options['seed']
+        )
+        self.repository = MoneyFlowRepository()
+        self.rollups = MoneyFlowRollupRepository()
+        password = make_password(options['password'])
+
+        started = perf_counter()
+        total = skipped = 0
+        for first in range(1, options['users'] + 1, USER_CHUNK_SIZE):
+            numbers = range(
+                first, min(first + USER_CHUNK_SIZE, options['users'] + 1)
+            )
+            users = self.ensure_users(options['prefix'], numbers, password)
+            grant_catalog(catalog, [user.id for user in users.values()])
+            filled = set(
+                MoneyFlow.objects.filter(user__in=users.values())
+                .values_list('user_id', flat=True).distinct()
+            )
+            for number, user in users.items():
+                if user.id in filled:
+                    skipped += 1
+                    continue
+                total += self.generate(user, number, options)
+            elapsed = perf_counter() - started
+            self.stdout.write(
+                f'Пользователи до {numbers[-1]}: строк {total}, '
+                f'{total / elapsed:,.0f} строк/с'
+            )
+
+        if total:
+            self.repository.analyze()
+        elapsed = perf_counter() - started
+        if skipped:
+            self.stdout.write(
+                f'Пропущено пользователей с операциями: {skipped}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано операций: {total} за {elapsed:.1f} с '
+            f'({total / elapsed if elapsed else total:,.0f} строк/с)'
+        ))
+
+    @staticmethod
+    def ensure_users(prefix, numbers, password):
+        """Пользователи с номерами numbers; недостающие создаются."""
+        names = {f'{prefix}{number}': number for number in numbers}
+        existing = set(
+            User.objects.filter(username__in=names)
+            .values_list('username', flat=True)
+        )
+        User.objects.bulk_create([
+            User(
+                username=username,
+                email=f'{username}@example.com',
+                first_name=PROFILE_NAMES[(number - 1) % len(PROFILE_NAMES)],
+                last_name=str(number),
+                password=password,
+            )
+            for username, number in names.items()
+            if username not in existing
+        ])
+        return {
+            names[user.username]: user
+            for user in User.objects.filter(username__in=names)
+        }
+
+    def generate(self, user, number, options):
+        """Операции и агрегаты пользователя одной транзакцией.
+
+        Прерванная генерация не оставляет пользователя с частью данных,
+        и повторный запуск продолжит с него.
+        """
+        profile = PROFILE_NAMES[(number - 1) % len(PROFILE_NAMES)]
+        rows = self.generator.flows(
+            user.id, number, options['flows'], profile
+        )
+        columns = MoneyFlowRepository.COPY_COLUMNS
+        written = 0
+        with transaction.atomic():
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                if options['method'] == 'copy':
+                    self.repository.copy_rows(batch)
+                else:
+                    MoneyFlow.objects.bulk_create(
+                        [MoneyFlow(**dict(zip(columns, row))) for row in batch]
+                    )
+                written += len(batch)
+            self.rollups.rebuild(user)
+        return written
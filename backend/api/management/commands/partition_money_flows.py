@@ -0,0 +1,66 @@
+from datetime import date
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from api.constants import PARTITION_MONTHS_AHEAD
+from api.repositories import MoneyFlowPartitionRepository
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class Command(BaseCommand):
+    help = ('Создает месячные секции таблицы операций заранее и '
+            'переносит в них строки из секции по умолчанию')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=PARTITION_MONTHS_AHEAD,
+            help='Сколько месяцев после текущего подготовить заранее'
+        )
+        parser.add_argument(
+            '--migrate',
+            action='store_true',
+            help='Перенести существующие строки из секции по умолчанию'
+        )
+        parser.add_argument(
+            '--max-months',
+            type=int,
+            help='Перенести не больше указанного числа месяцев за запуск'
+        )
+
+    def handle(self, *args, **options):
+        repository = MoneyFlowPartitionRepository()
+        current = date.today().replace(day=1)
+        months = [
+            add_months(current, offset)
+            for offset in range(options['months_ahead'] + 1)
+        ]
+        if options['migrate']:
+            # Каждый месяц - отдельная транзакция: блокировки держатся
+            # только на время переноса одного месяца.
+            pending = repository.get_default_months()
+            if options['max_months'] is not None:
+                pending = pending[:options['max_months']]
+            months = pending + [month for month in months if month not in pending]
+
+        existing = set(repository.get_partitions())
+        for month in months:
+            if repository.partition_name(month) in existing:
+                continue
+            started = perf_counter()
+            moved = repository.create_partition(month)
+            self.stdout.write(
+                f'{repository.partition_name(month)}: перенесено строк '
+                f'{moved} за {perf_counter() - started:.2f} с'
+            )
+        self.stdout.write(
+            f'Секций: {len(repository.get_partitions())}, '
+            f'в секции по умолчанию осталось месяцев: '
+            f'{len(repository.get_default_months())}'
+        )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.repositories import MoneyFlowRollupRepository
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает дневные агрегаты денежных операций с нуля'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='ID пользователя, для которого нужно пересчитать агрегаты'
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user'] is not None:
+            try:
+                user = User.objects.get(pk=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {options["user"]} не найден')
+
+        rows = MoneyFlowRollupRepository().rebuild(user=user)
+        self.stdout.write(f'Агрегаты пересчитаны, строк: {rows}')
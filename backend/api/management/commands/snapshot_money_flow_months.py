@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services import AnalyticsService
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Считает снимки месячных отчетов за закрытые месяцы, '
+            'для которых их еще нет')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='ID пользователя, для которого нужно посчитать снимки'
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user'] is not None:
+            try:
+                user = User.objects.get(pk=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {options["user"]} не найден')
+
+        created = AnalyticsService().snapshot_closed_months(user=user)
+        self.stdout.write(f'Снимков посчитано: {created}')
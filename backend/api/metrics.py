@@ -0,0 +1,81 @@
+"""Метрики Prometheus и эндпоинт /metrics.
+
+Под gunicorn у каждого воркера свои счетчики. Если задан
+PROMETHEUS_MULTIPROC_DIR (см. gunicorn_asgi.conf.py), значения пишутся
+в mmap-файлы каталога, и /metrics любого воркера суммирует все
+процессы. Без переменной используется обычный реестр процесса.
+"""
+import os
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+VIEW_LABELS = ('view', 'action', 'method')
+
+request_latency = Histogram(
+    'http_request_duration_seconds',
+    'Время обработки HTTP-запроса по вьюсету и действию',
+    VIEW_LABELS,
+    buckets=LATENCY_BUCKETS,
+)
+responses = Counter(
+    'http_responses_total',
+    'Ответы по вьюсету, действию и коду статуса',
+    VIEW_LABELS + ('status',),
+)
+requests_in_progress = Gauge(
+    'http_requests_in_progress',
+    'Запросы, обрабатываемые в данный момент',
+    multiprocess_mode='livesum',
+)
+db_queries = Counter(
+    'db_queries_total',
+    'SQL-запросы, выполненные при обработке HTTP-запросов',
+    VIEW_LABELS,
+)
+db_query_duration = Counter(
+    'db_query_duration_seconds_total',
+    'Время SQL-запросов при обработке HTTP-запросов',
+    VIEW_LABELS,
+)
+cache_requests = Counter(
+    'cache_requests_total',
+    'Обращения к кэшам отчетов и справочников: local, shared или miss',
+    ('cache', 'result'),
+)
+
+
+def view_labels(request):
+    """Вьюсет, действие и метод запроса для меток метрик.
+
+    Для маршрутов роутера DRF - basename и действие вьюсета
+    (list, retrieve, statistics...), для прочих - имя URL.
+    """
+    method = request.method
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched', '', method
+    initkwargs = getattr(match.func, 'initkwargs', {})
+    actions = getattr(match.func, 'actions', None)
+    if 'basename' in initkwargs and actions:
+        action = actions.get(method.lower())
+        if action is None and method == 'HEAD':
+            action = actions.get('get')
+        return initkwargs['basename'], action or method.lower(), method
+    return match.url_name or match.view_name, '', method
+
+
+def metrics_view(request):
+    """Метрики всех воркеров в текстовом формате Prometheus."""
+    registry = REGISTRY
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,407 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from hashlib import sha1
+from time import perf_counter
+from typing import Callable, Optional
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+from rest_framework.permissions import SAFE_METHODS
+
+from . import metrics
+from .db_router import ReadRouting, read_routing
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+METRICS_PATH = '/metrics'
+
+# Уровень 5 сжимает JSON почти как 11, но на порядок быстрее: ответы
+# сжимаются на каждый запрос, а не один раз при сборке статики.
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MEDIA_TYPES = ('application/json', 'application/x-ndjson',
+                            'application/javascript', 'application/xml')
+
+
+class QueryStats:
+    """Число SQL-запросов и время в БД за один HTTP-запрос."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# Как и read_routing, копируется в потоки пула асинхронных чтений.
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    'query_stats', default=None
+)
+
+
+def record_query(execute, sql, params, many, context):
+    """Обертка выполнения SQL, считающая запросы текущего HTTP-запроса."""
+    stats = query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.duration += perf_counter() - start
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_query_recorders():
+    """Подсчет запросов на текущих и всех будущих соединениях."""
+    connection_created.connect(install_query_recorder)
+    for connection in connections.all():
+        install_query_recorder(connection)
+
+
+@contextmanager
+def track_queries():
+    """Статистика запросов блока; вложенные блоки делят ее с внешним."""
+    stats = query_stats.get()
+    if stats is not None:
+        yield stats
+        return
+    stats = QueryStats()
+    token = query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        query_stats.reset(token)
+
+
+class ContextStream:
+    """Итератор тела потокового ответа в контексте запроса.
+
+    Тело StreamingHttpResponse сервер читает после выхода из middleware,
+    когда read_routing и query_stats уже сброшены. Каждая порция
+    генерируется в копии контекста, снятой при создании, а on_close
+    вызывается один раз при закрытии ответа: после полного чтения или
+    обрыва соединения.
+    """
+
+    def __init__(self, chunks, on_close: Optional[Callable] = None):
+        self.context = copy_context()
+        self.chunks = iter(chunks)
+        self.on_close = on_close
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.context.run(next, self.chunks)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            close = getattr(self.chunks, 'close', None)
+            if close is not None:
+                self.context.run(close)
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+
+
+def stream_in_context(response, on_close: Optional[Callable] = None):
+    """Переводит тело потокового ответа на ContextStream.
+
+    StreamingHttpResponse регистрирует close() итератора, поэтому
+    on_close сработает при закрытии ответа сервером.
+    """
+    response.streaming_content = ContextStream(
+        response.streaming_content, on_close
+    )
+    return response
+
+
+class HybridMiddleware:
+    """Middleware, работающее и в синхронной, и в асинхронной цепочке.
+
+    Django 3.2 переводит всю цепочку в синхронный режим, если хоть одно
+    middleware не умеет async: под ASGI запросы воркера тогда идут по
+    одному. Логика подкласса пишется один раз генератором
+    handle(request): код до yield выполняется перед обработкой запроса,
+    yield возвращает ответ (или бросает исключение обработчика), а
+    return отдает итоговый ответ. Здесь генератор проводится через
+    обычный или асинхронный вызов get_response.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        handler = self.handle(request)
+        next(handler)
+        try:
+            response = self.get_response(request)
+        except BaseException as error:
+            return self.finish(handler.throw, error)
+        return self.finish(handler.send, response)
+
+    async def __acall__(self, request):
+        handler = self.handle(request)
+        next(handler)
+        try:
+            response = await self.get_response(request)
+        except BaseException as error:
+            return self.finish(handler.throw, error)
+        return self.finish(handler.send, response)
+
+    def handle(self, request):
+        return (yield)
+
+    @staticmethod
+    def finish(step, value):
+        try:
+            step(value)
+        except StopIteration as stop:
+            return stop.value
+        raise RuntimeError('handle() должен передавать запрос дальше ровно '
+                           'один раз')
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """Метрики Prometheus по каждому запросу (см. api/metrics.py).
+
+    Время, код ответа, число и время SQL-запросов записываются с
+    метками вьюсета и действия. Запросы к самому /metrics не
+    учитываются.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        install_query_recorders()
+
+    def handle(self, request):
+        if request.path == METRICS_PATH:
+            return (yield)
+        start = perf_counter()
+        metrics.requests_in_progress.inc()
+        try:
+            with track_queries() as stats:
+                response = yield
+                if response.streaming:
+                    # Запрос закончится, когда поток будет прочитан:
+                    # время и запросы выгрузки учитываются целиком.
+                    return stream_in_context(response, lambda: self.record(
+                        request, response, stats, start
+                    ))
+        except BaseException:
+            metrics.requests_in_progress.dec()
+            raise
+        self.record(request, response, stats, start)
+        return response
+
+    @staticmethod
+    def record(request, response, stats, start):
+        metrics.requests_in_progress.dec()
+        labels = metrics.view_labels(request)
+        metrics.request_latency.labels(*labels).observe(
+            perf_counter() - start
+        )
+        metrics.responses.labels(*labels, str(response.status_code)).inc()
+        if stats.count:
+            metrics.db_queries.labels(*labels).inc(stats.count)
+            metrics.db_query_duration.labels(*labels).inc(stats.duration)
+
+
+class QueryStatsMiddleware(HybridMiddleware):
+    """Заголовки с числом SQL-запросов и временем в БД (только DEBUG).
+
+    X-DB-Query-Count, X-DB-Query-Time (мс) и Server-Timing помогают
+    заметить N+1 прямо в инструментах разработчика браузера. Считаются
+    запросы ко всем базам, в том числе из потоков пула чтений.
+
+    У потоковых ответов заголовки уходят до чтения тела, и запросы
+    выгрузки в них не попали бы, поэтому такие ответы остаются без
+    заголовков; их запросы учитывает MetricsMiddleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        install_query_recorders()
+
+    def handle(self, request):
+        with track_queries() as stats:
+            response = yield
+        if response.streaming:
+            return response
+        duration = stats.duration * 1000
+        response['X-DB-Query-Count'] = str(stats.count)
+        response['X-DB-Query-Time'] = f'{duration:.2f}'
+        response['Server-Timing'] = (
+            f'db;dur={duration:.2f};desc="{stats.count} SQL"'
+        )
+        return response
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """Чтения безопасных запросов с реплик с привязкой после записи.
+
+    После запроса с записью клиент на DATABASE_REPLICA_STICKY_SECONDS
+    привязывается к основной базе, чтобы не увидеть устаревшие данные
+    реплики. Клиент определяется по заголовку Authorization или
+    сессионной cookie: пользователя DRF аутентифицирует уже во вьюхе,
+    а решение о маршрутизации нужно до первого запроса к БД.
+    """
+
+    def handle(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return (yield)
+        pin_key = self.get_pin_key(request)
+        if request.method not in SAFE_METHODS:
+            try:
+                return (yield)
+            finally:
+                if pin_key:
+                    cache.set(
+                        pin_key, True,
+                        settings.DATABASE_REPLICA_STICKY_SECONDS
+                    )
+        if pin_key and cache.get(pin_key):
+            return (yield)
+        token = read_routing.set(ReadRouting())
+        try:
+            response = yield
+            if response.streaming:
+                # Выгрузка читает данные уже после возврата ответа.
+                stream_in_context(response)
+            return response
+        finally:
+            read_routing.reset(token)
+
+    @staticmethod
+    def get_pin_key(request):
+        identity = (request.META.get('HTTP_AUTHORIZATION')
+                    or request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        if not identity:
+            return None
+        return f'db-primary-pin:{sha1(identity.encode()).hexdigest()}'
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """Веса кодировок из Accept-Encoding: {'gzip': 1.0, 'br': 0.5}."""
+    weights = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def brotli_sequence(sequence):
+    """Потоковое сжатие brotli, как compress_sequence для gzip."""
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(HybridMiddleware):
+    """Сжатие ответов brotli или gzip по Accept-Encoding клиента.
+
+    Сжимаются текстовые ответы от COMPRESSION_MIN_SIZE байт и потоковые
+    выгрузки; при равных весах предпочитается brotli, если установлен
+    пакет brotli. Сильный ETag становится слабым, как в GZipMiddleware:
+    условные GET сравнивают ETag без учета W/, и 304 по-прежнему
+    работает.
+    """
+
+    def __init__(self, get_response):
+        if not settings.COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def handle(self, request):
+        response = yield
+        if not self.is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            compress = brotli_sequence if encoding == 'br' else compress_sequence
+            response.streaming_content = compress(response.streaming_content)
+            del response['Content-Length']
+        else:
+            content = response.content
+            if encoding == 'br':
+                compressed = brotli.compress(content, quality=BROTLI_QUALITY)
+            else:
+                compressed = compress_string(content)
+            if len(compressed) >= len(content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        response['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def is_compressible(response) -> bool:
+        if response.has_header('Content-Encoding'):
+            return False
+        media_type = response.get('Content-Type', '').split(';')[0].strip()
+        if not (media_type.startswith('text/')
+                or media_type in COMPRESSIBLE_MEDIA_TYPES):
+            return False
+        return (response.streaming
+                or len(response.content) >= settings.COMPRESSION_MIN_SIZE)
+
+    def negotiate(self, header: str) -> Optional[str]:
+        """Кодировка с наибольшим весом; '*' задает вес остальных."""
+        weights = parse_accept_encoding(header)
+        best, best_weight = None, 0.0
+        for encoding in self.encodings:
+            weight = weights.get(encoding, weights.get('*', 0.0))
+            if weight > best_weight:
+                best, best_weight = encoding, weight
+        return best
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.3 on 2026-10-18 01:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoneyFlowDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Сумма')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.category', verbose_name='Категория')),
+                ('status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.status', verbose_name='Статус')),
+                ('subcategory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.subcategory', verbose_name='Подкатегория')),
+                ('type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.type', verbose_name='Тип')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='money_flow_rollups', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Дневной агрегат операций',
+                'verbose_name_plural': 'Дневные агрегаты операций',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='moneyflowdailyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'day', 'type', 'category', 'subcategory', 'status'), name='unique_money_flow_daily_rollup'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO api_moneyflowdailyrollup
+                    (user_id, day, type_id, category_id, subcategory_id,
+                     status_id, count, total)
+                SELECT user_id, created_at, type_id, category_id,
+                       subcategory_id, status_id, COUNT(*), SUM(amount)
+                FROM api_moneyflow
+                WHERE user_id IS NOT NULL
+                GROUP BY user_id, created_at, type_id, category_id,
+                         subcategory_id, status_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
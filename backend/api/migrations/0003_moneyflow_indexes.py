@@ -0,0 +1,26 @@
+# Generated by Django 3.2.3 on 2026-10-18 01:56
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_moneyflowdailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='moneyflow',
+            index=models.Index(fields=['user', '-created_at', 'id'], name='money_flow_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moneyflow',
+            index=models.Index(fields=['user', 'category', 'created_at'], name='money_flow_user_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moneyflow',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='money_flow_created_brin'),
+        ),
+    ]
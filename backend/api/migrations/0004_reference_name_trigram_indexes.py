@@ -0,0 +1,46 @@
+# Generated by Django 3.2.3 on 2026-10-18 01:58
+
+from django.db import migrations
+
+TRIGRAM_INDEXES = (
+    ('api_status', 'status_name_trgm_idx'),
+    ('api_type', 'type_name_trgm_idx'),
+    ('api_category', 'category_name_trgm_idx'),
+    ('api_subcategory', 'subcategory_name_trgm_idx'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """GIN-индексы pg_trgm для поиска справочников по части названия.
+
+    Если расширение pg_trgm недоступно на сервере, индексы не создаются:
+    поиск по названию продолжает работать, но без индекса.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, index in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index} '
+            f'ON {table} USING gin (name gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    for _, index in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_moneyflow_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
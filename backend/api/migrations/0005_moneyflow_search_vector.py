@@ -0,0 +1,52 @@
+# Generated by Django 3.2.3 on 2026-10-18 01:59
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_reference_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moneyflow',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE FUNCTION api_moneyflow_search_vector_update()
+                RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector := to_tsvector(
+                        'pg_catalog.russian', coalesce(NEW.comment, '')
+                    );
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER api_moneyflow_search_vector_trigger
+                BEFORE INSERT OR UPDATE OF comment, search_vector
+                ON api_moneyflow
+                FOR EACH ROW EXECUTE FUNCTION api_moneyflow_search_vector_update();
+
+                UPDATE api_moneyflow
+                SET search_vector = to_tsvector(
+                    'pg_catalog.russian', coalesce(comment, '')
+                );
+            """,
+            reverse_sql="""
+                DROP TRIGGER IF EXISTS api_moneyflow_search_vector_trigger
+                ON api_moneyflow;
+                DROP FUNCTION IF EXISTS api_moneyflow_search_vector_update();
+            """,
+        ),
+        migrations.AddIndex(
+            model_name='moneyflow',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='money_flow_search_gin'),
+        ),
+    ]
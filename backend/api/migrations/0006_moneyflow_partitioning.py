@@ -0,0 +1,128 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:30
+
+from django.db import migrations
+
+TABLE = 'api_moneyflow'
+DEFAULT_PARTITION = 'api_moneyflow_default'
+SEQUENCE = 'api_moneyflow_id_seq'
+
+
+def get_definitions(cursor, table):
+    """Индексы, внешние ключи и триггеры таблицы в виде DDL."""
+    cursor.execute(
+        'SELECT indexname, indexdef FROM pg_indexes '
+        'WHERE tablename = %s AND indexname <> %s',
+        [table, f'{TABLE}_pkey']
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(
+        'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+        'WHERE conrelid = %s::regclass AND contype = %s',
+        [table, 'f']
+    )
+    foreign_keys = cursor.fetchall()
+    cursor.execute(
+        'SELECT tgname, pg_get_triggerdef(oid) FROM pg_trigger '
+        'WHERE tgrelid = %s::regclass AND NOT tgisinternal '
+        'AND tgparentid = 0',
+        [table]
+    )
+    triggers = cursor.fetchall()
+    return indexes, foreign_keys, triggers
+
+
+def partition_money_flows(apps, schema_editor):
+    """Перевод api_moneyflow на секционирование по месяцам created_at.
+
+    Существующая таблица становится секцией по умолчанию без
+    копирования данных: ее индексы и внешние ключи присоединяются к
+    одноименным объектам новой родительской таблицы. Разнести строки
+    по месячным секциям можно позже командой partition_money_flows.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        indexes, foreign_keys, triggers = get_definitions(cursor, TABLE)
+
+    schema_editor.execute(f'ALTER TABLE {TABLE} RENAME TO {DEFAULT_PARTITION}')
+    # Первичный ключ секции заменит (id, created_at) родителя.
+    schema_editor.execute(
+        f'ALTER TABLE {DEFAULT_PARTITION} DROP CONSTRAINT {TABLE}_pkey'
+    )
+    # Имена индексов уникальны в схеме: освобождаем их для родителя.
+    for name, _ in indexes:
+        schema_editor.execute(
+            f'ALTER INDEX {name} RENAME TO {partition_index_name(name)}'
+        )
+    for name, _ in triggers:
+        schema_editor.execute(f'DROP TRIGGER {name} ON {DEFAULT_PARTITION}')
+
+    schema_editor.execute(
+        f'CREATE TABLE {TABLE} (LIKE {DEFAULT_PARTITION} INCLUDING DEFAULTS) '
+        'PARTITION BY RANGE (created_at)'
+    )
+    schema_editor.execute(f'ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id')
+    schema_editor.execute(
+        f'ALTER TABLE {DEFAULT_PARTITION} ALTER COLUMN id DROP DEFAULT'
+    )
+    # Ключ секционирования обязан входить в первичный ключ.
+    schema_editor.execute(
+        f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey '
+        'PRIMARY KEY (id, created_at)'
+    )
+    for name, definition in foreign_keys:
+        schema_editor.execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}'
+        )
+    for _, definition in indexes + triggers:
+        schema_editor.execute(definition)
+    schema_editor.execute(
+        f'ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT'
+    )
+
+
+def unpartition_money_flows(apps, schema_editor):
+    """Возврат к обычной таблице: строки всех секций копируются в нее."""
+    with schema_editor.connection.cursor() as cursor:
+        indexes, foreign_keys, triggers = get_definitions(cursor, TABLE)
+
+    schema_editor.execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_partitioned')
+    schema_editor.execute(
+        f'ALTER TABLE {TABLE}_partitioned '
+        f'RENAME CONSTRAINT {TABLE}_pkey TO {TABLE}_partitioned_pkey'
+    )
+    for name, _ in indexes:
+        schema_editor.execute(f'ALTER INDEX {name} RENAME TO {name}_old')
+    schema_editor.execute(
+        f'CREATE TABLE {TABLE} (LIKE {TABLE}_partitioned INCLUDING DEFAULTS)'
+    )
+    schema_editor.execute(f'ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id')
+    schema_editor.execute(
+        f'INSERT INTO {TABLE} SELECT * FROM {TABLE}_partitioned'
+    )
+    schema_editor.execute(f'DROP TABLE {TABLE}_partitioned CASCADE')
+    schema_editor.execute(
+        f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id)'
+    )
+    for name, definition in foreign_keys:
+        schema_editor.execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}'
+        )
+    for _, definition in indexes + triggers:
+        schema_editor.execute(definition)
+
+
+def partition_index_name(name):
+    """Имя индекса секции по умолчанию (не длиннее 63 символов)."""
+    if name.startswith(f'{TABLE}_'):
+        name = name[len(TABLE) + 1:]
+    return f'{DEFAULT_PARTITION}_{name}'[:63]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_moneyflow_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_money_flows, unpartition_money_flows),
+    ]
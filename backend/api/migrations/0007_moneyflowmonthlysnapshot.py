@@ -0,0 +1,35 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:29
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0006_moneyflow_partitioning'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoneyFlowMonthlySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Месяц')),
+                ('report', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Отчет')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Дата расчета')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='money_flow_snapshots', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Снимок месячного отчета',
+                'verbose_name_plural': 'Снимки месячных отчетов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='moneyflowmonthlysnapshot',
+            constraint=models.UniqueConstraint(fields=('user', 'month'), name='unique_money_flow_monthly_snapshot'),
+        ),
+    ]
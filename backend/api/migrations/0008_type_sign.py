@@ -0,0 +1,28 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:37
+
+from django.db import migrations, models
+
+SIGNS_BY_NAME = {'доход': 1, 'перевод': 0}
+
+
+def set_type_signs(apps, schema_editor):
+    """Знак существующих типов по названию; остальные считаются расходом."""
+    Type = apps.get_model('api', 'Type')
+    for prefix, sign in SIGNS_BY_NAME.items():
+        Type.objects.filter(name__istartswith=prefix).update(sign=sign)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_moneyflowmonthlysnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='type',
+            name='sign',
+            field=models.SmallIntegerField(choices=[(1, 'Доход'), (0, 'Не влияет на баланс'), (-1, 'Расход')], default=-1, verbose_name='Влияние на баланс'),
+        ),
+        migrations.RunPython(set_type_signs, migrations.RunPython.noop),
+    ]
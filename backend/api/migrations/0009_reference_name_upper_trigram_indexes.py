@@ -0,0 +1,57 @@
+# Generated by Django 3.2.3 on 2026-10-18 12:10
+
+from django.db import migrations
+
+TRIGRAM_INDEXES = (
+    ('api_status', 'status_name_trgm_idx'),
+    ('api_type', 'type_name_trgm_idx'),
+    ('api_category', 'category_name_trgm_idx'),
+    ('api_subcategory', 'subcategory_name_trgm_idx'),
+)
+
+
+def trigram_available(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        return cursor.fetchone() is not None
+
+
+def create_indexes(schema_editor, expression):
+    if not trigram_available(schema_editor):
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, index in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index}')
+        schema_editor.execute(
+            f'CREATE INDEX {index} ON {table} '
+            f'USING gin ({expression} gin_trgm_ops)'
+        )
+
+
+def create_upper_trigram_indexes(apps, schema_editor):
+    """Индексы pg_trgm по UPPER(name) вместо name.
+
+    name__icontains в PostgreSQL компилируется в
+    UPPER("name"::text) LIKE UPPER('%...%'), и индекс по самому name
+    для такого выражения не применяется.
+    """
+    create_indexes(schema_editor, '(UPPER(name::text))')
+
+
+def create_name_trigram_indexes(apps, schema_editor):
+    create_indexes(schema_editor, 'name')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_type_sign'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_upper_trigram_indexes, create_name_trigram_indexes
+        ),
+    ]
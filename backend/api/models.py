@@ -1,3 +1,6 @@
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from django.db import models
 from users.models import User  # Импортируем User из users.models
@@ -5,7 +8,9 @@ from users.models import User  # Импортируем User из users.models
 from .constants import (MAX_LENGTH_DEFAULT,
                         MAX_LENGTH_TEN,
                         MAX_LENGTH_EIGHT,
-                        MIN_VALIDATE,)
+                        MIN_VALIDATE,
+                        TYPE_SIGN_EXPENSE,
+                        TYPE_SIGNS,)
 
 
 class Status(models.Model):
@@ -35,6 +40,11 @@ class Type(models.Model):
         max_length=MAX_LENGTH_DEFAULT,
         unique=True
     )
+    sign = models.SmallIntegerField(
+        'Влияние на баланс',
+        choices=TYPE_SIGNS,
+        default=TYPE_SIGN_EXPENSE
+    )
 
     class Meta:
         verbose_name = 'Тип операции'
@@ -136,11 +146,39 @@ class MoneyFlow(models.Model):
         'Комментарий',
         blank=True
     )
+    # Заполняется триггером БД из comment при каждой записи.
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Движение денежных средств'
         verbose_name_plural = 'Движения денежных средств'
         ordering = ['-created_at']
+        indexes = [
+            # Список операций пользователя и keyset-пагинация.
+            models.Index(
+                fields=['user', '-created_at', 'id'],
+                name='money_flow_user_created_idx'
+            ),
+            # Фильтр по категории в пределах периода.
+            models.Index(
+                fields=['user', 'category', 'created_at'],
+                name='money_flow_user_category_idx'
+            ),
+            # Диапазоны дат без пользователя (общие отчеты).
+            BrinIndex(
+                fields=['created_at'],
+                name='money_flow_created_brin'
+            ),
+            # Полнотекстовый поиск по комментарию.
+            GinIndex(
+                fields=['search_vector'],
+                name='money_flow_search_gin'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user.username if self.user else "anon"} - {self.created_at} - {self.type} - {self.amount} руб.'
@@ -176,3 +214,90 @@ class SubcategoryOwnership(models.Model):
 
     class Meta:
         unique_together = ('user', 'subcategory')
+
+
+class MoneyFlowDailyRollup(models.Model):
+    """Дневные агрегаты операций пользователя для отчетов."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='money_flow_rollups',
+        verbose_name='Пользователь'
+    )
+    day = models.DateField('День')
+    type = models.ForeignKey(
+        Type,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Тип'
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Категория'
+    )
+    subcategory = models.ForeignKey(
+        Subcategory,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Подкатегория'
+    )
+    status = models.ForeignKey(
+        Status,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Статус'
+    )
+    count = models.IntegerField('Количество', default=0)
+    total = models.DecimalField(
+        'Сумма',
+        max_digits=16,
+        decimal_places=2,
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Дневной агрегат операций'
+        verbose_name_plural = 'Дневные агрегаты операций'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'day', 'type', 'category',
+                        'subcategory', 'status'],
+                name='unique_money_flow_daily_rollup',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} - {self.day} - {self.count} шт. - {self.total} руб.'
+
+
+class MoneyFlowMonthlySnapshot(models.Model):
+    """Снимок месячного отчета пользователя за закрытый месяц.
+
+    Хранит разбивку по типам и категориям; удаляется при любой записи
+    операции с датой внутри месяца и пересчитывается при следующем
+    запросе или командой snapshot_money_flow_months.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='money_flow_snapshots',
+        verbose_name='Пользователь'
+    )
+    month = models.DateField('Месяц')
+    report = models.JSONField('Отчет', encoder=DjangoJSONEncoder)
+    computed_at = models.DateTimeField('Дата расчета', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Снимок месячного отчета'
+        verbose_name_plural = 'Снимки месячных отчетов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'month'],
+                name='unique_money_flow_monthly_snapshot',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} - {self.month:%Y-%m}'
@@ -1,6 +1,26 @@
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import date, timedelta
+from urllib import parse
+
+from django.db import connections
+from django.db.models import Q
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .constants import (BALANCE_PAGE_DAYS, MAX_KEYSET_PAGINATION,
+                        MAX_PAGINATION, PAGINATION_SIZE, TIME_SERIES_MAX_DAYS)
+
 
-from .constants import MAX_PAGINATION, PAGINATION_SIZE
+def estimate_count(queryset) -> int:
+    """Оценка числа строк запроса по плану PostgreSQL без COUNT(*)."""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
 
 
 class CustomPagination(pagination.PageNumberPagination):
@@ -15,3 +35,194 @@ class CustomPagination(pagination.PageNumberPagination):
             except ValueError:
                 return self.page_size
         return self.page_size
+
+
+class KeysetPagination(pagination.BasePagination):
+    """Keyset-пагинация по (-created_at, id) с непрозрачным курсором.
+
+    В отличие от постраничной пагинации не выполняет COUNT(*) и OFFSET:
+    каждая страница - это индексный диапазон после позиции курсора,
+    поэтому страница N стоит столько же, сколько первая.
+    """
+    page_size = PAGINATION_SIZE
+    max_page_size = MAX_KEYSET_PAGINATION
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[0])
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) == 'approx':
+            self.count = estimate_count(queryset)
+
+        if reverse:
+            queryset = queryset.order_by('created_at', '-id')
+        else:
+            queryset = queryset.order_by('-created_at', 'id')
+        if cursor:
+            _, created_at, pk = cursor
+            if reverse:
+                position = Q(created_at__gt=created_at) | Q(
+                    created_at=created_at, id__lt=pk
+                )
+            else:
+                position = Q(created_at__lt=created_at) | Q(
+                    created_at=created_at, id__gt=pk
+                )
+            queryset = queryset.filter(position)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else cursor is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        page_size = request.query_params.get(self.page_size_query_param)
+        if page_size is not None:
+            try:
+                return max(1, min(int(page_size), self.max_page_size))
+            except ValueError:
+                pass
+        return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            created_at = date.fromisoformat(tokens['d'][0])
+            pk = int(tokens['i'][0])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, created_at, pk
+
+    def encode_cursor(self, instance, reverse):
+        if isinstance(instance, dict):
+            created_at, pk = instance['created_at'], instance['id']
+        else:
+            created_at, pk = instance.created_at, instance.id
+        tokens = {'d': created_at.isoformat(), 'i': pk}
+        if reverse:
+            tokens['r'] = '1'
+        querystring = parse.urlencode(tokens)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ])
+        if self.count is not None:
+            response['count'] = self.count
+            response.move_to_end('count', last=False)
+        return Response(response)
+
+
+class MoneyFlowPagination(pagination.PageNumberPagination):
+    """Постраничная пагинация операций с опциональным keyset-режимом.
+
+    Keyset-режим включается параметром ``pagination=cursor`` или
+    передачей ``cursor``; без них поведение прежнее.
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (request.query_params.get(self.mode_query_param) == 'cursor'
+                or self.keyset_class.cursor_query_param in request.query_params):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class DatePagination(pagination.BasePagination):
+    """Пагинация дневных рядов по календарным дням периода.
+
+    Страница - это до ``limit`` дней начиная со ``start_date``; ссылка
+    на следующую страницу сдвигает ``start_date`` за конец текущей.
+    Размер страницы заранее известен, поэтому ни COUNT(*), ни OFFSET
+    не нужны.
+    """
+    page_size = BALANCE_PAGE_DAYS
+    max_page_size = TIME_SERIES_MAX_DAYS + 1
+    page_size_query_param = 'limit'
+    start_query_param = 'start_date'
+    end_query_param = 'end_date'
+
+    def paginate_period(self, start_date: date, end_date: date, request):
+        """Границы текущей страницы внутри периода."""
+        self.base_url = request.build_absolute_uri()
+        self.end_date = end_date
+        page_end = min(
+            end_date,
+            start_date + timedelta(days=self.get_page_size(request) - 1)
+        )
+        self.next_start = (
+            page_end + timedelta(days=1) if page_end < end_date else None
+        )
+        return start_date, page_end
+
+    def get_page_size(self, request):
+        page_size = request.query_params.get(self.page_size_query_param)
+        if page_size is not None:
+            try:
+                return max(1, min(int(page_size), self.max_page_size))
+            except ValueError:
+                pass
+        return self.page_size
+
+    def get_next_link(self):
+        if self.next_start is None:
+            return None
+        url = replace_query_param(
+            self.base_url, self.start_query_param, self.next_start.isoformat()
+        )
+        # Конец периода фиксируется: по умолчанию он зависит от даты.
+        return replace_query_param(
+            url, self.end_query_param, self.end_date.isoformat()
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
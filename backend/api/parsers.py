@@ -0,0 +1,29 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+UTF8_ENCODINGS = ('utf-8', 'utf8')
+
+
+class FastJSONParser(JSONParser):
+    """JSON-парсер на orjson; без orjson - обычный JSONParser.
+
+    orjson читает только UTF-8, тела в других кодировках разбирает
+    JSONParser. Числа с точкой, как и в json, становятся float, а
+    DecimalField восстанавливает Decimal по кратчайшей записи числа,
+    поэтому суммы до 15 значащих цифр не теряют точности. NaN и
+    Infinity orjson отвергает всегда, как JSONParser при STRICT_JSON.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower() not in UTF8_ENCODINGS:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
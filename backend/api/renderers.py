@@ -0,0 +1,56 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Даты и время пишет кодировщик DRF: orjson, например, отбрасывает
+    # секунды смещения (LMT до 1920-х: +02:30:17).
+    ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+                      | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON-рендерер на orjson с тем же выводом, что у JSONRenderer.
+
+    Даты, время, Decimal и прочие типы, которые orjson не знает или
+    пишет иначе, передаются в default кодировщика DRF: datetime выходит
+    тем же isoformat с Z для UTC, Decimal вне сериализаторов становится
+    числом, как и раньше.
+    Отступы (?indent, Browsable API) и ensure_ascii orjson не умеет,
+    для них и при отсутствии orjson работает обычный JSONRenderer.
+    Отличие одно: NaN и бесконечности пишутся как null.
+    """
+    default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or self.ensure_ascii or self.get_indent(
+                accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        ret = orjson.dumps(data, default=self.default, option=ORJSON_OPTIONS)
+        # Как JSONRenderer, экранируем U+2028 и U+2029 для JavaScript.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = (ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+                   .replace(b'\xe2\x80\xa9', b'\\u2029'))
+        return ret
+
+
+class CSVRenderer(JSONRenderer):
+    """Рендерер для выгрузки в CSV.
+
+    Сами данные отдаются потоковым ответом; рендерер нужен для выбора
+    формата через ?format=csv, а ошибки по-прежнему рендерятся как JSON.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(JSONRenderer):
+    """Рендерер для выгрузки в NDJSON (?format=ndjson)."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
@@ -1,7 +1,16 @@
+import io
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from django.db.models import QuerySet
-from .models import MoneyFlow, Status, Type, Category, Subcategory
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.db import connection, connections, router, transaction
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import (BigIntegerField, F, Func, IntegerField, Q,
+                              QuerySet)
+from django.db.models.functions import Cast
+from .cache import bump_money_flow_versions
+from .constants import SEARCH_CONFIG
+from .models import (MoneyFlow, MoneyFlowDailyRollup, MoneyFlowMonthlySnapshot,
+                     Status, Type, Category, Subcategory)
 
 
 class BaseRepository(ABC):
@@ -28,12 +37,403 @@ class BaseRepository(ABC):
         pass
 
 
+REFERENCE_MODELS = {
+    'status': Status,
+    'type': Type,
+    'category': Category,
+    'subcategory': Subcategory,
+}
+
+# Справочники, по которым можно группировать временные ряды.
+TIME_SERIES_GROUPS = {
+    'type': Type,
+    'category': Category,
+}
+
+
+class MoneyFlowSnapshotRepository:
+    """Репозиторий снимков месячных отчетов за закрытые месяцы."""
+
+    def get_by_months(self, user, months: List[date]) -> Dict[date, dict]:
+        """Снимки пользователя за указанные месяцы одним запросом."""
+        return dict(
+            MoneyFlowMonthlySnapshot.objects.filter(
+                user=user, month__in=months
+            ).values_list('month', 'report')
+        )
+
+    def save(self, user, month: date, report: dict) -> None:
+        MoneyFlowMonthlySnapshot.objects.update_or_create(
+            user=user, month=month, defaults={'report': report}
+        )
+
+    def invalidate(self, user_days: Iterable[Tuple[int, date]]) -> None:
+        """Удаление снимков закрытых месяцев, в которых были записи.
+
+        Вызывается при каждой записи операций; записи текущего месяца
+        снимков не затрагивают и запроса к БД не порождают.
+        """
+        current_month = date.today().replace(day=1)
+        keys = {
+            (user_id, day.replace(day=1))
+            for user_id, day in user_days
+            if day < current_month
+        }
+        if not keys:
+            return
+        condition = Q()
+        for user_id, month in keys:
+            condition |= Q(user_id=user_id, month=month)
+
+        def delete():
+            MoneyFlowMonthlySnapshot.objects.filter(condition).delete()
+
+        # Повтор после коммита: снимок, посчитанный конкурентно по
+        # незафиксированным данным, не переживет транзакцию.
+        delete()
+        transaction.on_commit(delete)
+
+    def invalidate_user(self, user=None) -> None:
+        queryset = MoneyFlowMonthlySnapshot.objects.all()
+        if user is not None:
+            queryset = queryset.filter(user=user)
+        queryset.delete()
+
+
+class MoneyFlowRollupRepository:
+    """Репозиторий дневных агрегатов денежных операций.
+
+    Агрегаты обновляются в той же транзакции, что и сами операции:
+    перед изменением или удалением операции ее вклад вычитается,
+    после создания или изменения - добавляется.
+    """
+
+    KEY_COLUMNS = ('user_id', 'type_id', 'category_id',
+                   'subcategory_id', 'status_id')
+
+    def __init__(self):
+        self.snapshots = MoneyFlowSnapshotRepository()
+
+    def get_by_date_range(self, user, start_date=None, end_date=None) -> QuerySet:
+        """Получение агрегатов пользователя по диапазону дат."""
+        queryset = MoneyFlowDailyRollup.objects.filter(user=user)
+        if start_date:
+            queryset = queryset.filter(day__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(day__lte=end_date)
+        return queryset
+
+    def add(self, ids: List[int]) -> None:
+        """Добавление операций с указанными ID в агрегаты."""
+        self._apply(ids, 1)
+
+    def subtract(self, ids: List[int]) -> None:
+        """Вычитание операций с указанными ID из агрегатов."""
+        emptied = self._apply(ids, -1)
+        if emptied:
+            MoneyFlowDailyRollup.objects.filter(id__in=emptied).delete()
+
+    def rebuild(self, user=None) -> int:
+        """Полный пересчет агрегатов по исходным операциям."""
+        rollup_table, flow_table = self._tables()
+        columns = ', '.join(self.KEY_COLUMNS)
+        where = 'user_id IS NOT NULL'
+        params = []
+        if user is not None:
+            where += ' AND user_id = %s'
+            params.append(user.pk)
+        with transaction.atomic():
+            queryset = MoneyFlowDailyRollup.objects.all()
+            if user is not None:
+                queryset = queryset.filter(user=user)
+            queryset.delete()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {rollup_table} ({columns}, day, count, total) '
+                    f'SELECT {columns}, created_at, COUNT(*), SUM(amount) '
+                    f'FROM {flow_table} WHERE {where} '
+                    f'GROUP BY {columns}, created_at',
+                    params
+                )
+                rows = cursor.rowcount
+            self.snapshots.invalidate_user(user)
+            if user is not None:
+                bump_money_flow_versions([user.pk])
+            else:
+                bump_money_flow_versions(
+                    MoneyFlowDailyRollup.objects.values_list(
+                        'user_id', flat=True
+                    ).distinct()
+                )
+            return rows
+
+    def get_time_series(self, user, start_date: date, end_date: date,
+                        granularity: str, group_by: Optional[str] = None
+                        ) -> List[tuple]:
+        """Суммы по периодам одним запросом к агрегатам.
+
+        Пустые периоды заполняются нулями на стороне БД. Возвращает
+        строки (id группы, название группы, начало периода, количество,
+        сумма), упорядоченные по группе и периоду; без группировки id и
+        название - None.
+        """
+        rollup_table, _ = self._tables()
+        quote = connection.ops.quote_name
+        if group_by:
+            model = TIME_SERIES_GROUPS[group_by]
+            key = quote(f'{group_by}_id')
+            keys = 'SELECT DISTINCT key FROM totals'
+            names = (f'LEFT JOIN {quote(model._meta.db_table)} ref '
+                     'ON ref.id = keys.key')
+            name = 'ref.name'
+            join = 'totals.key = keys.key AND totals.period = periods.period'
+        else:
+            key = 'NULL::bigint'
+            keys = 'SELECT NULL::bigint AS key'
+            names = ''
+            name = 'NULL'
+            join = 'totals.period = periods.period'
+        with self._read_connection().cursor() as cursor:
+            cursor.execute(
+                f'WITH totals AS ('
+                f'SELECT date_trunc(%(granularity)s, day)::date AS period, '
+                f'{key} AS key, SUM(count) AS count, SUM(total) AS total '
+                f'FROM {rollup_table} '
+                f'WHERE user_id = %(user)s '
+                f'AND day BETWEEN %(start)s AND %(end)s '
+                f'GROUP BY 1, 2'
+                f'), periods AS ('
+                f'SELECT generate_series('
+                f'date_trunc(%(granularity)s, %(start)s::date), '
+                f'%(end)s::date, %(step)s::interval)::date AS period'
+                f'), keys AS ({keys}) '
+                f'SELECT keys.key, {name}, periods.period, '
+                f'COALESCE(totals.count, 0), COALESCE(totals.total, 0) '
+                f'FROM keys CROSS JOIN periods {names} '
+                f'LEFT JOIN totals ON {join} '
+                f'ORDER BY keys.key, periods.period',
+                {
+                    'granularity': granularity,
+                    'step': f'1 {granularity}',
+                    'user': user.pk,
+                    'start': start_date,
+                    'end': end_date,
+                }
+            )
+            return cursor.fetchall()
+
+    def get_running_balance(self, user, start_date: date, end_date: date,
+                            by_status: bool = False) -> List[tuple]:
+        """Дневной нарастающий баланс оконной функцией по агрегатам.
+
+        Знак суммы берется из Type.sign. Все дни до начала периода
+        сворачиваются в одну строку накануне, так что баланс на первый
+        день учитывает всю историю. Возвращает строки (id статуса,
+        название статуса, день, изменение за день, баланс) по статусу и
+        дню; без разбивки по статусам id и название - None.
+        """
+        rollup_table, _ = self._tables()
+        quote = connection.ops.quote_name
+        if by_status:
+            key = 'rollup.status_id'
+            keys = 'SELECT DISTINCT key FROM daily'
+            names = (f'LEFT JOIN {quote(Status._meta.db_table)} ref '
+                     'ON ref.id = balance.key')
+            name = 'ref.name'
+        else:
+            key = 'NULL::bigint'
+            keys = 'SELECT NULL::bigint AS key'
+            names = ''
+            name = 'NULL'
+        with self._read_connection().cursor() as cursor:
+            cursor.execute(
+                f'WITH daily AS ('
+                f'SELECT GREATEST(rollup.day, %(opening)s) AS day, '
+                f'{key} AS key, SUM(rollup.total * flow_type.sign) AS net '
+                f'FROM {rollup_table} rollup '
+                f'JOIN {quote(Type._meta.db_table)} flow_type '
+                f'ON flow_type.id = rollup.type_id '
+                f'WHERE rollup.user_id = %(user)s AND rollup.day <= %(end)s '
+                f'GROUP BY 1, 2'
+                f'), days AS ('
+                f'SELECT generate_series(%(opening)s::date, %(end)s::date, '
+                f"'1 day'::interval)::date AS day"
+                f'), keys AS ({keys}), '
+                f'balance AS ('
+                f'SELECT keys.key, days.day, COALESCE(daily.net, 0) AS net, '
+                f'SUM(COALESCE(daily.net, 0)) OVER ('
+                f'PARTITION BY keys.key ORDER BY days.day) AS balance '
+                f'FROM keys CROSS JOIN days '
+                f'LEFT JOIN daily ON daily.key IS NOT DISTINCT FROM keys.key '
+                f'AND daily.day = days.day'
+                f') '
+                f'SELECT balance.key, {name}, balance.day, balance.net, '
+                f'balance.balance '
+                f'FROM balance {names} '
+                f'WHERE balance.day >= %(start)s '
+                f'ORDER BY balance.key, balance.day',
+                {
+                    'user': user.pk,
+                    'opening': start_date - timedelta(days=1),
+                    'start': start_date,
+                    'end': end_date,
+                }
+            )
+            return cursor.fetchall()
+
+    def _apply(self, ids: List[int], sign: int) -> List[int]:
+        """Upsert вклада операций в агрегаты; возвращает ID опустевших строк.
+
+        Через эту точку проходят все записи операций, поэтому здесь же
+        сбрасываются кэшированные отчеты затронутых пользователей.
+        """
+        if not ids:
+            return []
+        rollup_table, flow_table = self._tables()
+        columns = ', '.join(self.KEY_COLUMNS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {rollup_table} ({columns}, day, count, total) '
+                f'SELECT {columns}, created_at, %s * COUNT(*), %s * SUM(amount) '
+                f'FROM {flow_table} '
+                f'WHERE id = ANY(%s) AND user_id IS NOT NULL '
+                f'GROUP BY {columns}, created_at '
+                f'ON CONFLICT ({columns}, day) DO UPDATE SET '
+                f'count = {rollup_table}.count + EXCLUDED.count, '
+                f'total = {rollup_table}.total + EXCLUDED.total '
+                f'RETURNING id, count, user_id, day',
+                [sign, sign, list(ids)]
+            )
+            rows = cursor.fetchall()
+        bump_money_flow_versions({user_id for _, _, user_id, _ in rows})
+        self.snapshots.invalidate((user_id, day) for _, _, user_id, day in rows)
+        return [row_id for row_id, count, _, _ in rows if count <= 0]
+
+    @staticmethod
+    def _read_connection():
+        """Соединение для чтения агрегатов: реплика, если ее выбрал роутер."""
+        return connections[router.db_for_read(MoneyFlowDailyRollup)]
+
+    @staticmethod
+    def _tables():
+        quote = connection.ops.quote_name
+        return (quote(MoneyFlowDailyRollup._meta.db_table),
+                quote(MoneyFlow._meta.db_table))
+
+
+class MoneyFlowPartitionRepository:
+    """Месячные секции таблицы денежных операций.
+
+    Таблица секционирована по диапазонам created_at (миграция 0006).
+    Строки месяцев без своей секции лежат в секции по умолчанию, куда
+    после миграции попали все существующие данные.
+    """
+
+    DEFAULT_SUFFIX = 'default'
+
+    def partition_name(self, month: date) -> str:
+        return f'{MoneyFlow._meta.db_table}_p{month:%Y%m}'
+
+    def default_partition_name(self) -> str:
+        return f'{MoneyFlow._meta.db_table}_{self.DEFAULT_SUFFIX}'
+
+    def get_partitions(self) -> List[str]:
+        """Имена присоединенных секций, кроме секции по умолчанию."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT child.relname FROM pg_inherits '
+                'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                'WHERE pg_inherits.inhparent = %s::regclass '
+                'ORDER BY child.relname',
+                [MoneyFlow._meta.db_table]
+            )
+            names = [name for name, in cursor.fetchall()]
+        return [name for name in names if name != self.default_partition_name()]
+
+    def get_default_months(self) -> List[date]:
+        """Месяцы, строки которых лежат в секции по умолчанию."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT DISTINCT date_trunc('month', created_at)::date "
+                f'FROM {connection.ops.quote_name(self.default_partition_name())} '
+                'ORDER BY 1'
+            )
+            return [month for month, in cursor.fetchall()]
+
+    @transaction.atomic
+    def create_partition(self, month: date) -> int:
+        """Создание секции месяца; возвращает число перенесенных строк.
+
+        Строки месяца переносятся из секции по умолчанию в той же
+        транзакции, поэтому читатели не видят промежуточного состояния.
+        Секция наполняется до присоединения: индексы родителя строятся
+        по готовым данным, а CHECK-ограничение избавляет ATTACH от
+        повторной проверки строк.
+        """
+        name = self.partition_name(month)
+        if name in self.get_partitions():
+            return 0
+        start = month.replace(day=1)
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+        quote = connection.ops.quote_name
+        table = quote(MoneyFlow._meta.db_table)
+        partition = quote(name)
+        columns = ', '.join(
+            quote(field.column) for field in MoneyFlow._meta.concrete_fields
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE TABLE {partition} (LIKE {table})')
+            cursor.execute(
+                f'ALTER TABLE {partition} ADD CONSTRAINT {quote(name + "_range")} '
+                'CHECK (created_at >= %s AND created_at < %s)',
+                [start, end]
+            )
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM '
+                f'{quote(self.default_partition_name())} '
+                f'WHERE created_at >= %s AND created_at < %s '
+                f'RETURNING {columns}) '
+                f'INSERT INTO {partition} ({columns}) '
+                f'SELECT {columns} FROM moved',
+                [start, end]
+            )
+            moved = cursor.rowcount
+            cursor.execute(
+                f'ALTER TABLE {table} ATTACH PARTITION {partition} '
+                'FOR VALUES FROM (%s) TO (%s)',
+                [start, end]
+            )
+            cursor.execute(
+                f'ALTER TABLE {partition} DROP CONSTRAINT {quote(name + "_range")}'
+            )
+        return moved
+
+
+COPY_STAGING_TABLE = 'money_flow_copy_staging'
+
+
+def copy_text(value) -> str:
+    """Значение в текстовом формате COPY."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, str):
+        return (value.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+    return str(value)
+
+
 class MoneyFlowRepository(BaseRepository):
     """Репозиторий для работы с денежными операциями."""
+
+    def __init__(self):
+        self.rollups = MoneyFlowRollupRepository()
     
     def get_all(self) -> QuerySet:
+        # category__type и subcategory__category читают вложенные
+        # сериализаторы MoneyFlowSerializer для каждой строки
         return MoneyFlow.objects.select_related(
-            'user', 'status', 'type', 'category', 'subcategory'
+            'user', 'status', 'type', 'category__type',
+            'subcategory__category'
         ).all()
     
     def get_by_user(self, user) -> QuerySet:
@@ -52,25 +452,117 @@ class MoneyFlowRepository(BaseRepository):
         except MoneyFlow.DoesNotExist:
             return None
     
+    @transaction.atomic
     def create(self, **kwargs) -> MoneyFlow:
-        return MoneyFlow.objects.create(**kwargs)
+        money_flow = MoneyFlow.objects.create(**kwargs)
+        self.rollups.add([money_flow.id])
+        return money_flow
     
+    @transaction.atomic
     def update(self, id: int, **kwargs) -> Optional[MoneyFlow]:
         try:
-            money_flow = MoneyFlow.objects.get(id=id)
+            money_flow = MoneyFlow.objects.select_for_update().get(id=id)
+            self.rollups.subtract([id])
             for key, value in kwargs.items():
                 setattr(money_flow, key, value)
             money_flow.save()
+            self.rollups.add([id])
             return money_flow
         except MoneyFlow.DoesNotExist:
             return None
     
+    @transaction.atomic
     def delete(self, id: int) -> bool:
         try:
-            MoneyFlow.objects.get(id=id).delete()
+            money_flow = MoneyFlow.objects.select_for_update().get(id=id)
+            self.rollups.subtract([id])
+            money_flow.delete()
             return True
         except MoneyFlow.DoesNotExist:
             return False
+
+    @transaction.atomic
+    def bulk_create(self, money_flows: List[MoneyFlow]) -> List[MoneyFlow]:
+        """Массовое создание операций с обновлением агрегатов."""
+        created = MoneyFlow.objects.bulk_create(money_flows)
+        self.rollups.add([money_flow.id for money_flow in created])
+        return created
+
+    COPY_COLUMNS = ('user_id', 'created_at', 'status_id', 'type_id',
+                    'category_id', 'subcategory_id', 'amount', 'comment')
+
+    def copy_rows(self, rows: Iterable[tuple]) -> int:
+        """Запись строк одной командой COPY без обновления агрегатов.
+
+        Строки - кортежи значений в порядке COPY_COLUMNS. Агрегаты после
+        загрузки пересчитываются через MoneyFlowRollupRepository.rebuild.
+        """
+        with connection.cursor() as cursor:
+            return self._copy(
+                cursor, MoneyFlow._meta.db_table, self.COPY_COLUMNS, rows
+            )
+
+    @transaction.atomic
+    def copy_create(self, rows: List[tuple]) -> List[int]:
+        """Массовое создание операций через COPY с обновлением агрегатов.
+
+        Строки (в порядке COPY_COLUMNS) копируются во временную таблицу
+        и переносятся в операции одним INSERT ... SELECT. ID выдаются
+        последовательностью в порядке вставки, поэтому возвращаются в
+        порядке исходных строк.
+        """
+        quote = connection.ops.quote_name
+        staging = quote(COPY_STAGING_TABLE)
+        columns = ', '.join(map(quote, self.COPY_COLUMNS))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {staging}')
+            cursor.execute(
+                f'CREATE TEMP TABLE {staging} ON COMMIT DROP AS '
+                f'SELECT 0::bigint AS ordinal, {columns} '
+                f'FROM {quote(MoneyFlow._meta.db_table)} WITH NO DATA'
+            )
+            self._copy(
+                cursor, COPY_STAGING_TABLE, ('ordinal',) + self.COPY_COLUMNS,
+                ((number,) + tuple(row) for number, row in enumerate(rows))
+            )
+            cursor.execute(
+                f'INSERT INTO {quote(MoneyFlow._meta.db_table)} ({columns}) '
+                f'SELECT {columns} FROM {staging} ORDER BY ordinal '
+                f'RETURNING id'
+            )
+            ids = sorted(row[0] for row in cursor.fetchall())
+            cursor.execute(f'DROP TABLE {staging}')
+        self.rollups.add(ids)
+        return ids
+
+    @staticmethod
+    def _copy(cursor, table: str, columns: Tuple[str, ...],
+              rows: Iterable[tuple]) -> int:
+        buffer = io.StringIO()
+        count = 0
+        for row in rows:
+            buffer.write('\t'.join(map(copy_text, row)))
+            buffer.write('\n')
+            count += 1
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        cursor.copy_expert(
+            f'COPY {quote(table)} ({", ".join(map(quote, columns))}) '
+            f'FROM STDIN',
+            buffer
+        )
+        return count
+
+    def analyze(self) -> None:
+        """Обновление статистики планировщика после массовой загрузки.
+
+        Без нее планы запросов к только что загруженным строкам строятся
+        по старым оценкам и бывают в разы медленнее.
+        """
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in (MoneyFlow, MoneyFlowDailyRollup):
+                cursor.execute(f'ANALYZE {quote(model._meta.db_table)}')
     
     def get_by_date_range(self, user=None, start_date=None, end_date=None) -> QuerySet:
         """Получение операций по диапазону дат для конкретного пользователя."""
@@ -85,6 +577,60 @@ class MoneyFlowRepository(BaseRepository):
             queryset = queryset.filter(created_at__lte=end_date)
         return queryset.order_by('-created_at')
     
+    def get_distribution_rows(self, user, start_date: date,
+                              end_date: date) -> QuerySet:
+        """Проекция (день от начала эпохи, сумма в копейках, категория).
+
+        Целые числа считаются в БД: драйверу не нужно создавать date и
+        Decimal на каждую строку, и строки сразу ложатся в массив int64.
+        """
+        # Только аннотации: порядок колонок SELECT совпадает с кортежем,
+        # и Django не пересобирает строки; без сортировки план может
+        # читать секции bitmap-сканированием.
+        return MoneyFlow.objects.filter(
+            user=user, created_at__range=(start_date, end_date)
+        ).order_by().annotate(
+            epoch_day=Func(
+                F('created_at'),
+                template="(%(expressions)s - DATE '1970-01-01')",
+                output_field=IntegerField()
+            ),
+            cents=Cast(F('amount') * 100, BigIntegerField()),
+            category_key=F('category_id'),
+        ).values_list('epoch_day', 'cents', 'category_key')
+
+    def reference_ids(self, field: str, name: str) -> QuerySet:
+        """ID справочника по части названия.
+
+        name__icontains дает UPPER("name"::text) LIKE UPPER(...), его
+        обслуживает GIN-индекс pg_trgm по UPPER(name) (миграция 0009).
+        """
+        return REFERENCE_MODELS[field].objects.filter(
+            name__icontains=name
+        ).values_list('id', flat=True)
+
+    def resolve_reference_ids(self, field: str, name: str) -> List[int]:
+        """Поиск ID справочника по части названия."""
+        return list(self.reference_ids(field, name))
+
+    def filter_by_reference_name(self, queryset: QuerySet, field: str,
+                                 name: str) -> QuerySet:
+        """Фильтр операций по названию справочника через индексный IN по ID."""
+        ids = self.resolve_reference_ids(field, name)
+        return queryset.filter(**{f'{field}_id__in': ids})
+
+    def search(self, queryset: QuerySet, text: str) -> QuerySet:
+        """Полнотекстовый поиск по комментарию с ранжированием.
+
+        Совпадения ищутся по GIN-индексу search_vector; результаты
+        упорядочены по рангу, затем по (-created_at, id), так что
+        keyset-пагинация может переупорядочить их без потери индекса.
+        """
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-created_at', 'id')
+
     def get_by_category(self, category_id: int, user=None) -> QuerySet:
         """Получение операций по категории для конкретного пользователя."""
         if user:
@@ -96,10 +642,21 @@ class MoneyFlowRepository(BaseRepository):
         from django.db.models import Sum, Count
         
         if user:
-            queryset = self.get_by_user(user)
-        else:
-            queryset = self.get_all()
-            
+            rollups = self.rollups.get_by_date_range(user)
+            totals = rollups.aggregate(
+                total_count=Sum('count'),
+                total_amount=Sum('total')
+            )
+            return {
+                'total_count': totals['total_count'] or 0,
+                'total_amount': totals['total_amount'] or 0,
+                'by_type': rollups.values('type__name').annotate(
+                    count=Sum('count'),
+                    total=Sum('total')
+                )
+            }
+
+        queryset = self.get_all()
         return {
             'total_count': queryset.count(),
             'total_amount': queryset.aggregate(Sum('amount'))['amount__sum'] or 0,
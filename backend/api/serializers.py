@@ -1,4 +1,7 @@
+from datetime import date, timedelta
+
 from django.db.models import Q
+from django.utils.functional import cached_property
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework.relations import PrimaryKeyRelatedField
 from rest_framework import serializers
@@ -14,6 +17,10 @@ from .models import (
     CategoryOwnership,
     SubcategoryOwnership
 )
+from .constants import (DISTRIBUTION_DEFAULT_BINS, DISTRIBUTION_MAX_BINS,
+                        MONTHLY_REPORT_MAX_MONTHS, TIME_SERIES_DEFAULT_DAYS,
+                        TIME_SERIES_GRANULARITIES, TIME_SERIES_MAX_DAYS)
+from .repositories import TIME_SERIES_GROUPS
 from users.models import Subscription, User
 
 
@@ -35,7 +42,15 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        """Проверка подписки на пользователя."""
+        """Проверка подписки на пользователя.
+
+        Списки пользователей получают признак аннотацией в том же
+        запросе (MyUserViewSet.get_queryset); отдельный запрос нужен
+        только объекту без аннотации.
+        """
+        annotated = getattr(obj, 'is_subscribed', None)
+        if annotated is not None:
+            return annotated
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return Subscription.objects.filter(
@@ -65,7 +80,7 @@ class TypeSerializer(serializers.ModelSerializer):
     """Сериализатор для типов операций."""
     class Meta:
         model = Type
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'sign')
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -118,12 +133,45 @@ class SubcategorySerializer(serializers.ModelSerializer):
         return representation
 
 
+class CatalogRelatedField(serializers.PrimaryKeyRelatedField):
+    """Ссылка на справочник, проверяемая по снимку каталога пользователя.
+
+    Вместо запроса к БД на каждое поле ID сверяется с кэшированным
+    снимком, а в validated_data попадает объект-заглушка с pk и ID
+    родительского справочника.
+    """
+
+    def __init__(self, catalog_key, parent_field=None, **kwargs):
+        self.catalog_key = catalog_key
+        self.parent_field = parent_field
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        owned = self.parent.catalog[self.catalog_key]
+        if pk not in owned:
+            self.fail('does_not_exist', pk_value=data)
+        instance = self.get_queryset().model(pk=pk)
+        if self.parent_field:
+            setattr(instance, self.parent_field, owned[pk])
+        return instance
+
+
 class MoneyFlowSerializer(serializers.ModelSerializer):
     """Сериализатор для денежных операций."""
-    status = serializers.PrimaryKeyRelatedField(queryset=Status.objects.none())
-    type = serializers.PrimaryKeyRelatedField(queryset=Type.objects.none())
-    category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.none())
-    subcategory = serializers.PrimaryKeyRelatedField(queryset=Subcategory.objects.none())
+    status = CatalogRelatedField('statuses', queryset=Status.objects.all())
+    type = CatalogRelatedField('types', queryset=Type.objects.all())
+    category = CatalogRelatedField(
+        'categories', 'type_id', queryset=Category.objects.all()
+    )
+    subcategory = CatalogRelatedField(
+        'subcategories', 'category_id', queryset=Subcategory.objects.all()
+    )
 
     class Meta:
         model = MoneyFlow
@@ -138,15 +186,39 @@ class MoneyFlowSerializer(serializers.ModelSerializer):
             'comment'
         )
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def validate(self, attrs):
+        """Согласованность типа, категории и подкатегории.
+
+        ID родителей берутся из снимка каталога (см. CatalogRelatedField),
+        при частичном обновлении недостающие поля - из операции.
+        """
+        def current(name):
+            if name in attrs:
+                return attrs[name]
+            return getattr(self.instance, name, None)
+
+        type_obj = current('type')
+        category = current('category')
+        subcategory = current('subcategory')
+        errors = {}
+        if (subcategory is not None and category is not None
+                and subcategory.category_id != category.pk):
+            errors['subcategory'] = [
+                'Подкатегория не относится к выбранной категории'
+            ]
+        if (category is not None and type_obj is not None
+                and category.type_id != type_obj.pk):
+            errors['category'] = ['Категория не относится к выбранному типу']
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    @cached_property
+    def catalog(self):
+        """Снимок справочников пользователя; один на весь список."""
+        from .services import CatalogService
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            # Фильтруем справочники по владению пользователем
-            self.fields['status'].queryset = Status.objects.filter(owners__user=request.user).distinct()
-            self.fields['type'].queryset = Type.objects.filter(owners__user=request.user).distinct()
-            self.fields['category'].queryset = Category.objects.filter(owners__user=request.user).distinct()
-            self.fields['subcategory'].queryset = Subcategory.objects.filter(owners__user=request.user).distinct()
+        return CatalogService().get_catalog(request.user if request else None)
 
     def to_representation(self, instance):
         """Добавление имен связанных объектов в представление."""
@@ -161,6 +233,139 @@ class MoneyFlowSerializer(serializers.ModelSerializer):
         return representation
 
 
+class MoneyFlowListSerializer(serializers.BaseSerializer):
+    """Сериализатор чтения списка операций по проекции values().
+
+    Формирует тот же JSON, что и MoneyFlowSerializer, но без вложенных
+    сериализаторов и запросов к справочникам на каждую строку.
+    """
+    projection = (
+        'id',
+        'created_at',
+        'status_id',
+        'status__name',
+        'status__description',
+        'type_id',
+        'type__name',
+        'type__sign',
+        'category_id',
+        'category__name',
+        'category__type_id',
+        'category__type__name',
+        'subcategory_id',
+        'subcategory__name',
+        'subcategory__category_id',
+        'subcategory__category__name',
+        'amount',
+        'comment',
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = MoneyFlowSerializer().fields
+        self.created_at_to_representation = fields['created_at'].to_representation
+        self.amount_to_representation = fields['amount'].to_representation
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'created_at': self.created_at_to_representation(row['created_at']),
+            'status': {
+                'id': row['status_id'],
+                'name': row['status__name'],
+                'description': row['status__description'],
+            },
+            'type': {
+                'id': row['type_id'],
+                'name': row['type__name'],
+                'sign': row['type__sign'],
+            },
+            'category': {
+                'id': row['category_id'],
+                'name': row['category__name'],
+                'type': row['category__type_id'],
+                'type_name': row['category__type__name'],
+            },
+            'subcategory': {
+                'id': row['subcategory_id'],
+                'name': row['subcategory__name'],
+                'category': row['subcategory__category_id'],
+                'category_name': row['subcategory__category__name'],
+            },
+            'amount': self.amount_to_representation(row['amount']),
+            'comment': row['comment'],
+        }
+
+
+class PeriodQuerySerializer(serializers.Serializer):
+    """Период аналитического запроса; по умолчанию последний год."""
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate(self, data):
+        end_date = data.setdefault('end_date', date.today())
+        start_date = data.setdefault(
+            'start_date', end_date - timedelta(days=TIME_SERIES_DEFAULT_DAYS)
+        )
+        if start_date > end_date:
+            raise serializers.ValidationError(
+                'Начало периода не может быть позже конца'
+            )
+        if (end_date - start_date).days > TIME_SERIES_MAX_DAYS:
+            raise serializers.ValidationError(
+                f'Период не может быть длиннее {TIME_SERIES_MAX_DAYS} дней'
+            )
+        return data
+
+
+class TimeSeriesQuerySerializer(PeriodQuerySerializer):
+    """Параметры запроса временного ряда операций."""
+    granularity = serializers.ChoiceField(
+        choices=TIME_SERIES_GRANULARITIES,
+        default='day'
+    )
+    group_by = serializers.ChoiceField(
+        choices=tuple(TIME_SERIES_GROUPS),
+        required=False
+    )
+
+
+class BalanceQuerySerializer(PeriodQuerySerializer):
+    """Параметры запроса нарастающего баланса."""
+    by_status = serializers.BooleanField(default=False)
+
+
+class DistributionQuerySerializer(PeriodQuerySerializer):
+    """Параметры запроса распределения сумм операций."""
+    bins = serializers.IntegerField(
+        min_value=1,
+        max_value=DISTRIBUTION_MAX_BINS,
+        default=DISTRIBUTION_DEFAULT_BINS
+    )
+
+
+class MonthlyReportQuerySerializer(serializers.Serializer):
+    """Параметры запроса отчета по месяцам (ГГГГ-ММ)."""
+    start_month = serializers.DateField(input_formats=['%Y-%m'], required=False)
+    end_month = serializers.DateField(input_formats=['%Y-%m'], required=False)
+
+    def validate(self, data):
+        current_month = date.today().replace(day=1)
+        end_month = data.setdefault('end_month', current_month)
+        start_month = data.setdefault('start_month', end_month)
+        months = ((end_month.year - start_month.year) * 12
+                  + end_month.month - start_month.month + 1)
+        if months < 1:
+            raise serializers.ValidationError(
+                'Начало периода не может быть позже конца'
+            )
+        if months > MONTHLY_REPORT_MAX_MONTHS:
+            raise serializers.ValidationError(
+                f'Период не может быть длиннее {MONTHLY_REPORT_MAX_MONTHS} месяцев'
+            )
+        return data
+
+
 class SubscribeSerializer(serializers.ModelSerializer):
     """Сериализатор для подписок."""
     
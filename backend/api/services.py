@@ -1,11 +1,28 @@
-from typing import Dict, List, Optional
-from decimal import Decimal
-from datetime import date, datetime
+import csv
+import io
+import json
+from typing import Dict, Iterable, Iterator, List, Optional
+from decimal import Decimal, InvalidOperation
+from datetime import date, datetime, timedelta
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Prefetch
 from django.core.exceptions import ValidationError
 
+from . import analytics
+from .cache import VersionCounter, money_flow_versions, report_cache
+from .metrics import cache_requests
+from .constants import (CATALOG_CACHE_TIMEOUT, DISTRIBUTION_DEFAULT_BINS,
+                        DISTRIBUTION_QUANTILES, DISTRIBUTION_ROLLING_WINDOWS,
+                        EXPORT_CHUNK_SIZE, IMPORT_CHUNK_SIZE,
+                        IMPORT_MAX_REPORTED_ERRORS)
 from .repositories import MoneyFlowRepository, CategoryRepository
-from .models import MoneyFlow, Category, Subcategory
+from .models import (MoneyFlow, Status, Type, Category, Subcategory,
+                     StatusOwnership, TypeOwnership,
+                     CategoryOwnership, SubcategoryOwnership)
 
 
 class MoneyFlowService:
@@ -22,12 +39,12 @@ class MoneyFlowService:
             if data.get('subcategory') and data.get('category'):
                 subcategory = data['subcategory']
                 category = data['category']
-                if subcategory.category != category:
+                if subcategory.category_id != category.id:
                     raise ValidationError(
                         'Подкатегория должна принадлежать выбранной категории'
                     )
             
-            if data.get('amount') and data['amount'] <= 0:
+            if data.get('amount') is not None and data['amount'] <= 0:
                 raise ValidationError('Сумма должна быть больше 0')
             
             return self.repository.create(**data)
@@ -43,12 +60,12 @@ class MoneyFlowService:
             if data.get('subcategory') and data.get('category'):
                 subcategory = data['subcategory']
                 category = data['category']
-                if subcategory.category != category:
+                if subcategory.category_id != category.id:
                     raise ValidationError(
                         'Подкатегория должна принадлежать выбранной категории'
                     )
             
-            if data.get('amount') and data['amount'] <= 0:
+            if data.get('amount') is not None and data['amount'] <= 0:
                 raise ValidationError('Сумма должна быть больше 0')
             
             if 'user' in data:
@@ -65,37 +82,69 @@ class MoneyFlowService:
         if filters.get('end_date'):
             queryset = queryset.filter(created_at__lte=filters['end_date'])
         
-        if filters.get('status'):
-            queryset = queryset.filter(status__name__icontains=filters['status'])
-        
-        if filters.get('type'):
-            queryset = queryset.filter(type__name__icontains=filters['type'])
-        
-        if filters.get('category'):
-            queryset = queryset.filter(category__name__icontains=filters['category'])
+        for field in ('status', 'type', 'category', 'subcategory'):
+            if filters.get(f'{field}_id'):
+                queryset = queryset.filter(
+                    **{f'{field}_id': filters[f'{field}_id']}
+                )
+            if filters.get(field):
+                queryset = self.repository.filter_by_reference_name(
+                    queryset, field, filters[field]
+                )
         
         return queryset.order_by('-created_at')
     
     def get_statistics_report(self, user, start_date=None, end_date=None) -> Dict:
-        """Получение отчета по статистике операций для конкретного пользователя."""
-        queryset = self.repository.get_by_date_range(user, start_date, end_date)
-        
+        """Получение отчета по статистике операций для конкретного пользователя.
+
+        Результат кэшируется в report_cache до следующей записи операций.
+        """
+        return report_cache.get_or_compute(
+            user, 'statistics',
+            {'start_date': start_date, 'end_date': end_date},
+            lambda: self.build_statistics_report(user, start_date, end_date)
+        )
+
+    def build_statistics_report(self, user, start_date=None, end_date=None) -> Dict:
+        """Расчет отчета по статистике операций.
+
+        Для пользователя отчет строится по дневным агрегатам; исходные
+        операции сканируются только для общего отчета без пользователя,
+        так как операции без владельца в агрегаты не попадают.
+        """
         from django.db.models import Sum, Count, Avg
         
-        stats = queryset.aggregate(
-            total_count=Count('id'),
-            total_amount=Sum('amount'),
-            average_amount=Avg('amount')
-        )
+        if user is None:
+            queryset = self.repository.get_by_date_range(user, start_date, end_date)
+            stats = queryset.aggregate(
+                total_count=Count('id'),
+                total_amount=Sum('amount'),
+                average_amount=Avg('amount')
+            )
+            count, amount = Count('id'), Sum('amount')
+        else:
+            queryset = self.repository.rollups.get_by_date_range(
+                user, start_date, end_date
+            )
+            stats = queryset.aggregate(
+                total_count=Sum('count'),
+                total_amount=Sum('total')
+            )
+            stats['total_count'] = stats['total_count'] or 0
+            stats['average_amount'] = (
+                stats['total_amount'] / stats['total_count']
+                if stats['total_count'] else None
+            )
+            count, amount = Sum('count'), Sum('total')
         
         type_stats = queryset.values('type__name').annotate(
-            count=Count('id'),
-            total=Sum('amount')
+            count=count,
+            total=amount
         ).order_by('-total')
         
         category_stats = queryset.values('category__name').annotate(
-            count=Count('id'),
-            total=Sum('amount')
+            count=count,
+            total=amount
         ).order_by('-total')
         
         return {
@@ -109,7 +158,12 @@ class MoneyFlowService:
         }
     
     def bulk_create_money_flows(self, flows_data: List[Dict], user) -> List[MoneyFlow]:
-        """Массовое создание денежных операций для конкретного пользователя."""
+        """Массовое создание денежных операций для конкретного пользователя.
+
+        Начиная с MONEY_FLOW_COPY_THRESHOLD строк операции записываются
+        через COPY: без многомегабайтного INSERT с параметрами на каждое
+        поле. ID созданных операций проставляются в возвращаемые объекты.
+        """
         with transaction.atomic():
             validated_flows = []
             for flow_data in flows_data:
@@ -118,17 +172,441 @@ class MoneyFlowService:
                 if flow_data.get('subcategory') and flow_data.get('category'):
                     subcategory = flow_data['subcategory']
                     category = flow_data['category']
-                    if subcategory.category != category:
+                    if subcategory.category_id != category.id:
                         raise ValidationError(
                             f'Подкатегория {subcategory.name} не принадлежит категории {category.name}'
                         )
                 
-                if flow_data.get('amount') and flow_data['amount'] <= 0:
+                if flow_data.get('amount') is not None and flow_data['amount'] <= 0:
                     raise ValidationError('Все суммы должны быть больше 0')
                 
                 validated_flows.append(MoneyFlow(**flow_data))
-            
-            return MoneyFlow.objects.bulk_create(validated_flows)
+
+            if len(validated_flows) < settings.MONEY_FLOW_COPY_THRESHOLD:
+                return self.repository.bulk_create(validated_flows)
+            columns = self.repository.COPY_COLUMNS
+            ids = self.repository.copy_create([
+                tuple(getattr(flow, column) for column in columns)
+                for flow in validated_flows
+            ])
+            for flow, pk in zip(validated_flows, ids):
+                flow.pk = pk
+                flow._state.adding = False
+            return validated_flows
+
+
+def read_csv_rows(file) -> Iterator[Dict]:
+    """Построчное чтение CSV-файла с заголовком."""
+    yield from csv.DictReader(
+        io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    )
+
+
+def read_ndjson_rows(file) -> Iterator[Optional[Dict]]:
+    """Построчное чтение NDJSON; для невалидной строки отдается None."""
+    for line in io.TextIOWrapper(file, encoding='utf-8-sig'):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+class ImportReferences:
+    """Справочники пользователя для импорта: поиск по ID или названию."""
+
+    def __init__(self, user):
+        self.statuses = self._index(
+            StatusOwnership.objects.filter(user=user)
+            .values_list('status_id', 'status__name')
+        )
+        self.types = self._index(
+            TypeOwnership.objects.filter(user=user)
+            .values_list('type_id', 'type__name')
+        )
+        self.categories = self._index(
+            CategoryOwnership.objects.filter(user=user)
+            .values_list('category_id', 'category__name', 'category__type_id')
+        )
+        self.subcategories = self._index(
+            SubcategoryOwnership.objects.filter(user=user).values_list(
+                'subcategory_id', 'subcategory__name', 'subcategory__category_id'
+            )
+        )
+
+    @staticmethod
+    def _index(rows):
+        by_id, by_name = {}, {}
+        for pk, name, *parent in rows:
+            by_id[pk] = parent[0] if parent else None
+            by_name.setdefault(name.casefold(), []).append(pk)
+        return by_id, by_name
+
+    @staticmethod
+    def resolve(index, value, parent_id=None) -> int:
+        """ID справочника по ID или названию с учетом родителя.
+
+        Число JSON - всегда ID. Строка из цифр сначала ищется среди
+        названий (категория «2024»), и только если такого названия нет,
+        считается ID.
+        """
+        by_id, by_name = index
+        if isinstance(value, bool):
+            raise ValueError('Некорректный справочник')
+        if isinstance(value, int):
+            if value not in by_id:
+                raise ValueError('Недоступный справочник')
+            return value
+        text = str(value).strip()
+        candidates = by_name.get(text.casefold(), [])
+        if not candidates and text.isdigit():
+            if int(text) not in by_id:
+                raise ValueError('Недоступный справочник')
+            return int(text)
+        if parent_id is not None and len(candidates) > 1:
+            candidates = [pk for pk in candidates if by_id[pk] == parent_id]
+        if not candidates:
+            raise ValueError('Справочник не найден')
+        if len(candidates) > 1:
+            raise ValueError('Неоднозначное название справочника')
+        return candidates[0]
+
+
+class MoneyFlowImportService:
+    """Потоковый импорт денежных операций из CSV и NDJSON.
+
+    Строки читаются и проверяются порциями по IMPORT_CHUNK_SIZE,
+    каждая порция записывается отдельной транзакцией, поэтому память
+    не растет с размером файла. Ошибочные строки не прерывают импорт
+    и попадают в отчет.
+    """
+    readers = {
+        'csv': read_csv_rows,
+        'ndjson': read_ndjson_rows,
+    }
+
+    def __init__(self, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.repository = MoneyFlowRepository()
+        self.chunk_size = chunk_size
+
+    def import_file(self, file, file_format: str, user) -> Dict:
+        return self.import_rows(self.readers[file_format](file), user)
+
+    def import_rows(self, rows: Iterable[Optional[Dict]], user) -> Dict:
+        started = perf_counter()
+        references = ImportReferences(user)
+        total = created = error_count = 0
+        errors, chunk = [], []
+
+        for number, row in enumerate(rows, start=1):
+            total = number
+            try:
+                chunk.append(self.build_flow(row, references, user))
+            except ValidationError as error:
+                error_count += 1
+                if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                    errors.append({'row': number, 'errors': error.message_dict})
+            if len(chunk) >= self.chunk_size:
+                created += len(self.repository.bulk_create(chunk))
+                chunk = []
+        if chunk:
+            created += len(self.repository.bulk_create(chunk))
+
+        elapsed = perf_counter() - started
+        return {
+            'rows': total,
+            'created': created,
+            'error_count': error_count,
+            'errors': errors,
+            'elapsed': round(elapsed, 3),
+            'rows_per_second': round(total / elapsed) if elapsed else total,
+        }
+
+    @staticmethod
+    def build_flow(row, references: ImportReferences, user) -> MoneyFlow:
+        """Проверка строки файла и построение несохраненной операции."""
+        if not isinstance(row, dict):
+            raise ValidationError({'row': 'Некорректная строка'})
+        errors, values = {}, {}
+
+        try:
+            values['created_at'] = date.fromisoformat(
+                str(row.get('created_at') or '').strip()
+            )
+        except ValueError:
+            errors['created_at'] = 'Дата должна быть в формате ГГГГ-ММ-ДД'
+
+        try:
+            amount = Decimal(str(row.get('amount') or '').strip())
+            if not amount.is_finite() or amount <= 0:
+                raise InvalidOperation
+            if amount != amount.quantize(Decimal('0.01')) or amount >= 10 ** 8:
+                raise InvalidOperation
+            values['amount'] = amount
+        except InvalidOperation:
+            errors['amount'] = 'Сумма должна быть положительным числом'
+
+        for field, index in (('status', references.statuses),
+                             ('type', references.types)):
+            try:
+                values[f'{field}_id'] = references.resolve(
+                    index, row.get(field) or ''
+                )
+            except ValueError as error:
+                errors[field] = str(error)
+        try:
+            values['category_id'] = references.resolve(
+                references.categories, row.get('category') or '',
+                values.get('type_id')
+            )
+            by_id, _ = references.categories
+            if ('type_id' in values
+                    and by_id[values['category_id']] != values['type_id']):
+                raise ValueError('Категория не относится к выбранному типу')
+        except ValueError as error:
+            errors['category'] = str(error)
+        try:
+            values['subcategory_id'] = references.resolve(
+                references.subcategories, row.get('subcategory') or '',
+                values.get('category_id')
+            )
+            by_id, _ = references.subcategories
+            if by_id[values['subcategory_id']] != values.get('category_id'):
+                raise ValueError(
+                    'Подкатегория должна принадлежать выбранной категории'
+                )
+        except ValueError as error:
+            errors['subcategory'] = str(error)
+
+        if errors:
+            raise ValidationError(errors)
+        return MoneyFlow(
+            user=user,
+            comment=str(row.get('comment') or ''),
+            **values
+        )
+
+
+class _LineBuffer:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class MoneyFlowExportService:
+    """Потоковая выгрузка денежных операций в CSV и NDJSON.
+
+    Строки читаются серверным курсором порциями по EXPORT_CHUNK_SIZE из
+    плоской проекции values_list, поэтому память не зависит от объема
+    выгрузки, а первые байты уходят клиенту сразу. Колонки совпадают
+    с форматом импорта.
+    """
+    columns = (
+        'id',
+        'created_at',
+        'status',
+        'type',
+        'category',
+        'subcategory',
+        'amount',
+        'comment',
+    )
+    projection = (
+        'id',
+        'created_at',
+        'status__name',
+        'type__name',
+        'category__name',
+        'subcategory__name',
+        'amount',
+        'comment',
+    )
+    content_types = {
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson; charset=utf-8',
+    }
+
+    def __init__(self, chunk_size: int = EXPORT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def iter_rows(self, queryset) -> Iterator[tuple]:
+        return queryset.order_by('-created_at', 'id').values_list(
+            *self.projection
+        ).iterator(chunk_size=self.chunk_size)
+
+    def export(self, queryset, file_format: str) -> Iterator[str]:
+        writer = getattr(self, f'write_{file_format}')
+        return self._batched(writer(self.iter_rows(queryset)))
+
+    def write_csv(self, rows) -> Iterator[str]:
+        writer = csv.writer(_LineBuffer())
+        yield writer.writerow(self.columns)
+        for row in rows:
+            yield writer.writerow(row)
+
+    def write_ndjson(self, rows) -> Iterator[str]:
+        for pk, created_at, *names, amount, comment in rows:
+            yield json.dumps(
+                dict(zip(self.columns, (
+                    pk, created_at.isoformat(), *names, str(amount), comment
+                ))),
+                ensure_ascii=False
+            ) + '\n'
+
+    def _batched(self, lines) -> Iterator[str]:
+        """Склейка строк в блоки, чтобы не отдавать ответ по строке."""
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= self.chunk_size:
+                yield ''.join(batch)
+                batch = []
+        if batch:
+            yield ''.join(batch)
+
+
+class CatalogService:
+    """Снимок справочников пользователя для валидации операций.
+
+    Снимок хранит ID принадлежащих пользователю статусов, типов,
+    категорий и подкатегорий вместе со связями подкатегория -> категория
+    -> тип. Он кэшируется под ключом с версией каталога пользователя;
+    версия увеличивается при каждом изменении владения справочниками.
+    """
+
+    versions = VersionCounter('catalog-version:{owner}')
+    catalog_key = 'catalog:{user_id}:{version}'
+    tree_key = 'catalog-tree:{user_id}:{version}'
+
+    def get_version(self, user) -> int:
+        """Текущая версия каталога пользователя."""
+        return self.versions.get(user.pk)
+
+    def bump_version(self, user) -> None:
+        """Сброс снимка после изменения справочников пользователя."""
+        self.bump_versions([user.pk])
+
+    def bump_owners_version(self, instance) -> None:
+        """Сброс снимков всех владельцев справочника."""
+        self.bump_versions(self.owner_ids(instance))
+
+    @staticmethod
+    def owner_ids(instance) -> List[int]:
+        """Владельцы справочника; при удалении их нужно взять заранее."""
+        return list(instance.owners.values_list('user_id', flat=True))
+
+    def bump_versions(self, user_ids) -> None:
+        """Сброс снимков пользователей сразу и после фиксации транзакции.
+
+        Как и bump_money_flow_versions: снимок или дерево, собранные
+        конкурентным чтением до коммита под уже новой версией, не
+        переживут коммит.
+        """
+        user_ids = list(user_ids)
+
+        def bump():
+            for user_id in user_ids:
+                self.versions.bump(user_id)
+
+        bump()
+        transaction.on_commit(bump)
+
+    def get_catalog(self, user) -> Dict:
+        """Снимок справочников пользователя (не более одной выборки)."""
+        if user is None or not user.is_authenticated:
+            return self.build_catalog(None)
+        key = self.catalog_key.format(
+            user_id=user.pk, version=self.get_version(user)
+        )
+        catalog = cache.get(key)
+        if catalog is None:
+            cache_requests.labels('catalog', 'miss').inc()
+            catalog = self.build_catalog(user)
+            cache.set(key, catalog, timeout=CATALOG_CACHE_TIMEOUT)
+        else:
+            cache_requests.labels('catalog', 'shared').inc()
+        return catalog
+
+    def get_tree(self, user, version: Optional[int] = None) -> Dict:
+        """Дерево справочников пользователя: тип -> категория -> подкатегория.
+
+        Версию стоит передавать ту же, по которой построен ETag ответа:
+        дерево кэшируется под ней и при неизменном каталоге не
+        обращается к БД.
+        """
+        if version is None:
+            version = self.get_version(user)
+        key = self.tree_key.format(user_id=user.pk, version=version)
+        tree = cache.get(key)
+        if tree is None:
+            cache_requests.labels('catalog_tree', 'miss').inc()
+            tree = self.build_tree(user)
+            cache.set(key, tree, timeout=CATALOG_CACHE_TIMEOUT)
+        else:
+            cache_requests.labels('catalog_tree', 'shared').inc()
+        return tree
+
+    @staticmethod
+    def build_tree(user) -> Dict:
+        """Дерево справочников за четыре запроса, по одному на уровень.
+
+        Категории и подкатегории, родитель которых пользователю не
+        принадлежит, в дерево не попадают: их нельзя выбрать в форме.
+        """
+        types = {
+            row['id']: {**row, 'categories': []}
+            for row in Type.objects.filter(owners__user=user)
+            .values('id', 'name', 'sign')
+        }
+        categories = {}
+        for row in (Category.objects.filter(owners__user=user)
+                    .values('id', 'name', 'type_id')):
+            parent = types.get(row.pop('type_id'))
+            if parent is not None:
+                categories[row['id']] = {**row, 'subcategories': []}
+                parent['categories'].append(categories[row['id']])
+        for row in (Subcategory.objects.filter(owners__user=user)
+                    .values('id', 'name', 'category_id')):
+            parent = categories.get(row.pop('category_id'))
+            if parent is not None:
+                parent['subcategories'].append(row)
+        return {
+            'statuses': list(
+                Status.objects.filter(owners__user=user)
+                .values('id', 'name', 'description')
+            ),
+            'types': list(types.values()),
+        }
+
+    @staticmethod
+    def build_catalog(user) -> Dict:
+        if user is None:
+            return {
+                'statuses': set(),
+                'types': set(),
+                'categories': {},
+                'subcategories': {},
+            }
+        return {
+            'statuses': set(
+                StatusOwnership.objects.filter(user=user)
+                .values_list('status_id', flat=True)
+            ),
+            'types': set(
+                TypeOwnership.objects.filter(user=user)
+                .values_list('type_id', flat=True)
+            ),
+            'categories': dict(
+                CategoryOwnership.objects.filter(user=user)
+                .values_list('category_id', 'category__type_id')
+            ),
+            'subcategories': dict(
+                SubcategoryOwnership.objects.filter(user=user)
+                .values_list('subcategory_id', 'subcategory__category_id')
+            ),
+        }
 
 
 class CategoryService:
@@ -152,12 +630,22 @@ class CategoryService:
             return category
     
     def get_categories_with_subcategories(self, type_id: int = None):
-        """Получение категорий с подкатегориями."""
+        """Получение категорий с подкатегориями.
+
+        Подкатегории загружаются одним запросом на все категории.
+        """
         categories = self.repository.get_by_type(type_id) if type_id else self.repository.get_all()
+        categories = categories.prefetch_related(Prefetch(
+            'subcategories',
+            queryset=Subcategory.objects.only('id', 'name', 'category_id')
+        ))
         
         result = []
         for category in categories:
-            subcategories = list(category.subcategories.all().values('id', 'name'))
+            subcategories = [
+                {'id': subcategory.id, 'name': subcategory.name}
+                for subcategory in category.subcategories.all()
+            ]
             result.append({
                 'id': category.id,
                 'name': category.name,
@@ -177,36 +665,257 @@ class AnalyticsService:
     def __init__(self):
         self.money_flow_repository = MoneyFlowRepository()
     
-    def get_monthly_report(self, year: int, month: int) -> Dict:
-        """Получение месячного отчета."""
-        from calendar import monthrange
-        
-        start_date = date(year, month, 1)
-        end_date = date(year, month, monthrange(year, month)[1])
-        
-        return self.money_flow_repository.get_statistics()
-    
-    def get_trend_analysis(self, months: int = 6) -> Dict:
-        """Анализ трендов за последние месяцы."""
-        from datetime import timedelta
+    def get_monthly_report(self, user, year: int, month: int) -> Dict:
+        """Получение месячного отчета пользователя."""
+        month_start = date(year, month, 1)
+        return self.get_period_report(user, month_start, month_start)
+
+    def get_period_report(self, user, start_month: date, end_month: date) -> Dict:
+        """Отчет за несколько месяцев, собранный из месячных снимков.
+
+        Закрытые месяцы читаются из снимков одним запросом; недостающие
+        снимки считаются по дневным агрегатам и сохраняются. Текущий
+        месяц всегда считается заново.
+        """
+        months = []
+        month = start_month
+        while month <= end_month:
+            months.append(month)
+            month = (month + timedelta(days=32)).replace(day=1)
+
+        snapshots = self.money_flow_repository.rollups.snapshots
+        stored = snapshots.get_by_months(user, months)
+        reports = []
+        for month in months:
+            report = stored.get(month)
+            if report is None:
+                report = self.build_month_snapshot(user, month)
+            reports.append((month, report))
+        return self.combine_month_snapshots(reports, start_month, end_month)
+
+    def build_month_snapshot(self, user, month: date) -> Dict:
+        """Расчет разбивки месяца по дневным агрегатам.
+
+        Снимок закрытого месяца сохраняется, только если за время
+        расчета не было записей операций пользователя: иначе он мог
+        быть посчитан по уже устаревшим данным.
+        """
+        from django.db.models import Sum
+
+        version = money_flow_versions.get(user.pk)
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        rollups = self.money_flow_repository.rollups.get_by_date_range(
+            user, month, next_month - timedelta(days=1)
+        )
+        report = {
+            'by_type': list(rollups.values('type_id', 'type__name').annotate(
+                count=Sum('count'),
+                total=Sum('total')
+            ).order_by('type_id')),
+            'by_category': list(rollups.values(
+                'category_id', 'category__name'
+            ).annotate(
+                count=Sum('count'),
+                total=Sum('total')
+            ).order_by('category_id')),
+        }
+        closed = next_month <= date.today()
+        if closed and money_flow_versions.get(user.pk) == version:
+            self.money_flow_repository.rollups.snapshots.save(
+                user, month, report
+            )
+        return report
+
+    @staticmethod
+    def combine_month_snapshots(reports, start_month: date,
+                                end_month: date) -> Dict:
+        """Сложение месячных разбивок в отчет за период."""
+        groups = {'by_type': {}, 'by_category': {}}
+        months = []
+        for month, report in reports:
+            month_count, month_total = 0, Decimal('0')
+            for name, combined in groups.items():
+                key = 'type_id' if name == 'by_type' else 'category_id'
+                for row in report[name]:
+                    total = Decimal(row['total'])
+                    item = combined.setdefault(
+                        row[key], {**row, 'count': 0, 'total': Decimal('0')}
+                    )
+                    item['count'] += row['count']
+                    item['total'] += total
+                    if name == 'by_type':
+                        month_count += row['count']
+                        month_total += total
+            months.append({
+                'month': month,
+                'total_count': month_count,
+                'total_amount': month_total,
+            })
+
+        total_count = sum(month['total_count'] for month in months)
+        total_amount = sum(
+            (month['total_amount'] for month in months), Decimal('0')
+        )
+        return {
+            'period': {'start_month': start_month, 'end_month': end_month},
+            'summary': {
+                'total_count': total_count,
+                'total_amount': total_amount,
+                'average_amount': (
+                    total_amount / total_count if total_count else None
+                ),
+            },
+            'by_type': sorted(
+                groups['by_type'].values(), key=lambda row: -row['total']
+            ),
+            'by_category': sorted(
+                groups['by_category'].values(), key=lambda row: -row['total']
+            ),
+            'months': months,
+        }
+
+    def snapshot_closed_months(self, user=None) -> int:
+        """Расчет недостающих снимков закрытых месяцев; число новых снимков."""
+        from django.db.models.functions import TruncMonth
+        from .models import MoneyFlowDailyRollup, MoneyFlowMonthlySnapshot
+        from users.models import User
+
+        current_month = date.today().replace(day=1)
+        rollups = MoneyFlowDailyRollup.objects.filter(day__lt=current_month)
+        snapshots = MoneyFlowMonthlySnapshot.objects.all()
+        if user is not None:
+            rollups = rollups.filter(user=user)
+            snapshots = snapshots.filter(user=user)
+        pending = set(
+            rollups.annotate(month=TruncMonth('day')).values_list(
+                'user_id', 'month'
+            ).distinct()
+        ) - set(snapshots.values_list('user_id', 'month'))
+
+        users = User.objects.in_bulk({user_id for user_id, _ in pending})
+        for user_id, month in sorted(pending):
+            self.build_month_snapshot(users[user_id], month)
+        return len(pending)
+
+    def get_trend_analysis(self, user, months: int = 6) -> Dict:
+        """Помесячный тренд операций пользователя за последние месяцы.
+
+        Результат кэшируется в report_cache до следующей записи операций
+        пользователя.
+        """
         from dateutil.relativedelta import relativedelta
         
         end_date = date.today()
         start_date = end_date - relativedelta(months=months)
         
-        queryset = self.money_flow_repository.get_by_date_range(start_date, end_date)
-        
-        from django.db.models import Sum, Count
-        from django.db.models.functions import TruncMonth
-        
-        monthly_data = queryset.annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(
-            count=Count('id'),
-            total=Sum('amount')
-        ).order_by('month')
+        def compute():
+            queryset = self.money_flow_repository.get_by_date_range(
+                user=user, start_date=start_date, end_date=end_date
+            )
+            
+            from django.db.models import Sum, Count
+            from django.db.models.functions import TruncMonth
+            
+            monthly_data = queryset.annotate(
+                month=TruncMonth('created_at')
+            ).values('month').annotate(
+                count=Count('id'),
+                total=Sum('amount')
+            ).order_by('month')
+            
+            return {
+                'period': f'{start_date} - {end_date}',
+                'monthly_breakdown': list(monthly_data)
+            }
         
-        return {
-            'period': f'{start_date} - {end_date}',
-            'monthly_breakdown': list(monthly_data)
-        } 
\ No newline at end of file
+        return report_cache.get_or_compute(
+            user, 'trend', {'start_date': start_date, 'end_date': end_date},
+            compute
+        )
+
+    def get_time_series(self, user, start_date: date, end_date: date,
+                        granularity: str = 'day',
+                        group_by: Optional[str] = None) -> Dict:
+        """Временной ряд операций пользователя с нулями в пустых периодах.
+
+        Ряд считается одним запросом к дневным агрегатам и кэшируется
+        в report_cache до следующей записи операций пользователя.
+        """
+        params = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'granularity': granularity,
+            'group_by': group_by,
+        }
+
+        def compute():
+            rows = self.money_flow_repository.rollups.get_time_series(
+                user, start_date, end_date, granularity, group_by
+            )
+            series = []
+            for key, name, period, count, total in rows:
+                if not series or series[-1]['id'] != key:
+                    series.append({'id': key, 'name': name, 'points': []})
+                series[-1]['points'].append(
+                    {'period': period, 'count': count, 'total': total}
+                )
+            return {**params, 'series': series}
+
+        return report_cache.get_or_compute(user, 'time-series', params, compute)
+
+    def get_running_balance(self, user, start_date: date, end_date: date,
+                            by_status: bool = False) -> List[Dict]:
+        """Дневной нарастающий баланс доходов минус расходов.
+
+        Баланс считается в БД оконной функцией по дневным агрегатам и не
+        кэшируется: знак суммы задается типом операции и может меняться
+        без записи самих операций.
+        """
+        rows = self.money_flow_repository.rollups.get_running_balance(
+            user, start_date, end_date, by_status
+        )
+        series = []
+        for key, name, day, net, balance in rows:
+            if not series or series[-1]['id'] != key:
+                series.append({'id': key, 'name': name, 'points': []})
+            series[-1]['points'].append(
+                {'date': day, 'net': net, 'balance': balance}
+            )
+        return series
+
+    def get_distribution(self, user, start_date: date, end_date: date,
+                         bins: int = DISTRIBUTION_DEFAULT_BINS) -> Dict:
+        """Перцентили, гистограмма и скользящие средние сумм за период.
+
+        Операции читаются в массивы NumPy, метрики считаются векторно
+        (см. api/analytics.py); результат кэшируется в report_cache.
+        """
+        params = {'start_date': start_date, 'end_date': end_date, 'bins': bins}
+
+        def compute():
+            arrays = analytics.load_flow_arrays(
+                self.money_flow_repository.get_distribution_rows(
+                    user, start_date, end_date
+                )
+            )
+            by_category = analytics.grouped_percentiles(
+                arrays, DISTRIBUTION_QUANTILES
+            )
+            names = dict(Category.objects.filter(
+                id__in=[row['category_id'] for row in by_category]
+            ).values_list('id', 'name'))
+            for row in by_category:
+                row['category__name'] = names.get(row['category_id'])
+            return {
+                'period': {'start_date': start_date, 'end_date': end_date},
+                'summary': analytics.summary(arrays, DISTRIBUTION_QUANTILES),
+                'by_category': sorted(
+                    by_category, key=lambda row: -row['total']
+                ),
+                'histogram': analytics.histogram(arrays, bins),
+                'rolling': analytics.rolling_means(
+                    arrays, start_date, end_date, DISTRIBUTION_ROLLING_WINDOWS
+                ),
+            }
+
+        return report_cache.get_or_compute(user, 'distribution', params, compute)
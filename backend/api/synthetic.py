@@ -0,0 +1,234 @@
+"""Детерминированная генерация синтетических денежных операций.
+
+Операции строятся по шаблонам пользователей с частотами daily, weekly,
+monthly, quarterly и rarely. Генератор пользователя зависит только от
+seed и номера пользователя, поэтому одинаковые параметры дают одни и
+те же строки независимо от размера порции и числа пользователей.
+"""
+import random
+from datetime import date, timedelta
+from typing import Dict, Iterator, List
+
+from .constants import TYPE_SIGN_EXPENSE, TYPE_SIGN_INCOME, TYPE_SIGN_NEUTRAL
+from .models import (Category, CategoryOwnership, Status, StatusOwnership,
+                     Subcategory, SubcategoryOwnership, Type, TypeOwnership)
+
+STATUSES = {
+    'Активный': ('Подтвержденная операция', 90),
+    'В ожидании': ('Операция ожидает подтверждения', 5),
+    'Отменен': ('Отмененная операция', 3),
+    'Запланирован': ('Запланированная операция', 2),
+}
+TYPES = {
+    'Доход': TYPE_SIGN_INCOME,
+    'Расход': TYPE_SIGN_EXPENSE,
+    'Перевод': TYPE_SIGN_NEUTRAL,
+    'Инвестиции': TYPE_SIGN_EXPENSE,
+}
+CATEGORIES = {
+    'Доходы': ('Доход', ('Зарплата', 'Премия', 'Фриланс', 'Инвестиции',
+                         'Подарки')),
+    'Питание': ('Расход', ('Продукты', 'Рестораны', 'Кафе', 'Доставка еды')),
+    'Транспорт': ('Расход', ('Общественный транспорт', 'Такси', 'Бензин',
+                             'Парковка')),
+    'Жилье': ('Расход', ('Аренда', 'Коммунальные услуги', 'Ремонт',
+                         'Мебель')),
+    'Развлечения': ('Расход', ('Кино', 'Концерты', 'Игры', 'Хобби')),
+    'Здоровье': ('Расход', ('Врачи', 'Лекарства', 'Фитнес', 'Косметика')),
+    'Образование': ('Расход', ('Курсы', 'Книги', 'Конференции',
+                               'Сертификации')),
+}
+
+# Шаблоны: (категория, подкатегория, диапазон суммы, частота).
+PROFILES = {
+    'manager': (
+        ('Доходы', 'Зарплата', (80000, 120000), 'monthly'),
+        ('Доходы', 'Премия', (20000, 50000), 'quarterly'),
+        ('Жилье', 'Аренда', (30000, 35000), 'monthly'),
+        ('Питание', 'Продукты', (8000, 12000), 'weekly'),
+        ('Транспорт', 'Бензин', (3000, 5000), 'weekly'),
+        ('Питание', 'Рестораны', (2000, 8000), 'weekly'),
+    ),
+    'developer': (
+        ('Доходы', 'Зарплата', (100000, 150000), 'monthly'),
+        ('Доходы', 'Фриланс', (15000, 30000), 'monthly'),
+        ('Жилье', 'Коммунальные услуги', (5000, 8000), 'monthly'),
+        ('Питание', 'Доставка еды', (1500, 3000), 'weekly'),
+        ('Образование', 'Курсы', (5000, 15000), 'monthly'),
+        ('Развлечения', 'Игры', (1000, 3000), 'weekly'),
+    ),
+    'designer': (
+        ('Доходы', 'Фриланс', (50000, 80000), 'monthly'),
+        ('Доходы', 'Подарки', (3000, 10000), 'rarely'),
+        ('Питание', 'Кафе', (500, 1500), 'daily'),
+        ('Транспорт', 'Общественный транспорт', (2000, 3000), 'monthly'),
+        ('Здоровье', 'Косметика', (2000, 5000), 'monthly'),
+        ('Развлечения', 'Кино', (800, 1200), 'weekly'),
+    ),
+    'demo': (
+        ('Доходы', 'Зарплата', (45000, 55000), 'monthly'),
+        ('Питание', 'Продукты', (3000, 6000), 'weekly'),
+        ('Транспорт', 'Такси', (300, 800), 'weekly'),
+        ('Развлечения', 'Концерты', (1500, 3000), 'rarely'),
+    ),
+}
+PROFILE_NAMES = tuple(PROFILES)
+
+# Ожидаемое число операций шаблона в год: вероятность в подходящий
+# день, умноженная на число таких дней.
+FREQUENCY_WEIGHTS = {
+    'daily': 0.7 * 365,
+    'weekly': 0.8 * 52,
+    'monthly': 0.9 * 12,
+    'quarterly': 0.7 * 4,
+    'rarely': 0.05 * 365,
+}
+
+COMMENTS = {
+    'Зарплата': ('Зарплата за месяц', 'Основная зарплата',
+                 'Зарплата + переработки', 'Заработная плата'),
+    'Продукты': ('Закупка продуктов на неделю', 'Поход в супермаркет',
+                 'Продукты в Пятерочке', 'Еда на дом',
+                 'Овощи и фрукты на рынке'),
+    'Кафе': ('Кофе с коллегами', 'Обед в кафе рядом с работой',
+             'Встреча с друзьями в кафе', 'Кофе-брейк', 'Завтрак в кафе'),
+    'Такси': ('Поездка на работу', 'Такси домой после работы',
+              'Поездка в аэропорт', 'Такси в дождь', 'Срочная поездка'),
+    'Бензин': ('Заправка полного бака', 'Заправка на АЗС',
+               'Топливо для поездки', 'Заправка машины'),
+    'Рестораны': ('Ужин в ресторане', 'День рождения друга',
+                  'Романтический ужин', 'Деловой обед', 'Семейный ужин'),
+}
+
+
+def ensure_catalog() -> Dict:
+    """Справочники генератора; недостающие записи создаются."""
+    statuses = {}
+    for name, (description, _) in STATUSES.items():
+        statuses[name], _ = Status.objects.get_or_create(
+            name=name, defaults={'description': description}
+        )
+    types = {}
+    for name, sign in TYPES.items():
+        types[name], _ = Type.objects.get_or_create(
+            name=name, defaults={'sign': sign}
+        )
+    subcategories = {}
+    for category_name, (type_name, names) in CATEGORIES.items():
+        category, _ = Category.objects.get_or_create(
+            name=category_name, type=types[type_name]
+        )
+        for name in names:
+            subcategories[category_name, name], _ = (
+                Subcategory.objects.get_or_create(
+                    name=name, category=category
+                )
+            )
+    return {
+        'statuses': statuses,
+        'types': types,
+        'subcategories': subcategories,
+    }
+
+
+def grant_catalog(catalog: Dict, user_ids: List[int]) -> None:
+    """Справочники генератора в списках пользователей (my/...)."""
+    subcategories = catalog['subcategories'].values()
+    categories = {item.category_id for item in subcategories}
+    for model, field, ids in (
+        (StatusOwnership, 'status_id',
+         [item.id for item in catalog['statuses'].values()]),
+        (TypeOwnership, 'type_id',
+         [item.id for item in catalog['types'].values()]),
+        (CategoryOwnership, 'category_id', sorted(categories)),
+        (SubcategoryOwnership, 'subcategory_id',
+         [item.id for item in subcategories]),
+    ):
+        model.objects.bulk_create(
+            [model(user_id=user_id, **{field: pk})
+             for user_id in user_ids for pk in ids],
+            ignore_conflicts=True
+        )
+
+
+class MoneyFlowGenerator:
+    """Операции пользователей за период [start_date, end_date].
+
+    Шаблон операции выбирается пропорционально ожидаемой частоте, дата -
+    среди подходящих шаблону дней: любые для daily и rarely, вторники
+    для weekly, первые числа месяцев и кварталов для monthly и
+    quarterly.
+    """
+
+    def __init__(self, catalog: Dict, start_date: date, end_date: date,
+                 seed: int = 42):
+        self.seed = seed
+        days = [start_date + timedelta(days=offset)
+                for offset in range((end_date - start_date).days + 1)]
+        if not days:
+            raise ValueError('Пустой период генерации')
+        self.dates = {
+            'daily': days,
+            'rarely': days,
+            'weekly': [day for day in days if day.weekday() == 1] or days,
+            'monthly': [day for day in days if day.day == 1] or days,
+            'quarterly': [day for day in days
+                          if day.day == 1 and day.month in (1, 4, 7, 10)]
+            or days,
+        }
+        statuses = catalog['statuses']
+        self.statuses = [statuses[name].id for name in STATUSES]
+        self.status_weights = self._cumulative(
+            weight for _, weight in STATUSES.values()
+        )
+        self.templates = {}
+        for profile, templates in PROFILES.items():
+            rows = []
+            for category, name, amounts, frequency in templates:
+                subcategory = catalog['subcategories'][category, name]
+                rows.append((
+                    subcategory.category.type_id, subcategory.category_id,
+                    subcategory.id, amounts, self.dates[frequency],
+                    COMMENTS.get(name, (name,)),
+                ))
+            weights = self._cumulative(
+                FREQUENCY_WEIGHTS[template[3]] for template in templates
+            )
+            self.templates[profile] = rows, weights
+
+    @staticmethod
+    def _cumulative(weights) -> List[float]:
+        total, result = 0, []
+        for weight in weights:
+            total += weight
+            result.append(total)
+        return result
+
+    def flows(self, user_id: int, number: int, count: int,
+              profile: str) -> Iterator[tuple]:
+        """count строк пользователя в порядке MoneyFlowRepository.COPY_COLUMNS.
+
+        number - порядковый номер пользователя в наборе, от него вместе
+        с seed зависит генератор случайных чисел.
+        """
+        rng = random.Random(f'{self.seed}:{number}')
+        templates, weights = self.templates[profile]
+        statuses = self.statuses
+        status_weights = self.status_weights
+        choices = rng.choices
+        choice = rng.choice
+        randint = rng.randint
+        for _ in range(count):
+            type_id, category_id, subcategory_id, amounts, dates, comments = (
+                choices(templates, cum_weights=weights)[0]
+            )
+            yield (
+                user_id,
+                choice(dates),
+                choices(statuses, cum_weights=status_weights)[0],
+                type_id,
+                category_id,
+                subcategory_id,
+                randint(*amounts),
+                choice(comments),
+            )
@@ -0,0 +1,66 @@
+"""Проверка бюджета SQL-запросов в тестах.
+
+Бюджет - это максимум запросов на один вызов эндпоинта или сервиса.
+Вызов выполняется при 1, 10 и 100 строках данных: запрос на строку
+(N+1) превышает бюджет на больших объемах, даже если на одной строке
+укладывается в него.
+"""
+from functools import wraps
+from typing import Callable, Dict, Iterable
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+QUERY_BUDGET_ROWS = (1, 10, 100)
+
+
+def check_query_budget(budget: int, setup: Callable[[int], Callable],
+                       rows: Iterable[int] = QUERY_BUDGET_ROWS,
+                       using: str = DEFAULT_DB_ALIAS) -> Dict[int, int]:
+    """Число запросов вызова для каждого объема данных.
+
+    setup(n) создает n строк и возвращает проверяемый вызов. Данные
+    каждого объема откатываются до точки сохранения, поэтому проверка
+    должна выполняться в транзакции (TestCase или django_db).
+    При превышении бюджета - AssertionError со списком запросов.
+    """
+    counts = {}
+    for count in rows:
+        savepoint = transaction.savepoint(using)
+        try:
+            call = setup(count)
+            with CaptureQueriesContext(connections[using]) as context:
+                call()
+        finally:
+            transaction.savepoint_rollback(savepoint, using)
+        counts[count] = len(context)
+        if len(context) > budget:
+            queries = '\n'.join(
+                query['sql'] for query in context.captured_queries
+            )
+            raise AssertionError(
+                f'Бюджет {budget} SQL-запросов превышен при {count} '
+                f'строках: {len(context)} (по объемам: {counts})\n{queries}'
+            )
+    return counts
+
+
+def query_budget(budget: int, rows: Iterable[int] = QUERY_BUDGET_ROWS):
+    """Декоратор теста TestCase с бюджетом запросов.
+
+    Метод теста принимает число строк, создает данные и возвращает
+    вызов, запросы которого считаются:
+
+        @query_budget(5)
+        def test_list(self, rows):
+            create_flows(rows)
+            return lambda: self.client.get(url)
+    """
+    def decorator(test):
+        @wraps(test)
+        def wrapper(self):
+            check_query_budget(
+                budget, lambda count: test(self, count), rows
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,9 @@
+import pytest
+
+from api.testing import check_query_budget
+
+
+@pytest.fixture
+def query_budget(db):
+    """Проверка бюджета SQL-запросов: query_budget(budget, setup)."""
+    return check_query_budget
@@ -0,0 +1,132 @@
+from threading import Barrier, Thread
+from time import monotonic
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.cache import ReportCache, report_cache
+from api.tests.test_views import MoneyFlowApiTestCase
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class ReportCacheTest(TestCase):
+    """Тесты двухуровневого кэша отчетов."""
+
+    def setUp(self):
+        cache.clear()
+        self.report_cache = ReportCache()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return {'calls': self.calls}
+
+    def test_second_call_is_served_from_cache(self):
+        """Тест повторного запроса без пересчета."""
+        first = self.report_cache.get_or_compute(None, 'test', {'a': 1}, self.compute)
+        self.report_cache.clear_local()
+        second = self.report_cache.get_or_compute(None, 'test', {'a': 1}, self.compute)
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, 1)
+
+    def test_single_flight(self):
+        """Тест однократного расчета для конкурентных одинаковых запросов."""
+        barrier = Barrier(8)
+
+        def slow_compute():
+            self.calls += 1
+            return 'value'
+
+        def worker():
+            barrier.wait()
+            self.report_cache.get_or_compute(None, 'slow', {}, slow_compute)
+
+        threads = [Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+
+    def test_waiting_for_other_worker_does_not_block_other_keys(self):
+        """Тест: ожидание блокировки чужого воркера не держит другие ключи."""
+        report_cache = ReportCache(lock_timeout=2)
+        busy_key = report_cache.make_key(None, 'busy', {})
+        cache.add(f'{busy_key}:lock', 1, timeout=2)
+        waiting = Thread(target=report_cache.get_or_compute,
+                         args=(None, 'busy', {}, self.compute))
+        waiting.start()
+        try:
+            for number in range(report_cache.lock_timeout * 32):
+                started = monotonic()
+                report_cache.get_or_compute(
+                    None, f'free{number}', {}, self.compute
+                )
+                self.assertLess(monotonic() - started, 0.5)
+        finally:
+            waiting.join()
+
+    @skipUnless(fakeredis, 'fakeredis не установлен')
+    def test_shared_with_other_workers_through_redis(self):
+        """Тест общего уровня кэша на Redis (fakeredis)."""
+        server = fakeredis.FakeServer()
+        redis_cache = {
+            'default': {
+                'BACKEND': 'django_redis.cache.RedisCache',
+                'LOCATION': 'redis://localhost:6379/1',
+                'OPTIONS': {
+                    'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                    'CONNECTION_POOL_KWARGS': {
+                        'connection_class': fakeredis.FakeConnection,
+                        'server': server,
+                    },
+                },
+            }
+        }
+        with override_settings(CACHES=redis_cache):
+            self.report_cache.get_or_compute(None, 'redis', {}, self.compute)
+            other_worker = ReportCache()
+            value = other_worker.get_or_compute(None, 'redis', {}, self.compute)
+        self.assertEqual(value, {'calls': 1})
+        self.assertTrue(server.connected)
+
+
+class StatisticsEndpointCacheTest(MoneyFlowApiTestCase):
+    """Тесты кэширования статистики и сброса при записи."""
+
+    statistics_url = '/api/v1/money-flows/statistics/'
+
+    def setUp(self):
+        super().setUp()
+        report_cache.clear_local()
+
+    def test_statistics_cached_until_write(self):
+        """Тест отдачи из кэша и сброса после создания операции."""
+        self.client.post(self.url, {
+            'created_at': '2024-01-01',
+            'status': self.status.id,
+            'type': self.type.id,
+            'category': self.category.id,
+            'subcategory': self.subcategory.id,
+            'amount': '10.00',
+        }, format='json')
+        response = self.client.get(self.statistics_url)
+        self.assertEqual(response.data['summary']['total_count'], 1)
+
+        with self.assertNumQueries(0):
+            self.client.get(self.statistics_url)
+
+        flow_id = self.client.get(self.url).data['results'][0]['id']
+        self.client.delete(f'{self.url}{flow_id}/')
+        response = self.client.get(self.statistics_url)
+        self.assertEqual(response.data['summary']['total_count'], 0)
+
+    def test_invalid_date(self):
+        """Тест ошибки для некорректной даты."""
+        response = self.client.get(self.statistics_url, {'start_date': 'вчера'})
+        self.assertEqual(response.status_code, 400)
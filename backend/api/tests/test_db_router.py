@@ -0,0 +1,204 @@
+from datetime import date
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from rest_framework.test import APIClient
+
+from api.cache import VersionCounter
+from api.db_router import (PrimaryReplicaRouter, read_routing, replica_health,
+                           replica_reads)
+from api.middleware import ReplicaRoutingMiddleware
+from api.models import Category, MoneyFlow, Status, Subcategory, Type
+from users.models import User
+
+
+class PrimaryReplicaRouterTest(TransactionTestCase):
+    """Тесты выбора базы для чтений и записей."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        replica_health.reset()
+        self.addCleanup(replica_health.reset)
+
+    def test_reads_outside_request_use_primary(self):
+        """Тест чтений вне запроса: команды и фоновые задачи."""
+        self.assertEqual(self.router.db_for_read(MoneyFlow), DEFAULT_DB_ALIAS)
+
+    @override_settings(DATABASE_REPLICAS=['replica_missing'])
+    def test_unavailable_replica_falls_back_to_primary(self):
+        """Тест отката на основную базу при недоступной реплике."""
+        with replica_reads():
+            self.assertEqual(
+                self.router.db_for_read(MoneyFlow), DEFAULT_DB_ALIAS
+            )
+        self.assertFalse(replica_health.is_available('replica_missing'))
+        self.assertIn('replica_missing', replica_health.down_until)
+
+    def test_successful_check_is_reused(self):
+        """Тест проверки только выбранной реплики и не на каждый запрос."""
+        with mock.patch('api.db_router.connections') as connections:
+            self.assertIn(replica_health.choose(['replica_1', 'replica_2']),
+                          ['replica_1', 'replica_2'])
+            self.assertEqual(connections.__getitem__.call_count, 1)
+            for _ in range(3):
+                self.assertEqual(replica_health.choose(['replica_3']),
+                                 'replica_3')
+            self.assertEqual(connections.__getitem__.call_count, 2)
+
+            with override_settings(DATABASE_REPLICA_CHECK_SECONDS=0):
+                replica_health.reset()
+                for _ in range(2):
+                    replica_health.choose(['replica_3'])
+            self.assertEqual(connections.__getitem__.call_count, 4)
+
+    def test_write_pins_rest_of_request_to_primary(self):
+        """Тест чтений после записи в том же запросе."""
+        with replica_reads():
+            read_routing.get().replica = 'replica_1'
+            self.assertEqual(self.router.db_for_read(MoneyFlow), 'replica_1')
+            self.router.db_for_write(Status)
+            self.assertEqual(
+                self.router.db_for_read(MoneyFlow), DEFAULT_DB_ALIAS
+            )
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_replicas_are_not_migrated(self):
+        """Тест запрета миграций на репликах."""
+        self.assertFalse(self.router.allow_migrate('replica_1', 'api'))
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'api'))
+
+    @skipUnless(settings.DATABASE_REPLICAS, 'реплики не настроены')
+    def test_safe_request_reads_from_replica(self):
+        """Тест чтения с настроенной реплики (DB_REPLICA_HOSTS)."""
+        Status.objects.create(name='Активный')
+        with replica_reads():
+            queryset = Status.objects.all()
+            self.assertEqual(queryset.count(), 1)
+            self.assertIn(queryset.db, settings.DATABASE_REPLICAS)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingMiddlewareTest(SimpleTestCase):
+    """Тесты привязки клиента к основной базе после записи."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory(HTTP_AUTHORIZATION='Token abc')
+        self.routing = []
+
+        def get_response(request):
+            self.routing.append(read_routing.get())
+            return HttpResponse()
+
+        self.middleware = ReplicaRoutingMiddleware(get_response)
+
+    def test_read_after_write_is_sticky(self):
+        """Тест чтения с основной базы сразу после записи клиента."""
+        self.middleware(self.factory.get('/'))
+        self.middleware(self.factory.post('/'))
+        self.middleware(self.factory.get('/'))
+        self.middleware(RequestFactory().get('/'))
+
+        first_read, write, sticky_read, other_client = self.routing
+        self.assertIsNotNone(first_read)
+        self.assertIsNone(write)
+        self.assertIsNone(sticky_read)
+        self.assertIsNotNone(other_client)
+        self.assertIsNone(read_routing.get())
+
+    @override_settings(DATABASE_REPLICA_STICKY_SECONDS=0)
+    def test_stickiness_expires(self):
+        """Тест возврата чтений на реплику после окна привязки."""
+        self.middleware(self.factory.post('/'))
+        self.middleware(self.factory.get('/'))
+
+        self.assertIsNotNone(self.routing[-1])
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class StreamingReplicaRoutingTest(TransactionTestCase):
+    """Тесты маршрутизации чтений потоковой выгрузки."""
+
+    def setUp(self):
+        cache.clear()
+        replica_health.reset()
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com',
+            password='testpass123'
+        )
+        type_obj = Type.objects.create(name='Расход')
+        category = Category.objects.create(name='Питание', type=type_obj)
+        MoneyFlow.objects.create(
+            user=self.user, created_at=date(2024, 1, 1),
+            status=Status.objects.create(name='Бизнес'), type=type_obj,
+            category=category,
+            subcategory=Subcategory.objects.create(
+                name='Продукты', category=category
+            ),
+            amount='10.00'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_export_stream_reads_from_replica(self):
+        """Тест чтения операций выгрузки с реплики во время потока.
+
+        Реплика выбирается роутером, но запросы выполняются в основной
+        базе: отдельного сервера в тестах нет.
+        """
+        aliases = []
+        db_for_read = PrimaryReplicaRouter.db_for_read
+
+        def record_read(router, model, **hints):
+            if model is MoneyFlow:
+                aliases.append(db_for_read(router, model, **hints))
+            return DEFAULT_DB_ALIAS
+
+        with mock.patch.object(replica_health, 'is_available',
+                               return_value=True), \
+                mock.patch.object(PrimaryReplicaRouter, 'db_for_read',
+                                  record_read):
+            response = self.client.get(
+                '/api/v1/money-flows/export/', {'format': 'ndjson'}
+            )
+            aliases.clear()
+            content = b''.join(response.streaming_content)
+
+        self.assertEqual(len(content.splitlines()), 1)
+        self.assertEqual(aliases, ['replica_1'])
+        self.assertIsNone(read_routing.get())
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class VersionReadRoutingTest(SimpleTestCase):
+    """Тесты чтений с основной базы после увеличения версии данных."""
+
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+        self.versions = VersionCounter('test-version:{owner}')
+
+    def read_alias(self):
+        with replica_reads():
+            read_routing.get().replica = 'replica_1'
+            self.versions.get(1)
+            return self.router.db_for_read(MoneyFlow)
+
+    def test_fresh_version_reads_from_primary(self):
+        """Тест: кэш и ETag другого клиента не заполняются с реплики."""
+        self.assertEqual(self.read_alias(), 'replica_1')
+        self.versions.bump(1)
+        self.assertEqual(self.read_alias(), DEFAULT_DB_ALIAS)
+
+    def test_old_version_reads_from_replica(self):
+        """Тест возврата на реплику после окна привязки."""
+        self.versions.bump(1)
+        cache.set(f'{self.versions.key(1)}:modified', 0, timeout=None)
+        self.assertEqual(self.read_alias(), 'replica_1')
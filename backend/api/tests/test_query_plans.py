@@ -0,0 +1,261 @@
+from datetime import date
+from itertools import combinations
+
+from django.db import connection
+from django.test import TestCase
+
+from api.models import (MoneyFlow, Status, Type, Category, Subcategory)
+from api.repositories import (REFERENCE_MODELS, MoneyFlowPartitionRepository,
+                              MoneyFlowRepository)
+from api.services import MoneyFlowService
+from api.views import MoneyFlowFilter
+from users.models import User
+
+USERS_COUNT = 50
+FLOWS_PER_USER = 400
+
+FILTER_VALUES = {
+    'created_at': '2024-03-01',
+    'created_at_after': '2024-02-01',
+    'created_at_before': '2024-06-30',
+    'status': 'Биз',
+    'type': 'Расх',
+    'category': 'Пита',
+    'subcategory': 'Прод',
+    'q': 'продукты',
+}
+
+SERVICE_FILTER_VALUES = {
+    'start_date': '2024-02-01',
+    'end_date': '2024-06-30',
+    'status': 'Биз',
+    'type': 'Расх',
+    'category': 'Пита',
+}
+
+
+def all_combinations(values):
+    """Все непустые сочетания параметров фильтра."""
+    for size in range(1, len(values) + 1):
+        for names in combinations(values, size):
+            yield {name: values[name] for name in names}
+
+
+def scanned_relations(queryset, node_types=None):
+    """Таблицы (секции), которые читает план запроса.
+
+    Если переданы node_types, учитываются только узлы этих типов.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0][0]['Plan']
+
+    relations, nodes = [], [plan]
+    while nodes:
+        node = nodes.pop()
+        if 'Relation Name' in node and (
+                node_types is None or node['Node Type'] in node_types):
+            relations.append(node['Relation Name'])
+        nodes.extend(node.get('Plans', []))
+    return relations
+
+
+def seq_scanned_relations(queryset):
+    """Таблицы, которые план запроса читает последовательным сканированием."""
+    return scanned_relations(queryset, {'Seq Scan'})
+
+
+def trigram_installed():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def money_flow_relations(relations):
+    """Таблица операций и ее секции среди прочитанных таблиц."""
+    table = MoneyFlow._meta.db_table
+    return sorted({
+        relation for relation in relations
+        if relation == table or relation.startswith(f'{table}_')
+    })
+
+
+class MoneyFlowQueryPlanTest(TestCase):
+    """Регрессионные тесты планов запросов к денежным операциям.
+
+    Таблица заполняется так, чтобы на одного пользователя приходилась
+    малая доля строк; любой фильтр должен обслуживаться индексом, а не
+    последовательным сканированием api_moneyflow.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        status = Status.objects.create(name='Бизнес')
+        type_obj = Type.objects.create(name='Расход')
+        category = Category.objects.create(name='Питание', type=type_obj)
+        subcategory = Subcategory.objects.create(
+            name='Продукты',
+            category=category
+        )
+        User.objects.bulk_create([
+            User(
+                username=f'user{number}',
+                email=f'user{number}@example.com'
+            )
+            for number in range(USERS_COUNT)
+        ])
+        cls.user = User.objects.order_by('id').first()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {MoneyFlow._meta.db_table} '
+                '(user_id, created_at, status_id, type_id, category_id, '
+                'subcategory_id, amount, comment) '
+                "SELECT u.id, DATE '2020-01-01' + (n %% 1800), "
+                '%s, %s, %s, %s, n %% 1000 + 1, %s '
+                f'FROM {User._meta.db_table} u, generate_series(1, %s) n',
+                [status.id, type_obj.id, category.id, subcategory.id,
+                 '', FLOWS_PER_USER]
+            )
+            cursor.execute(f'ANALYZE {MoneyFlow._meta.db_table}')
+
+    def assertIndexOnly(self, queryset, params):
+        relations = money_flow_relations(seq_scanned_relations(queryset))
+        self.assertEqual(
+            relations, [],
+            f'Последовательное сканирование для фильтра {params}'
+        )
+
+    def test_money_flow_filter_plans(self):
+        """Тест планов всех сочетаний параметров MoneyFlowFilter."""
+        base = MoneyFlowService().repository.get_by_user(self.user)
+        for params in all_combinations(FILTER_VALUES):
+            with self.subTest(params=params):
+                queryset = MoneyFlowFilter(params, queryset=base).qs
+                self.assertIndexOnly(queryset, params)
+
+    def test_filtered_money_flows_plans(self):
+        """Тест планов всех сочетаний фильтров сервиса."""
+        service = MoneyFlowService()
+        for params in all_combinations(SERVICE_FILTER_VALUES):
+            with self.subTest(params=params):
+                queryset = service.get_filtered_money_flows(params, self.user)
+                self.assertIndexOnly(queryset, params)
+
+    def test_keyset_page_plan(self):
+        """Тест плана страницы keyset-пагинации."""
+        queryset = MoneyFlowService().repository.get_by_user(
+            self.user
+        ).order_by('-created_at', 'id').filter(
+            created_at__lt='2024-01-01'
+        )[:11]
+        self.assertIndexOnly(queryset, {'cursor': '2024-01-01'})
+
+
+class ReferenceNameQueryPlanTest(TestCase):
+    """Планы поиска справочников по части названия.
+
+    В каждом справочнике тысячи записей и одна подходящая, поэтому
+    icontains должен читать trigram-индекс, а не всю таблицу.
+    """
+    references = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        type_obj = Type.objects.create(name='Расход')
+        category = Category.objects.create(name='Питание', type=type_obj)
+        Status.objects.create(name='Бизнес')
+        Subcategory.objects.create(name='Продукты', category=category)
+        with connection.cursor() as cursor:
+            for model, columns, values in (
+                (Status, 'name, description', "'Статус ' || n, ''"),
+                (Type, 'name, sign', "'Тип ' || n, -1"),
+                (Category, 'name, type_id', f"'Категория ' || n, {type_obj.id}"),
+                (Subcategory, 'name, category_id',
+                 f"'Подкатегория ' || n, {category.id}"),
+            ):
+                table = model._meta.db_table
+                cursor.execute(
+                    f'INSERT INTO {table} ({columns}) SELECT {values} '
+                    'FROM generate_series(1, %s) n', [cls.references]
+                )
+                cursor.execute(f'ANALYZE {table}')
+
+    def test_reference_name_uses_trigram_index(self):
+        """Тест индексного поиска для каждого справочника."""
+        if not trigram_installed():
+            self.skipTest('pg_trgm не установлен')
+        repository = MoneyFlowRepository()
+        for field in REFERENCE_MODELS:
+            with self.subTest(field=field):
+                queryset = repository.reference_ids(
+                    field, FILTER_VALUES[field].lower()
+                )
+                table = REFERENCE_MODELS[field]._meta.db_table
+                self.assertNotIn(table, seq_scanned_relations(queryset))
+                self.assertIn(table, scanned_relations(
+                    queryset, {'Bitmap Heap Scan'}
+                ))
+                self.assertEqual(len(list(queryset)), 1)
+
+
+class MoneyFlowPartitionPruningTest(TestCase):
+    """Тесты секционирования таблицы операций по месяцам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        type_obj = Type.objects.create(name='Расход')
+        category = Category.objects.create(name='Питание', type=type_obj)
+        cls.user = User.objects.create(
+            username='tester',
+            email='tester@example.com'
+        )
+        MoneyFlow.objects.bulk_create([
+            MoneyFlow(
+                user=cls.user,
+                created_at=date(2024, month, 15),
+                status=Status.objects.get_or_create(name='Бизнес')[0],
+                type=type_obj,
+                category=category,
+                subcategory=Subcategory.objects.get_or_create(
+                    name='Продукты', category=category
+                )[0],
+                amount=100,
+            )
+            for month in (1, 2, 3, 4)
+        ])
+        cls.repository = MoneyFlowPartitionRepository()
+        cls.moved = [
+            cls.repository.create_partition(date(2024, month, 1))
+            for month in (1, 2, 3)
+        ]
+
+    def test_rows_moved_from_default_partition(self):
+        """Тест переноса строк месяца из секции по умолчанию."""
+        self.assertEqual(self.moved, [1, 1, 1])
+        self.assertEqual(
+            self.repository.get_default_months(), [date(2024, 4, 1)]
+        )
+        self.assertEqual(MoneyFlow.objects.count(), 4)
+        self.assertEqual(self.repository.create_partition(date(2024, 1, 1)), 0)
+
+    def test_date_range_prunes_partitions(self):
+        """Тест отсечения секций в get_by_date_range."""
+        queryset = MoneyFlowService().repository.get_by_date_range(
+            self.user, '2024-02-01', '2024-02-29'
+        )
+        self.assertEqual(
+            money_flow_relations(scanned_relations(queryset)),
+            [self.repository.partition_name(date(2024, 2, 1))]
+        )
+        self.assertEqual(queryset.count(), 1)
+
+    def test_rows_follow_created_at_between_partitions(self):
+        """Тест переноса строки в другую секцию при смене даты."""
+        flow = MoneyFlow.objects.get(created_at=date(2024, 1, 15))
+        flow.created_at = date(2024, 3, 1)
+        flow.save()
+        self.assertEqual(
+            MoneyFlow.objects.filter(created_at__month=3).count(), 2
+        )
@@ -1,10 +1,20 @@
+import json
+import numpy as np
 import pytest
+import tempfile
+from datetime import date
 from decimal import Decimal
-from django.test import TestCase
+from io import StringIO
+from django.test import TestCase, override_settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
 from django.db import transaction
 
-from api.models import MoneyFlow, Status, Type, Category, Subcategory
+from api.models import (MoneyFlow, MoneyFlowDailyRollup,
+                        MoneyFlowMonthlySnapshot,
+                        Status, Type, Category, Subcategory)
+from api.cache import report_cache
 from api.services import MoneyFlowService, CategoryService, AnalyticsService
 from users.models import User
 
@@ -15,6 +25,11 @@ class MoneyFlowServiceTest(TestCase):
     def setUp(self):
         """Подготовка тестовых данных."""
         self.service = MoneyFlowService()
+        self.user = User.objects.create_user(
+            username='tester',
+            email='tester@example.com',
+            password='testpass123'
+        )
         
         # Создаем тестовые объекты
         self.status = Status.objects.create(name='Активный')
@@ -37,7 +52,7 @@ class MoneyFlowServiceTest(TestCase):
             'comment': 'Тестовая операция'
         }
         
-        money_flow = self.service.create_money_flow(data)
+        money_flow = self.service.create_money_flow(data, self.user)
         
         self.assertIsNotNone(money_flow.id)
         self.assertEqual(money_flow.amount, Decimal('50000.00'))
@@ -64,7 +79,7 @@ class MoneyFlowServiceTest(TestCase):
         }
         
         with self.assertRaises(ValidationError):
-            self.service.create_money_flow(data)
+            self.service.create_money_flow(data, self.user)
     
     def test_create_money_flow_negative_amount(self):
         """Тест создания операции с отрицательной суммой."""
@@ -79,7 +94,7 @@ class MoneyFlowServiceTest(TestCase):
         }
         
         with self.assertRaises(ValidationError):
-            self.service.create_money_flow(data)
+            self.service.create_money_flow(data, self.user)
     
     def test_bulk_create_money_flows(self):
         """Тест массового создания операций."""
@@ -104,37 +119,436 @@ class MoneyFlowServiceTest(TestCase):
             }
         ]
         
-        created_flows = self.service.bulk_create_money_flows(flows_data)
+        created_flows = self.service.bulk_create_money_flows(flows_data, self.user)
         
         self.assertEqual(len(created_flows), 2)
         self.assertEqual(MoneyFlow.objects.count(), 2)
+
+    @override_settings(MONEY_FLOW_COPY_THRESHOLD=2)
+    def test_bulk_create_money_flows_copy(self):
+        """Тест массового создания через COPY начиная с порога."""
+        flows_data = [
+            {
+                'created_at': date(2024, 1, day),
+                'status': self.status,
+                'type': self.type,
+                'category': self.category,
+                'subcategory': self.subcategory,
+                'amount': Decimal(f'{day}00.50'),
+                'comment': f'Операция\t{day}\\',
+            }
+            for day in (3, 1, 2)
+        ]
+
+        created_flows = self.service.bulk_create_money_flows(
+            flows_data, self.user
+        )
+
+        saved = MoneyFlow.objects.in_bulk([flow.pk for flow in created_flows])
+        self.assertEqual(len(saved), 3)
+        for flow in created_flows:
+            self.assertEqual(saved[flow.pk].comment, flow.comment)
+            self.assertEqual(saved[flow.pk].amount, flow.amount)
+            self.assertEqual(saved[flow.pk].user, self.user)
+        self.assertEqual(
+            sum(MoneyFlowDailyRollup.objects.filter(user=self.user)
+                .values_list('total', flat=True)),
+            Decimal('601.50')
+        )
+        self.assertEqual(
+            self.service.repository.search(
+                MoneyFlow.objects.all(), 'операция'
+            ).count(), 3
+        )
     
     def test_get_statistics_report(self):
         """Тест получения статистического отчета."""
         # Создаем несколько операций
-        MoneyFlow.objects.create(
-            created_at='2024-01-15',
-            status=self.status,
-            type=self.type,
-            category=self.category,
-            subcategory=self.subcategory,
-            amount=Decimal('10000.00')
-        )
-        MoneyFlow.objects.create(
-            created_at='2024-01-16',
-            status=self.status,
-            type=self.type,
-            category=self.category,
-            subcategory=self.subcategory,
-            amount=Decimal('20000.00')
-        )
+        self.service.create_money_flow({
+            'created_at': '2024-01-15',
+            'status': self.status,
+            'type': self.type,
+            'category': self.category,
+            'subcategory': self.subcategory,
+            'amount': Decimal('10000.00')
+        }, self.user)
+        self.service.create_money_flow({
+            'created_at': '2024-01-16',
+            'status': self.status,
+            'type': self.type,
+            'category': self.category,
+            'subcategory': self.subcategory,
+            'amount': Decimal('20000.00')
+        }, self.user)
         
-        stats = self.service.get_statistics_report()
+        stats = self.service.get_statistics_report(self.user)
         
         self.assertEqual(stats['summary']['total_count'], 2)
         self.assertEqual(stats['summary']['total_amount'], Decimal('30000.00'))
         self.assertEqual(stats['summary']['average_amount'], Decimal('15000.00'))
 
+    def _create_flow(self, created_at, amount):
+        return self.service.create_money_flow({
+            'created_at': created_at,
+            'status': self.status,
+            'type': self.type,
+            'category': self.category,
+            'subcategory': self.subcategory,
+            'amount': Decimal(amount)
+        }, self.user)
+
+    def test_rollups_follow_writes(self):
+        """Тест синхронного обновления дневных агрегатов."""
+        first = self._create_flow('2024-01-15', '100.00')
+        second = self._create_flow('2024-01-15', '50.00')
+
+        rollup = MoneyFlowDailyRollup.objects.get(user=self.user)
+        self.assertEqual(rollup.count, 2)
+        self.assertEqual(rollup.total, Decimal('150.00'))
+
+        self.service.update_money_flow(
+            second.id, {'created_at': '2024-01-16'}, self.user
+        )
+        self.assertEqual(
+            list(MoneyFlowDailyRollup.objects.order_by('day').values_list(
+                'count', 'total'
+            )),
+            [(1, Decimal('100.00')), (1, Decimal('50.00'))]
+        )
+
+        self.service.repository.delete(first.id)
+        self.assertEqual(MoneyFlowDailyRollup.objects.count(), 1)
+
+    def test_statistics_report_matches_raw_rows(self):
+        """Тест совпадения отчета по агрегатам с отчетом по операциям."""
+        self._create_flow('2024-01-10', '10.00')
+        self._create_flow('2024-01-15', '20.00')
+        self._create_flow('2024-02-01', '40.00')
+
+        stats = self.service.get_statistics_report(
+            self.user, '2024-01-01', '2024-01-31'
+        )
+
+        self.assertEqual(stats['summary']['total_count'], 2)
+        self.assertEqual(stats['summary']['total_amount'], Decimal('30.00'))
+        self.assertEqual(stats['by_category'], [{
+            'category__name': 'Зарплата',
+            'count': 2,
+            'total': Decimal('30.00'),
+        }])
+
+    def test_rebuild_rollups(self):
+        """Тест полного пересчета агрегатов."""
+        self._create_flow('2024-01-15', '10.00')
+        MoneyFlowDailyRollup.objects.all().delete()
+
+        call_command('rebuild_money_flow_rollups', stdout=StringIO())
+
+        rollup = MoneyFlowDailyRollup.objects.get(user=self.user)
+        self.assertEqual(rollup.total, Decimal('10.00'))
+
+
+class AnalyticsTestCase(TestCase):
+    """Базовый класс тестов аналитики: два типа со своими категориями."""
+
+    def setUp(self):
+        cache.clear()
+        report_cache.clear_local()
+        self.service = AnalyticsService()
+        self.user = User.objects.create_user(
+            username='tester',
+            email='tester@example.com',
+            password='testpass123'
+        )
+        self.status = Status.objects.create(name='Активный')
+        self.income = Type.objects.create(name='Доход', sign=1)
+        self.expense = Type.objects.create(name='Расход')
+        self.subcategories = {}
+        for type_obj in (self.income, self.expense):
+            category = Category.objects.create(
+                name=f'Категория {type_obj.name}', type=type_obj
+            )
+            self.subcategories[type_obj] = Subcategory.objects.create(
+                name=f'Подкатегория {type_obj.name}', category=category
+            )
+
+    def _create_flow(self, created_at, amount, type_obj):
+        subcategory = self.subcategories[type_obj]
+        return MoneyFlowService().create_money_flow({
+            'created_at': created_at,
+            'status': self.status,
+            'type': type_obj,
+            'category': subcategory.category,
+            'subcategory': subcategory,
+            'amount': Decimal(amount)
+        }, self.user)
+
+
+class AnalyticsServiceTest(AnalyticsTestCase):
+    """Тесты для сервиса аналитики."""
+
+    def test_daily_series_fills_gaps(self):
+        """Тест дневного ряда с нулями в пустых днях."""
+        self._create_flow(date(2024, 1, 2), '10.00', self.income)
+        self._create_flow(date(2024, 1, 4), '5.00', self.expense)
+        self._create_flow(date(2024, 1, 4), '7.00', self.expense)
+
+        report = self.service.get_time_series(
+            self.user, date(2024, 1, 1), date(2024, 1, 5)
+        )
+
+        self.assertEqual(len(report['series']), 1)
+        self.assertEqual(
+            [(point['period'], point['count'], point['total'])
+             for point in report['series'][0]['points']],
+            [
+                (date(2024, 1, 1), 0, Decimal('0')),
+                (date(2024, 1, 2), 1, Decimal('10.00')),
+                (date(2024, 1, 3), 0, Decimal('0')),
+                (date(2024, 1, 4), 2, Decimal('12.00')),
+                (date(2024, 1, 5), 0, Decimal('0')),
+            ]
+        )
+
+    def test_weekly_series_grouped_by_type(self):
+        """Тест недельного ряда с группировкой по типу."""
+        self._create_flow(date(2024, 1, 2), '10.00', self.income)
+        self._create_flow(date(2024, 1, 9), '20.00', self.income)
+        self._create_flow(date(2024, 1, 16), '5.00', self.expense)
+
+        report = self.service.get_time_series(
+            self.user, date(2024, 1, 3), date(2024, 1, 20),
+            granularity='week', group_by='type'
+        )
+
+        series = {item['name']: item['points'] for item in report['series']}
+        self.assertEqual(set(series), {'Доход', 'Расход'})
+        # Недели начинаются с понедельника, первая включает начало периода.
+        self.assertEqual(
+            [point['period'] for point in series['Доход']],
+            [date(2024, 1, 1), date(2024, 1, 8), date(2024, 1, 15)]
+        )
+        # Операция 2 января лежит до начала периода и не учитывается.
+        self.assertEqual(
+            [point['total'] for point in series['Доход']],
+            [Decimal('0'), Decimal('20.00'), Decimal('0')]
+        )
+        self.assertEqual(
+            [point['count'] for point in series['Расход']], [0, 0, 1]
+        )
+
+    def test_time_series_invalidated_by_write(self):
+        """Тест сброса кэшированного ряда после записи операции."""
+        self.service.get_time_series(
+            self.user, date(2024, 1, 1), date(2024, 1, 31), 'month'
+        )
+        self._create_flow(date(2024, 1, 10), '10.00', self.income)
+        report = self.service.get_time_series(
+            self.user, date(2024, 1, 1), date(2024, 1, 31), 'month'
+        )
+        self.assertEqual(report['series'][0]['points'][0]['count'], 1)
+
+    def test_trend_analysis_filters_by_dates(self):
+        """Тест тренда по месяцам за последний период."""
+        self._create_flow(date.today(), '10.00', self.income)
+        self._create_flow(date(2000, 1, 1), '20.00', self.income)
+
+        report = self.service.get_trend_analysis(self.user, months=1)
+
+        self.assertEqual(
+            [row['count'] for row in report['monthly_breakdown']], [1]
+        )
+
+    def test_trend_analysis_is_scoped_to_user(self):
+        """Тест тренда только по операциям пользователя с кэшем на него."""
+        self._create_flow(date.today(), '10.00', self.income)
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='pass12345'
+        )
+        self.assertEqual(
+            self.service.get_trend_analysis(other)['monthly_breakdown'], []
+        )
+        subcategory = self.subcategories[self.income]
+        MoneyFlowService().create_money_flow({
+            'created_at': date.today(),
+            'status': self.status,
+            'type': self.income,
+            'category': subcategory.category,
+            'subcategory': subcategory,
+            'amount': Decimal('5.00'),
+        }, other)
+
+        mine = self.service.get_trend_analysis(self.user)['monthly_breakdown']
+        theirs = self.service.get_trend_analysis(other)['monthly_breakdown']
+
+        self.assertEqual([row['total'] for row in mine], [Decimal('10.00')])
+        self.assertEqual([row['total'] for row in theirs], [Decimal('5.00')])
+
+
+class RunningBalanceTest(AnalyticsTestCase):
+    """Тесты нарастающего баланса."""
+
+    def test_balance_includes_history_before_period(self):
+        """Тест баланса с остатком на начало периода и пустыми днями."""
+        self._create_flow(date(2023, 12, 31), '100.00', self.income)
+        self._create_flow(date(2024, 1, 2), '30.00', self.expense)
+        self._create_flow(date(2024, 1, 3), '10.00', self.income)
+        self._create_flow(date(2024, 1, 9), '1.00', self.income)
+
+        series = self.service.get_running_balance(
+            self.user, date(2024, 1, 1), date(2024, 1, 4)
+        )
+
+        self.assertEqual(len(series), 1)
+        self.assertEqual(
+            [(point['net'], point['balance']) for point in series[0]['points']],
+            [(Decimal('0'), Decimal('100.00')),
+             (Decimal('-30.00'), Decimal('70.00')),
+             (Decimal('10.00'), Decimal('80.00')),
+             (Decimal('0'), Decimal('80.00'))]
+        )
+
+    def test_balance_by_status(self):
+        """Тест отдельного баланса по каждому статусу."""
+        planned = Status.objects.create(name='Плановый')
+        self._create_flow(date(2024, 1, 1), '50.00', self.income)
+        flow = self._create_flow(date(2024, 1, 2), '20.00', self.expense)
+        MoneyFlowService().update_money_flow(
+            flow.id, {'status': planned}, self.user
+        )
+
+        series = self.service.get_running_balance(
+            self.user, date(2024, 1, 1), date(2024, 1, 2), by_status=True
+        )
+
+        balances = {
+            item['name']: [point['balance'] for point in item['points']]
+            for item in series
+        }
+        self.assertEqual(balances, {
+            'Активный': [Decimal('50.00'), Decimal('50.00')],
+            'Плановый': [Decimal('0'), Decimal('-20.00')],
+        })
+
+class DistributionTest(AnalyticsTestCase):
+    """Тесты векторных метрик распределения сумм."""
+
+    def test_percentiles_match_numpy_reference(self):
+        """Тест перцентилей по категориям против np.percentile."""
+        amounts = {
+            self.income: ['10.00', '20.00', '30.00', '45.50'],
+            self.expense: ['1.00', '99.99', '5.25'],
+        }
+        for type_obj, values in amounts.items():
+            for day, amount in enumerate(values, start=1):
+                self._create_flow(date(2024, 1, day), amount, type_obj)
+
+        report = self.service.get_distribution(
+            self.user, date(2024, 1, 1), date(2024, 1, 10), bins=4
+        )
+
+        rows = {row['category__name']: row for row in report['by_category']}
+        for type_obj, values in amounts.items():
+            row = rows[f'Категория {type_obj.name}']
+            cents = [float(value) * 100 for value in values]
+            self.assertEqual(row['count'], len(values))
+            for q in (50, 90, 99):
+                self.assertAlmostEqual(
+                    row[f'p{q}'], np.percentile(cents, q) / 100, delta=0.006
+                )
+        self.assertEqual(report['summary']['count'], 7)
+        self.assertEqual(report['summary']['total'], 211.74)
+        self.assertEqual(sum(report['histogram']['counts']), 7)
+
+    def test_rolling_means_include_empty_days(self):
+        """Тест скользящего среднего с нулями в пустых днях."""
+        self._create_flow(date(2024, 1, 1), '7.00', self.income)
+        self._create_flow(date(2024, 1, 3), '14.00', self.expense)
+
+        report = self.service.get_distribution(
+            self.user, date(2024, 1, 1), date(2024, 1, 3)
+        )
+
+        self.assertEqual(
+            [(row['total'], row['mean_7']) for row in report['rolling']],
+            [(7.0, 7.0), (0.0, 3.5), (14.0, 7.0)]
+        )
+
+    def test_empty_period(self):
+        """Тест периода без операций."""
+        report = self.service.get_distribution(
+            self.user, date(2024, 1, 1), date(2024, 1, 2)
+        )
+
+        self.assertEqual(report['summary']['count'], 0)
+        self.assertEqual(report['by_category'], [])
+        self.assertEqual(report['histogram'], {'edges': [], 'counts': []})
+
+class MonthlySnapshotTest(AnalyticsTestCase):
+    """Тесты снимков месячных отчетов."""
+
+    def test_closed_month_snapshot_is_reused(self):
+        """Тест сохранения снимка закрытого месяца и чтения из него."""
+        self._create_flow(date(2024, 1, 10), '10.00', self.income)
+
+        report = self.service.get_monthly_report(self.user, 2024, 1)
+
+        self.assertEqual(report['summary']['total_count'], 1)
+        self.assertTrue(MoneyFlowMonthlySnapshot.objects.filter(
+            user=self.user, month=date(2024, 1, 1)
+        ).exists())
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.service.get_monthly_report(self.user, 2024, 1), report
+            )
+
+    def test_write_invalidates_only_its_month(self):
+        """Тест сброса снимка только для месяца записанной операции."""
+        self._create_flow(date(2024, 1, 10), '10.00', self.income)
+        self.service.get_period_report(
+            self.user, date(2024, 1, 1), date(2024, 2, 1)
+        )
+        self.assertEqual(MoneyFlowMonthlySnapshot.objects.count(), 2)
+
+        self._create_flow(date(2024, 2, 5), '5.00', self.expense)
+
+        self.assertEqual(
+            list(MoneyFlowMonthlySnapshot.objects.values_list(
+                'month', flat=True
+            )),
+            [date(2024, 1, 1)]
+        )
+        report = self.service.get_period_report(
+            self.user, date(2024, 1, 1), date(2024, 2, 1)
+        )
+        self.assertEqual(
+            [(month['total_count'], month['total_amount'])
+             for month in report['months']],
+            [(1, Decimal('10.00')), (1, Decimal('5.00'))]
+        )
+
+    def test_period_report_matches_statistics(self):
+        """Тест совпадения отчета из снимков со статистикой по агрегатам."""
+        self._create_flow(date(2024, 1, 10), '10.00', self.income)
+        self._create_flow(date(2024, 2, 10), '20.00', self.income)
+        self._create_flow(date(2024, 3, 10), '40.00', self.expense)
+        call_command('snapshot_money_flow_months', stdout=StringIO())
+        self.assertEqual(MoneyFlowMonthlySnapshot.objects.count(), 3)
+
+        report = self.service.get_period_report(
+            self.user, date(2024, 1, 1), date(2024, 3, 1)
+        )
+        statistics = MoneyFlowService().build_statistics_report(
+            self.user, date(2024, 1, 1), date(2024, 3, 31)
+        )
+
+        self.assertEqual(report['summary'], statistics['summary'])
+        self.assertEqual(
+            [(row['type__name'], row['count'], row['total'])
+             for row in report['by_type']],
+            [('Расход', 1, Decimal('40.00')), ('Доход', 2, Decimal('30.00'))]
+        )
+
 
 class CategoryServiceTest(TestCase):
     """Тесты для сервиса Category."""
@@ -181,6 +595,122 @@ class CategoryServiceTest(TestCase):
         self.assertEqual(len(result[0]['subcategories']), 2)
 
 
+class GenerateMoneyFlowsCommandTest(TestCase):
+    """Тесты генератора синтетических операций."""
+
+    def generate(self, prefix, *args):
+        call_command(
+            'generate_money_flows', '--users', '2', '--flows', '30',
+            '--end-date', '2024-12-31', '--days', '90',
+            '--prefix', prefix, *args, stdout=StringIO()
+        )
+        return [
+            list(MoneyFlow.objects.filter(user__username=f'{prefix}{number}')
+                 .order_by('id').values_list(
+                     'created_at', 'status_id', 'subcategory_id',
+                     'amount', 'comment'))
+            for number in (1, 2)
+        ]
+
+    def test_same_seed_gives_same_rows(self):
+        """Тест независимости данных от способа записи и размера порции."""
+        copied = self.generate('copy', '--batch-size', '7')
+        bulk = self.generate('bulk', '--method', 'bulk')
+
+        self.assertEqual(copied, bulk)
+        self.assertEqual([len(rows) for rows in copied], [30, 30])
+        self.assertNotEqual(copied[0], copied[1])
+        self.assertTrue(all(
+            date(2024, 10, 3) <= row[0] <= date(2024, 12, 31)
+            for row in copied[0]
+        ))
+        user = User.objects.get(username='copy1')
+        self.assertEqual(
+            sum(MoneyFlowDailyRollup.objects.filter(user=user)
+                .values_list('count', flat=True)), 30
+        )
+        self.assertEqual(user.owned_statuses.count(), 4)
+
+    def test_users_with_flows_are_skipped(self):
+        """Тест повторного запуска без дублирования операций."""
+        self.generate('again')
+        self.generate('again')
+
+        self.assertEqual(
+            MoneyFlow.objects.filter(user__username__startswith='again')
+            .count(), 60
+        )
+
+    def test_invalid_counts_are_rejected(self):
+        """Тест сообщений об ошибке для --users и --flows."""
+        for args, message in (
+                (('--users', '0'), 'Нужен хотя бы один пользователь'),
+                (('--flows', '-1'), '--flows не может быть отрицательным')):
+            with self.assertRaisesMessage(CommandError, message):
+                self.generate('invalid', *args)
+
+
+class BenchmarkApiCommandTest(TestCase):
+    """Тесты команды benchmark_api на маленьком объеме."""
+
+    def run_benchmark(self, *args):
+        call_command(
+            'benchmark_api', '--rows', '50', '--repeat', '1',
+            '--only', 'catalog/types', *args, stdout=StringIO()
+        )
+
+    def test_seed_is_deterministic(self):
+        """Тест одинаковых данных при повторной генерации."""
+        self.run_benchmark()
+        flows = MoneyFlow.objects.filter(user__username='bench50')
+        first = list(flows.order_by('id').values_list('created_at', 'amount'))
+        flows.delete()
+        self.run_benchmark()
+
+        self.assertEqual(len(first), 50)
+        self.assertEqual(
+            list(flows.order_by('id').values_list('created_at', 'amount')),
+            first
+        )
+
+    def test_regression_against_baseline(self):
+        """Тест ошибки при замедлении относительно базовой линии."""
+        with tempfile.NamedTemporaryFile('w+', suffix='.json') as file:
+            self.run_benchmark('--save-baseline', file.name)
+            baseline = json.load(file)
+            result = baseline['results']['50']['catalog/types']
+            self.assertIn('median_ms', result)
+
+            self.run_benchmark(
+                '--baseline', file.name, '--threshold', '100'
+            )
+            result['median_ms'] = 0.001
+            file.seek(0)
+            file.truncate()
+            json.dump(baseline, file)
+            file.flush()
+            with self.assertRaisesMessage(CommandError, 'catalog/types'):
+                self.run_benchmark(
+                    '--baseline', file.name, '--min-delta-ms', '0'
+                )
+
+
+
+class BenchmarkRenderingCommandTest(TestCase):
+    """Тесты команды benchmark_rendering."""
+
+    def test_fast_renderer_output_is_checked(self):
+        """Тест замеров без ошибок сверки и отката операций."""
+        stdout = StringIO()
+        call_command('benchmark_rendering', '--rows', '20', '--repeat', '1',
+                     stdout=stdout)
+
+        self.assertIn('render/FastJSONRenderer', stdout.getvalue())
+        self.assertIn('compress/gzip', stdout.getvalue())
+        self.assertFalse(
+            MoneyFlow.objects.filter(user__username='render_bench').exists()
+        )
+
 @pytest.mark.django_db
 class TestMoneyFlowServicePytest:
     """Тесты с использованием pytest для более сложных сценариев."""
@@ -188,6 +718,11 @@ class TestMoneyFlowServicePytest:
     @pytest.fixture
     def setup_data(self):
         """Фикстура для подготовки данных."""
+        user = User.objects.create_user(
+            username='tester',
+            email='tester@example.com',
+            password='testpass123'
+        )
         status = Status.objects.create(name='Активный')
         type_obj = Type.objects.create(name='Доход')
         category = Category.objects.create(name='Зарплата', type=type_obj)
@@ -196,6 +731,7 @@ class TestMoneyFlowServicePytest:
             category=category
         )
         return {
+            'user': user,
             'status': status,
             'type': type_obj,
             'category': category,
@@ -238,7 +774,7 @@ class TestMoneyFlowServicePytest:
         
         # Проверяем, что транзакция откатывается при ошибке
         with pytest.raises(ValidationError):
-            service.bulk_create_money_flows(flows_data)
+            service.bulk_create_money_flows(flows_data, setup_data['user'])
         
         # Проверяем, что ни одна операция не была создана
         assert MoneyFlow.objects.count() == 0
@@ -264,7 +800,24 @@ class TestMoneyFlowServicePytest:
         
         if should_raise:
             with pytest.raises(ValidationError):
-                service.create_money_flow(data)
+                service.create_money_flow(data, setup_data['user'])
         else:
-            money_flow = service.create_money_flow(data)
-            assert money_flow.amount == amount 
\ No newline at end of file
+            money_flow = service.create_money_flow(data, setup_data['user'])
+            assert money_flow.amount == amount 
+
+
+def test_categories_with_subcategories_query_budget(query_budget):
+    """Подкатегории всех категорий загружаются одним запросом."""
+    type_obj = Type.objects.create(name='Расход')
+
+    def setup(rows):
+        for number in range(rows):
+            category = Category.objects.create(
+                name=f'Категория {number}', type=type_obj
+            )
+            Subcategory.objects.create(
+                name=f'Подкатегория {number}', category=category
+            )
+        return CategoryService().get_categories_with_subcategories
+
+    query_budget(2, setup)
@@ -0,0 +1,1179 @@
+import asyncio
+import gzip
+import json
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from io import BytesIO
+from unittest import skipUnless
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from asgiref.sync import async_to_sync
+from django.test import (AsyncClient, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.middleware import brotli
+from api.models import (MoneyFlow, Status, Type, Category, Subcategory,
+                        StatusOwnership, TypeOwnership, CategoryOwnership,
+                        SubcategoryOwnership)
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+from api.serializers import MoneyFlowSerializer, UserSerializer
+from api.services import (CatalogService, MoneyFlowImportService,
+                          MoneyFlowService)
+from api.testing import check_query_budget, query_budget
+from api.views import MoneyFlowViewSet
+from users.models import Subscription, User
+
+
+class MoneyFlowApiTestCase(TestCase):
+    """Базовый класс API-тестов денежных операций."""
+
+    url = '/api/v1/money-flows/'
+
+    def setUp(self):
+        """Подготовка пользователя, справочников и клиента."""
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='tester',
+            email='tester@example.com',
+            password='testpass123'
+        )
+        self.status = Status.objects.create(name='Бизнес')
+        self.type = Type.objects.create(name='Расход')
+        self.category = Category.objects.create(name='Питание', type=self.type)
+        self.subcategory = Subcategory.objects.create(
+            name='Продукты',
+            category=self.category
+        )
+        StatusOwnership.objects.create(user=self.user, status=self.status)
+        TypeOwnership.objects.create(user=self.user, type=self.type)
+        CategoryOwnership.objects.create(user=self.user, category=self.category)
+        SubcategoryOwnership.objects.create(
+            user=self.user,
+            subcategory=self.subcategory
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_flow(self, created_at, amount='100.00', **kwargs):
+        data = {
+            'user': self.user,
+            'created_at': created_at,
+            'status': self.status,
+            'type': self.type,
+            'category': self.category,
+            'subcategory': self.subcategory,
+            'amount': Decimal(amount),
+        }
+        data.update(kwargs)
+        return MoneyFlow.objects.create(**data)
+
+
+class AsyncReadViewTest(TransactionTestCase):
+    """Тесты асинхронных чтений под ASGI.
+
+    Чтения идут в пуле потоков со своими соединениями с БД, поэтому
+    данные теста должны быть зафиксированы.
+    """
+
+    url = '/api/v1/money-flows/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='tester',
+            email='tester@example.com',
+            password='testpass123'
+        )
+        self.type = Type.objects.create(name='Расход')
+        self.category = Category.objects.create(name='Питание', type=self.type)
+        self.flow = MoneyFlow.objects.create(
+            user=self.user,
+            created_at=date(2024, 1, 1),
+            status=Status.objects.create(name='Бизнес'),
+            type=self.type,
+            category=self.category,
+            subcategory=Subcategory.objects.create(
+                name='Продукты', category=self.category
+            ),
+            amount=Decimal('100.00'),
+        )
+        MoneyFlowService().repository.rollups.add([self.flow.id])
+        self.token = Token.objects.create(user=self.user)
+        self.client = AsyncClient()
+
+    @async_to_sync
+    async def get(self, path, **params):
+        return await self.client.get(
+            path, params, authorization=f'Token {self.token.key}'
+        )
+
+    def test_list_detail_and_statistics(self):
+        """Тест списка, детальной записи и статистики через ASGI."""
+        response = self.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['id'], self.flow.id)
+
+        response = self.get(f'{self.url}{self.flow.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['amount'], '100.00')
+
+        response = self.get(f'{self.url}statistics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['summary']['total_count'], 1)
+
+    def test_unknown_token_is_rejected(self):
+        """Тест отказа с неизвестным токеном."""
+        self.token.key = 'unknown'
+        response = self.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(METRICS_ENABLED=True, DEBUG=True,
+                       COMPRESSION_ENABLED=True)
+    def test_concurrent_reads_overlap(self):
+        """Тест параллельных чтений через ASGIHandler.
+
+        Оба запроса ждут друг друга на барьере внутри вьюхи: если бы
+        цепочка middleware стала синхронной, второй запрос начался бы
+        только после первого и барьер сломался бы по таймауту.
+        """
+        handler = ASGIHandler()
+        self.assertTrue(
+            asyncio.iscoroutinefunction(handler._middleware_chain)
+        )
+        barrier = threading.Barrier(2, timeout=5)
+        get_validators = MoneyFlowViewSet.get_validators
+
+        def wait_for_other(view, request):
+            barrier.wait()
+            return get_validators(view, request)
+
+        async def request():
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                messages.append(message)
+
+            await handler({
+                'type': 'http', 'method': 'GET', 'path': self.url,
+                'query_string': b'', 'headers': [
+                    (b'host', b'testserver'),
+                    (b'authorization', f'Token {self.token.key}'.encode()),
+                ],
+            }, receive, send)
+            return messages[0]['status']
+
+        async def both():
+            return await asyncio.gather(request(), request())
+
+        with patch.object(MoneyFlowViewSet, 'get_validators',
+                          wait_for_other):
+            statuses = async_to_sync(both)()
+        self.assertEqual(statuses, [200, 200])
+
+
+class KeysetPaginationTest(MoneyFlowApiTestCase):
+    """Тесты keyset-пагинации списка операций."""
+
+    def setUp(self):
+        super().setUp()
+        self.flows = [
+            self.create_flow(date(2024, 1, day))
+            for day in (1, 2, 2, 3, 4)
+        ]
+        self.expected = [
+            flow.id for flow in sorted(
+                self.flows, key=lambda flow: (-flow.created_at.toordinal(), flow.id)
+            )
+        ]
+
+    def test_walk_forward_and_back(self):
+        """Тест обхода всех страниц вперед и назад."""
+        response = self.client.get(self.url, {'pagination': 'cursor', 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+
+        seen, pages = [], []
+        while True:
+            ids = [row['id'] for row in response.data['results']]
+            seen.extend(ids)
+            pages.append(ids)
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, self.expected)
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(
+            [row['id'] for row in response.data['results']], pages[-2]
+        )
+
+    def test_filters_and_approximate_count(self):
+        """Тест совместимости с фильтрами и приблизительного количества."""
+        response = self.client.get(self.url, {
+            'pagination': 'cursor',
+            'created_at_after': '2024-01-03',
+            'count': 'approx',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('count', response.data)
+        self.assertEqual(
+            [row['id'] for row in response.data['results']],
+            self.expected[:2]
+        )
+
+    def test_invalid_cursor(self):
+        """Тест обработки поврежденного курсора."""
+        response = self.client.get(self.url, {'cursor': 'broken'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_mode_is_default(self):
+        """Тест сохранения постраничной пагинации по умолчанию."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], len(self.flows))
+
+
+class ReferenceFilterTest(MoneyFlowApiTestCase):
+    """Тесты фильтров операций по справочникам."""
+
+    def setUp(self):
+        super().setUp()
+        other_category = Category.objects.create(name='Транспорт', type=self.type)
+        self.other_subcategory = Subcategory.objects.create(
+            name='Такси',
+            category=other_category
+        )
+        self.food = self.create_flow(date(2024, 1, 1))
+        self.taxi = self.create_flow(
+            date(2024, 1, 2),
+            category=other_category,
+            subcategory=self.other_subcategory
+        )
+
+    def get_ids(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_filter_by_id(self):
+        """Тест точных фильтров по ID и списку ID."""
+        self.assertEqual(
+            self.get_ids({'category_id': self.category.id}), [self.food.id]
+        )
+        self.assertEqual(
+            self.get_ids({
+                'subcategory_id__in':
+                    f'{self.subcategory.id},{self.other_subcategory.id}'
+            }),
+            [self.taxi.id, self.food.id]
+        )
+
+    def test_filter_by_name_resolves_ids(self):
+        """Тест поиска по названию через ID справочника."""
+        self.assertEqual(self.get_ids({'category': 'транс'}), [self.taxi.id])
+        self.assertEqual(self.get_ids({'subcategory': 'нет такой'}), [])
+
+
+class CommentSearchTest(MoneyFlowApiTestCase):
+    """Тесты полнотекстового поиска по комментарию."""
+
+    def setUp(self):
+        super().setUp()
+        self.groceries = self.create_flow(
+            date(2024, 1, 1), comment='Покупка продуктов на неделю'
+        )
+        self.more_groceries = self.create_flow(
+            date(2024, 1, 2), comment='Продукты, продукты и снова продукты'
+        )
+        self.create_flow(date(2024, 1, 3), comment='Такси домой')
+
+    def test_search_uses_russian_stemming_and_rank(self):
+        """Тест поиска со стеммингом и сортировкой по рангу."""
+        response = self.client.get(self.url, {'q': 'продукт'})
+        self.assertEqual(
+            [row['id'] for row in response.data['results']],
+            [self.more_groceries.id, self.groceries.id]
+        )
+
+    def test_search_vector_follows_comment_updates(self):
+        """Тест обновления поискового вектора при изменении комментария."""
+        self.groceries.comment = 'Ужин в ресторане'
+        self.groceries.save()
+        response = self.client.get(
+            self.url, {'q': 'ужин', 'pagination': 'cursor'}
+        )
+        self.assertEqual(
+            [row['id'] for row in response.data['results']],
+            [self.groceries.id]
+        )
+
+
+class MoneyFlowListSerializerTest(MoneyFlowApiTestCase):
+    """Тесты плоского сериализатора списка операций."""
+
+    def test_list_json_matches_model_serializer(self):
+        """Тест побайтового совпадения JSON со старым сериализатором."""
+        other_type = Type.objects.create(name='Доход')
+        TypeOwnership.objects.create(user=self.user, type=other_type)
+        self.create_flow(date(2024, 1, 1), '10.50', comment='Обед')
+        self.create_flow(date(2024, 1, 2), '0.01', type=other_type)
+
+        response = self.client.get(self.url)
+
+        flows = MoneyFlow.objects.filter(user=self.user).order_by('-created_at')
+        request = response.wsgi_request
+        expected = MoneyFlowSerializer(
+            flows, many=True, context={'request': request}
+        ).data
+        self.assertEqual(
+            JSONRenderer().render(response.data['results']),
+            JSONRenderer().render(expected)
+        )
+
+
+class CatalogValidationTest(MoneyFlowApiTestCase):
+    """Тесты валидации операций по снимку каталога пользователя."""
+
+    def payload(self, **kwargs):
+        data = {
+            'created_at': '2024-01-01',
+            'status': self.status.id,
+            'type': self.type.id,
+            'category': self.category.id,
+            'subcategory': self.subcategory.id,
+            'amount': '10.00',
+        }
+        data.update(kwargs)
+        return data
+
+    def test_catalog_is_fetched_once(self):
+        """Тест отсутствия запросов к владению справочниками после кэширования."""
+        self.client.post(self.url, self.payload(), format='json')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, self.payload(), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['category']['type_name'], self.type.name)
+        self.assertFalse(
+            [query for query in queries if 'ownership' in query['sql']]
+        )
+
+    def test_foreign_reference_is_rejected(self):
+        """Тест отказа для справочника, не принадлежащего пользователю."""
+        foreign = Status.objects.create(name='Чужой')
+        response = self.client.post(
+            self.url, self.payload(status=foreign.id), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.data)
+
+    def own(self, model, **kwargs):
+        """Справочник, принадлежащий пользователю."""
+        instance = model.objects.create(**kwargs)
+        ownership = {
+            Type: TypeOwnership, Category: CategoryOwnership,
+            Subcategory: SubcategoryOwnership,
+        }[model]
+        ownership.objects.create(
+            user=self.user, **{model._meta.model_name: instance}
+        )
+        return instance
+
+    def test_mismatched_hierarchy_is_rejected(self):
+        """Тест отказа для подкатегории чужой категории и категории чужого типа."""
+        income = self.own(Type, name='Доход')
+        salary = self.own(Category, name='Зарплата', type=income)
+        bonus = self.own(Subcategory, name='Премия', category=salary)
+
+        response = self.client.post(
+            self.url, self.payload(subcategory=bonus.id), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data), ['subcategory'])
+
+        response = self.client.post(
+            self.url, self.payload(type=income.id), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data), ['category'])
+
+        response = self.client.post(self.url, self.payload(
+            type=income.id, category=salary.id, subcategory=bonus.id
+        ), format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_partial_update_checks_stored_references(self):
+        """Тест проверки частичного обновления по полям операции."""
+        income = self.own(Type, name='Доход')
+        salary = self.own(Category, name='Зарплата', type=income)
+        flow = self.create_flow(date(2024, 1, 1))
+        url = f'{self.url}{flow.id}/'
+
+        response = self.client.patch(url, {'category': salary.id},
+                                     format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'subcategory', 'category'})
+
+        response = self.client.patch(url, {'type': income.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data), ['category'])
+
+        response = self.client.patch(url, {'amount': '20.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_catalog_version_bumped_on_ownership_change(self):
+        """Тест сброса снимка при добавлении справочника пользователем."""
+        self.client.post(self.url, self.payload(), format='json')
+        response = self.client.post(
+            '/api/v1/my/statuses/', {'name': 'Личное'}, format='json'
+        )
+        response = self.client.post(
+            self.url, self.payload(status=response.data['id']), format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+
+class MyCatalogTest(MoneyFlowApiTestCase):
+    """Тесты дерева справочников пользователя с ETag."""
+
+    url = '/api/v1/my/catalog/'
+
+    def test_tree(self):
+        """Тест дерева своих справочников за четыре запроса."""
+        other_type = Type.objects.create(name='Доход', sign=1)
+        Category.objects.create(name='Зарплата', type=other_type)
+
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'statuses': [
+                {'id': self.status.id, 'name': 'Бизнес', 'description': ''},
+            ],
+            'types': [{
+                'id': self.type.id,
+                'name': 'Расход',
+                'sign': -1,
+                'categories': [{
+                    'id': self.category.id,
+                    'name': 'Питание',
+                    'subcategories': [
+                        {'id': self.subcategory.id, 'name': 'Продукты'},
+                    ],
+                }],
+            }],
+        })
+        self.assertTrue(response['ETag'])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_not_modified_without_queries(self):
+        """Тест ответа 304 без запросов к БД при неизмененном каталоге."""
+        etag = self.client.get(self.url)['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(context), 0)
+
+    def test_catalog_change_updates_etag(self):
+        """Тест нового ETag и дерева после изменения справочников."""
+        etag = self.client.get(self.url)['ETag']
+        self.client.post('/api/v1/my/statuses/', {'name': 'Личное'})
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            [item['name'] for item in response.json()['statuses']],
+            ['Бизнес', 'Личное']
+        )
+
+    def test_read_during_transaction_is_not_cached(self):
+        """Тест сброса дерева, прочитанного конкурентно до коммита.
+
+        Конкурентное чтение видит справочники до коммита, но уже новую
+        версию и кэширует под ней старое дерево; после коммита версия
+        увеличивается еще раз.
+        """
+        service = CatalogService()
+        stale = self.client.get(self.url).json()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/v1/my/statuses/', {'name': 'Личное'})
+            cache.set(service.tree_key.format(
+                user_id=self.user.pk, version=service.get_version(self.user)
+            ), stale)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(
+            [item['name'] for item in response.json()['statuses']],
+            ['Бизнес', 'Личное']
+        )
+
+    def test_destroy_bumps_version_after_delete(self):
+        """Тест новой версии каталога владельцев после удаления."""
+        service = CatalogService()
+        version = service.get_version(self.user)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.delete(f'/api/v1/statuses/{self.status.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertTrue(callbacks)
+        self.assertGreater(service.get_version(self.user), version + 1)
+
+
+class ConditionalGetTest(MoneyFlowApiTestCase):
+    """Тесты ETag и Last-Modified списков, деталей и отчетов."""
+
+    def flow_data(self):
+        return {
+            'created_at': '2024-01-15',
+            'status': self.status.id,
+            'type': self.type.id,
+            'category': self.category.id,
+            'subcategory': self.subcategory.id,
+            'amount': '150.00',
+        }
+
+    def test_not_modified_without_queries(self):
+        """Тест ответа 304 до обращения к БД для списка и отчетов."""
+        self.create_flow(date(2024, 1, 10))
+        for url in (self.url, f'{self.url}statistics/',
+                    f'{self.url}time-series/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response['Last-Modified'])
+
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(len(context), 0)
+
+    def test_write_changes_etag(self):
+        """Тест нового ETag после записи операции и изменения каталога."""
+        etag = self.client.get(self.url)['ETag']
+        created = self.client.post(self.url, self.flow_data(), format='json')
+        detail_url = f'{self.url}{created.json()["id"]}/'
+        detail_etag = self.client.get(detail_url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+        etag = response['ETag']
+        self.client.post('/api/v1/my/statuses/', {'name': 'Личное'})
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200
+        )
+        self.client.patch(detail_url, {'amount': '200.00'}, format='json')
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['amount'], '200.00')
+
+    def test_etag_depends_on_query(self):
+        """Тест разных ETag для разных фильтров и пользователей."""
+        first = self.client.get(self.url, {'limit': 5})['ETag']
+        self.assertNotEqual(first, self.client.get(self.url)['ETag'])
+
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(other)
+        response = self.client.get(
+            self.url, {'limit': 5}, HTTP_IF_NONE_MATCH=first
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_changes_are_tracked(self):
+        """Тест обновления агрегатов и ETag при правке операции в админке."""
+        from django.contrib.admin.sites import site
+        flow = self.client.post(self.url, self.flow_data(), format='json')
+        etag = self.client.get(self.url)['ETag']
+        flow = MoneyFlow.objects.get(pk=flow.json()['id'])
+        flow.amount = Decimal('300.00')
+
+        site._registry[MoneyFlow].save_model(None, flow, None, True)
+
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200
+        )
+        statistics = self.client.get(f'{self.url}statistics/').json()
+        self.assertEqual(Decimal(str(statistics['summary']['total_amount'])),
+                         Decimal('300.00'))
+
+
+class MoneyFlowImportTest(MoneyFlowApiTestCase):
+    """Тесты потокового импорта операций."""
+
+    import_url = '/api/v1/money-flows/import/'
+
+    def upload(self, name, content, **data):
+        return self.client.post(
+            self.import_url,
+            {'file': SimpleUploadedFile(name, content.encode()), **data},
+            format='multipart'
+        )
+
+    def test_csv_import_by_names_and_ids(self):
+        """Тест импорта CSV с названиями, ID и ошибочными строками."""
+        content = (
+            'created_at,status,type,category,subcategory,amount,comment\n'
+            f'2024-01-01,Бизнес,Расход,Питание,Продукты,10.50,Обед\n'
+            f'2024-01-02,{self.status.id},{self.type.id},{self.category.id},'
+            f'{self.subcategory.id},20,\n'
+            '2024-13-01,Бизнес,Расход,Неизвестно,Продукты,-1,\n'
+        )
+        response = self.upload('flows.csv', content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rows'], 3)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['error_count'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 3)
+        self.assertEqual(
+            set(response.data['errors'][0]['errors']),
+            {'created_at', 'amount', 'category', 'subcategory'}
+        )
+        self.assertIn('rows_per_second', response.data)
+        stats = MoneyFlowService().get_statistics_report(self.user)
+        self.assertEqual(stats['summary']['total_amount'], Decimal('30.50'))
+
+    def test_ndjson_import_in_chunks(self):
+        """Тест импорта NDJSON порциями с невалидной строкой."""
+        line = (
+            '{"created_at": "2024-01-01", "status": "бизнес", '
+            '"type": "Расход", "category": "Питание", '
+            '"subcategory": "Продукты", "amount": "1.00"}\n'
+        )
+        service = MoneyFlowImportService(chunk_size=2)
+        report = service.import_file(
+            SimpleUploadedFile('flows.ndjson', (line * 5 + '{oops\n').encode()),
+            'ndjson',
+            self.user
+        )
+        self.assertEqual(report['created'], 5)
+        self.assertEqual(report['errors'], [{'row': 6, 'errors': {
+            'row': ['Некорректная строка']
+        }}])
+        self.assertEqual(MoneyFlow.objects.filter(user=self.user).count(), 5)
+
+    def test_digit_names_and_booleans(self):
+        """Тест названия из цифр и отказа для логических значений."""
+        year = Subcategory.objects.create(name='2024', category=self.category)
+        SubcategoryOwnership.objects.create(user=self.user, subcategory=year)
+        rows = [
+            {'created_at': '2024-01-01', 'status': 'Бизнес', 'type': 'Расход',
+             'category': 'Питание', 'subcategory': '2024', 'amount': '1.00'},
+            {'created_at': '2024-01-01', 'status': True, 'type': 'Расход',
+             'category': 'Питание', 'subcategory': year.id, 'amount': '1.00'},
+        ]
+        report = MoneyFlowImportService().import_rows(rows, self.user)
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(
+            MoneyFlow.objects.get(user=self.user).subcategory_id, year.id
+        )
+        self.assertEqual(report['errors'][0]['row'], 2)
+        self.assertEqual(report['errors'][0]['errors'],
+                         {'status': ['Некорректный справочник']})
+
+    def test_category_of_other_type_is_rejected(self):
+        """Тест отказа для категории другого типа, как в сериализаторе."""
+        income = Type.objects.create(name='Доход', sign=1)
+        TypeOwnership.objects.create(user=self.user, type=income)
+        rows = [
+            {'created_at': '2024-01-01', 'status': 'Бизнес', 'type': 'Доход',
+             'category': 'Питание', 'subcategory': 'Продукты',
+             'amount': '1.00'},
+            {'created_at': '2024-01-01', 'status': 'Бизнес',
+             'type': income.id, 'category': self.category.id,
+             'subcategory': self.subcategory.id, 'amount': '1.00'},
+        ]
+        report = MoneyFlowImportService().import_rows(rows, self.user)
+
+        self.assertEqual(report['created'], 0)
+        self.assertEqual(len(report['errors']), 2)
+        for error in report['errors']:
+            self.assertEqual(error['errors'], {
+                'category': ['Категория не относится к выбранному типу']
+            })
+
+    def test_unknown_format_is_rejected(self):
+        """Тест отказа для неподдерживаемого формата файла."""
+        response = self.upload('flows.xlsx', 'data')
+        self.assertEqual(response.status_code, 400)
+
+
+class MoneyFlowExportTest(MoneyFlowApiTestCase):
+    """Тесты потоковой выгрузки операций."""
+
+    export_url = '/api/v1/money-flows/export/'
+
+    def setUp(self):
+        super().setUp()
+        self.create_flow(date(2024, 1, 1), '10.50', comment='Обед, кафе')
+        self.create_flow(date(2024, 2, 1), '20.00')
+
+    def export(self, params):
+        response = self.client.get(self.export_url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_export_round_trips_through_import(self):
+        """Тест выгрузки CSV, совместимой с импортом."""
+        response, content = self.export({'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = content.splitlines()
+        self.assertEqual(
+            lines[0],
+            'id,created_at,status,type,category,subcategory,amount,comment'
+        )
+        self.assertTrue(lines[1].endswith(',2024-02-01,Бизнес,Расход,Питание,Продукты,20.00,'))
+
+        report = MoneyFlowImportService().import_file(
+            SimpleUploadedFile('flows.csv', content.encode()), 'csv', self.user
+        )
+        self.assertEqual(report['created'], 2)
+
+    def test_ndjson_export_with_filters(self):
+        """Тест выгрузки NDJSON с параметрами MoneyFlowFilter."""
+        _, content = self.export({
+            'format': 'ndjson',
+            'created_at_before': '2024-01-31',
+        })
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['amount'], '10.50')
+        self.assertEqual(rows[0]['comment'], 'Обед, кафе')
+
+
+class TimeSeriesEndpointTest(MoneyFlowApiTestCase):
+    """Тесты эндпоинта временного ряда."""
+
+    url = '/api/v1/money-flows/time-series/'
+
+    def test_monthly_series(self):
+        """Тест месячного ряда за период."""
+        flow = self.create_flow(date(2024, 2, 10), '30.00')
+        MoneyFlowService().repository.rollups.add([flow.id])
+
+        response = self.client.get(self.url, {
+            'start_date': '2024-01-01',
+            'end_date': '2024-03-31',
+            'granularity': 'month',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        points = response.data['series'][0]['points']
+        self.assertEqual(
+            [(str(point['period']), point['count']) for point in points],
+            [('2024-01-01', 0), ('2024-02-01', 1), ('2024-03-01', 0)]
+        )
+
+    def test_invalid_params(self):
+        """Тест ошибок валидации параметров."""
+        for params in ({'granularity': 'year'},
+                       {'group_by': 'status'},
+                       {'start_date': '2024-02-01', 'end_date': '2024-01-01'},
+                       {'start_date': '1990-01-01', 'end_date': '2024-01-01'}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+
+
+class BalanceEndpointTest(MoneyFlowApiTestCase):
+    """Тесты эндпоинта нарастающего баланса."""
+
+    url = '/api/v1/money-flows/balance/'
+
+    def test_pages_by_date(self):
+        """Тест страниц по дням со ссылкой на следующую."""
+        flow = self.create_flow(date(2024, 1, 2), '30.00')
+        MoneyFlowService().repository.rollups.add([flow.id])
+
+        response = self.client.get(self.url, {
+            'start_date': '2024-01-01',
+            'end_date': '2024-01-03',
+            'limit': 2,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        points = response.data['results'][0]['points']
+        self.assertEqual(
+            [str(point['date']) for point in points],
+            ['2024-01-01', '2024-01-02']
+        )
+        self.assertIn('start_date=2024-01-03', response.data['next'])
+
+        response = self.client.get(response.data['next'])
+
+        self.assertIsNone(response.data['next'])
+        points = response.data['results'][0]['points']
+        self.assertEqual(
+            [(str(point['date']), point['balance']) for point in points],
+            [('2024-01-03', Decimal('-30.00'))]
+        )
+
+class DistributionEndpointTest(MoneyFlowApiTestCase):
+    """Тесты эндпоинта распределения сумм."""
+
+    url = '/api/v1/money-flows/distribution/'
+
+    def test_distribution(self):
+        """Тест перцентилей и гистограммы за период."""
+        self.create_flow(date(2024, 2, 10), '30.00')
+        self.create_flow(date(2024, 2, 11), '10.00')
+
+        response = self.client.get(self.url, {
+            'start_date': '2024-02-01',
+            'end_date': '2024-02-29',
+            'bins': 2,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary']['p50'], 20.0)
+        self.assertEqual(response.data['histogram']['counts'], [1, 1])
+        self.assertEqual(len(response.data['rolling']), 29)
+
+    def test_invalid_params(self):
+        """Тест ошибок валидации параметров."""
+        for params in ({'bins': 0}, {'bins': 1000},
+                       {'start_date': '2024-02-01', 'end_date': '2024-01-01'}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+
+class MonthlyReportEndpointTest(MoneyFlowApiTestCase):
+    """Тесты эндпоинта отчета по месяцам."""
+
+    url = '/api/v1/money-flows/monthly-report/'
+
+    def test_period_report(self):
+        """Тест отчета за несколько месяцев."""
+        flow = self.create_flow(date(2024, 2, 10), '30.00')
+        MoneyFlowService().repository.rollups.add([flow.id])
+
+        response = self.client.get(
+            self.url, {'start_month': '2024-01', 'end_month': '2024-03'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [month['total_count'] for month in response.data['months']],
+            [0, 1, 0]
+        )
+        self.assertEqual(response.data['summary']['total_count'], 1)
+
+    def test_invalid_months(self):
+        """Тест ошибок валидации месяцев."""
+        for params in ({'start_month': '2024-13'},
+                       {'start_month': '2024-03', 'end_month': '2024-01'},
+                       {'start_month': '2000-01', 'end_month': '2024-01'}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+
+
+class QueryStatsMiddlewareTest(MoneyFlowApiTestCase):
+    """Тесты заголовков со статистикой SQL-запросов."""
+
+    @override_settings(DEBUG=True)
+    def test_headers_in_debug(self):
+        """Тест числа запросов и времени в БД в заголовках."""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['X-DB-Query-Count'], '1')
+        self.assertGreater(float(response['X-DB-Query-Time']), 0)
+        self.assertTrue(response['Server-Timing'].startswith('db;dur='))
+
+    def test_no_headers_without_debug(self):
+        """Тест отключенной статистики вне DEBUG."""
+        response = self.client.get(self.url)
+
+        self.assertNotIn('X-DB-Query-Count', response)
+
+
+class FastJSONTest(MoneyFlowApiTestCase):
+    """Тесты FastJSONRenderer и FastJSONParser."""
+
+    def test_renderer_matches_json_renderer(self):
+        """Тест побайтового совпадения с JSONRenderer."""
+        data = {
+            'amount': Decimal('10.50'),
+            'day': date(2024, 1, 15),
+            'moment': datetime(2024, 1, 15, 12, 30, 5, 120000,
+                               tzinfo=timezone.utc),
+            'naive': datetime(2024, 1, 15, 12, 30),
+            'by_month': {1: 'Январь', 2: None},
+            'text': 'Кафе\u2028обед',
+            'rows': [MoneyFlowSerializer(
+                self.create_flow(date(2024, 1, 10))
+            ).data],
+        }
+        self.assertEqual(FastJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_datetimes_match_json_renderer(self):
+        """Тест дат и времени в формате кодировщика DRF."""
+        data = [
+            datetime(2024, 1, 15, 12, 30, 5, 1, tzinfo=timezone.utc),
+            datetime(2024, 1, 15, tzinfo=ZoneInfo('Europe/London')),
+            datetime(1900, 1, 1, tzinfo=ZoneInfo('Europe/Moscow')),
+            datetime(2024, 1, 15, 12, tzinfo=timezone(timedelta(hours=-3))),
+            datetime(1, 1, 1),
+            time(12, 30, 5, 123456),
+        ]
+        self.assertEqual(FastJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+
+    def test_indent_falls_back_to_json_renderer(self):
+        """Тест форматирования с отступом через JSONRenderer."""
+        data = {'amount': Decimal('1.5')}
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=4'),
+            JSONRenderer().render(data, 'application/json; indent=4')
+        )
+
+    def test_parser_keeps_decimal_amounts(self):
+        """Тест создания операции из JSON с суммой строкой и числом."""
+        for amount in ('12.34', 12.34):
+            response = self.client.generic(
+                'POST', self.url, json.dumps({
+                    'created_at': '2024-01-15',
+                    'status': self.status.id,
+                    'type': self.type.id,
+                    'category': self.category.id,
+                    'subcategory': self.subcategory.id,
+                    'amount': amount,
+                    'comment': 'Кофе',
+                }, ensure_ascii=False).encode(), 'application/json'
+            )
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json()['amount'], '12.34')
+        self.assertEqual(
+            FastJSONParser().parse(BytesIO(b'{"a": [1, 2.5, null]}')),
+            {'a': [1, 2.5, None]}
+        )
+
+    def test_invalid_json(self):
+        """Тест ответа 400 на некорректный JSON."""
+        response = self.client.generic(
+            'POST', self.url, b'{"amount": NaN}', 'application/json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.json()['detail'])
+
+
+class CompressionMiddlewareTest(MoneyFlowApiTestCase):
+    """Тесты сжатия ответов по Accept-Encoding."""
+
+    def setUp(self):
+        super().setUp()
+        for day in range(1, 11):
+            self.create_flow(date(2024, 1, day), comment='Обед в кафе')
+
+    def get(self, encoding, **extra):
+        return self.client.get(self.url, HTTP_ACCEPT_ENCODING=encoding,
+                               **extra)
+
+    def test_gzip_list_and_conditional_get(self):
+        """Тест сжатого списка, слабого ETag и ответа 304 на него."""
+        plain = self.client.get(self.url)
+        response = self.get('gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(response['ETag'], f'W/{plain["ETag"]}')
+        self.assertEqual(
+            self.get('gzip', HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+            304
+        )
+
+    @skipUnless(brotli, 'brotli не установлен')
+    def test_brotli_is_preferred(self):
+        """Тест выбора brotli и учета веса q."""
+        plain = self.client.get(self.url).content
+        response = self.get('gzip, deflate, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), plain)
+        self.assertEqual(self.get('br;q=0, gzip')['Content-Encoding'], 'gzip')
+        self.assertEqual(self.get('*')['Content-Encoding'], 'br')
+
+    def test_small_and_unaccepted_responses_are_not_compressed(self):
+        """Тест ответов меньше порога и без подходящей кодировки."""
+        self.assertNotIn('Content-Encoding', self.get('identity'))
+        self.assertNotIn('Content-Encoding', self.get('gzip;q=0, br;q=0'))
+        with override_settings(COMPRESSION_MIN_SIZE=10 ** 6):
+            response = self.get('gzip')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertNotIn('Accept-Encoding', response.get('Vary', ''))
+
+    def test_streaming_export_is_compressed(self):
+        """Тест потокового сжатия выгрузки."""
+        response = self.client.get(
+            f'{self.url}export/', {'format': 'ndjson'},
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(content.decode().splitlines()), 10)
+
+
+class MetricsTest(MoneyFlowApiTestCase):
+    """Тесты метрик Prometheus."""
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_latency_and_status_by_viewset_action(self):
+        """Тест метрик с метками вьюсета и действия."""
+        labels = {'view': 'money-flows', 'action': 'statistics',
+                  'method': 'GET'}
+        before = self.sample('http_request_duration_seconds_count', **labels)
+        statuses = self.sample(
+            'http_responses_total', status='200', **labels
+        )
+
+        self.client.get('/api/v1/money-flows/statistics/')
+
+        self.assertEqual(
+            self.sample('http_request_duration_seconds_count', **labels),
+            before + 1
+        )
+        self.assertEqual(
+            self.sample('http_responses_total', status='200', **labels),
+            statuses + 1
+        )
+        self.assertGreater(self.sample('db_queries_total', **labels), 0)
+
+    def test_streamed_export_is_recorded_after_stream(self):
+        """Тест учета запросов выгрузки, выполненных во время потока."""
+        self.create_flow(date(2024, 1, 1))
+        labels = {'view': 'money-flows', 'action': 'export', 'method': 'GET'}
+        requests = self.sample('http_request_duration_seconds_count', **labels)
+        queries = self.sample('db_queries_total', **labels)
+        in_progress = self.sample('http_requests_in_progress')
+
+        response = self.client.get(f'{self.url}export/', {'format': 'csv'})
+        self.assertEqual(
+            self.sample('http_requests_in_progress'), in_progress + 1
+        )
+        b''.join(response.streaming_content)
+
+        self.assertEqual(
+            self.sample('http_request_duration_seconds_count', **labels),
+            requests + 1
+        )
+        self.assertGreater(self.sample('db_queries_total', **labels), queries)
+        self.assertEqual(self.sample('http_requests_in_progress'), in_progress)
+
+    def test_metrics_endpoint(self):
+        """Тест текстового формата /metrics."""
+        self.client.get(self.url)
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_bucket{action="list"', content
+        )
+        self.assertIn('http_requests_in_progress', content)
+        self.assertIn('cache_requests_total', content)
+
+
+class QueryBudgetTest(MoneyFlowApiTestCase):
+    """Бюджеты SQL-запросов эндпоинтов при 1, 10 и 100 строках."""
+
+    def create_users(self, rows):
+        self.user.is_staff = True
+        self.user.save(update_fields=['is_staff'])
+        users = User.objects.bulk_create(
+            User(username=f'user{number}', email=f'user{number}@example.com')
+            for number in range(rows)
+        )
+        Subscription.objects.bulk_create(
+            Subscription(user=self.user, subscribed_to=user) for user in users
+        )
+
+    @query_budget(2)
+    def test_money_flow_list(self, rows):
+        """Тест списка операций."""
+        MoneyFlow.objects.bulk_create(
+            MoneyFlow(user=self.user, created_at=date(2024, 1, 1),
+                      status=self.status, type=self.type,
+                      category=self.category, subcategory=self.subcategory,
+                      amount=Decimal('1.00'))
+            for _ in range(rows)
+        )
+        return lambda: self.client.get(self.url, {'limit': 10})
+
+    @query_budget(2)
+    def test_user_list(self, rows):
+        """Тест списка пользователей с признаком подписки."""
+        self.create_users(rows)
+        return lambda: self.client.get('/api/v1/users/', {'limit': 10})
+
+    @query_budget(2)
+    def test_subscriptions(self, rows):
+        """Тест списка подписок."""
+        self.create_users(rows)
+        return lambda: self.client.get(
+            '/api/v1/users/subscriptions/', {'limit': 10}
+        )
+
+    @query_budget(2)
+    def test_my_categories(self, rows):
+        """Тест списка своих категорий."""
+        CategoryOwnership.objects.bulk_create(
+            CategoryOwnership(user=self.user, category=category)
+            for category in Category.objects.bulk_create(
+                Category(name=f'Категория {number}', type=self.type)
+                for number in range(rows)
+            )
+        )
+        return lambda: self.client.get('/api/v1/my/categories/')
+
+    def test_budget_catches_n_plus_one(self):
+        """Тест срабатывания бюджета на запросе в цикле."""
+        def setup(rows):
+            self.create_users(rows)
+
+            def call():
+                for user in User.objects.all():
+                    UserSerializer(
+                        user, context={'request': self.fake_request}
+                    ).data
+
+            return call
+
+        self.fake_request = type('Request', (), {'user': self.user})
+        with self.assertRaisesMessage(AssertionError, 'при 10 строках'):
+            check_query_budget(5, setup)
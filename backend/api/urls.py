@@ -4,6 +4,7 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
 
+from .async_views import async_read_view
 from .views import (
     MyUserViewSet,
     StatusViewSet,
@@ -15,6 +16,7 @@ from .views import (
     MyTypeViewSet,
     MyCategoryViewSet,
     MySubcategoryViewSet,
+    MyCatalogViewSet,
 )
 
 schema_view = get_schema_view(
@@ -42,10 +44,22 @@ router.register('my/statuses', MyStatusViewSet, basename='my-statuses')
 router.register('my/types', MyTypeViewSet, basename='my-types')
 router.register('my/categories', MyCategoryViewSet, basename='my-categories')
 router.register('my/subcategories', MySubcategoryViewSet, basename='my-subcategories')
+router.register('my/catalog', MyCatalogViewSet, basename='my-catalog')
+
+# Чтения операций и статистики под ASGI обслуживаются асинхронно
+ASYNC_READ_ROUTES = (
+    'money-flows-list', 'money-flows-detail', 'money-flows-statistics',
+    'money-flows-time-series', 'money-flows-monthly-report',
+    'money-flows-distribution', 'money-flows-balance',
+)
+router_urls = router.urls
+for pattern in router_urls:
+    if pattern.name in ASYNC_READ_ROUTES:
+        pattern.callback = async_read_view(pattern.callback)
 
 urlpatterns = [
     
-    path('v1/', include(router.urls)),
+    path('v1/', include(router_urls)),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
     
@@ -1,23 +1,37 @@
+from datetime import date, datetime, time
+
 from djoser.views import UserViewSet
 from rest_framework import (status,
                             viewsets)
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import (
     IsAuthenticated, IsAuthenticatedOrReadOnly,
 )
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 from django_filters import rest_framework as filters
 from django.db import transaction
+from django.db.models import BooleanField, Exists, OuterRef, Value
+from django.http import StreamingHttpResponse
 
+from .constants import TYPE_SIGN_EXPENSE
 from .models import (MoneyFlow,
                      Status, Type, Category, Subcategory,
                      StatusOwnership, TypeOwnership, CategoryOwnership, SubcategoryOwnership)
 from .serializers import (StatusSerializer, TypeSerializer, CategorySerializer,
                           SubcategorySerializer, MoneyFlowSerializer,
-                          AvatarSerializer)
+                          MoneyFlowListSerializer, AvatarSerializer,
+                          BalanceQuerySerializer, DistributionQuerySerializer,
+                          MonthlyReportQuerySerializer,
+                          TimeSeriesQuerySerializer)
 from .serializers import UserSerializer
-from .pagination import CustomPagination
+from .pagination import CustomPagination, DatePagination, MoneyFlowPagination
+from .renderers import CSVRenderer, NDJSONRenderer
+from .cache import money_flow_versions
+from .conditional import (conditional_get, not_modified, request_fingerprint,
+                          set_validators, version_etag)
+from .services import (AnalyticsService, CatalogService,
+                       MoneyFlowExportService, MoneyFlowImportService)
 from users.models import User, Subscription
 
 
@@ -64,25 +78,47 @@ class MyUserViewSet(UserViewSet):
         request.user.avatar.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Subscription.objects.filter(
+                    user=user, subscribed_to=OuterRef('pk')
+                )
+            ))
+        return queryset
+
     @action(
         detail=False,
         url_path='subscriptions',
         pagination_class=CustomPagination,
+        permission_classes=[IsAuthenticated]
     )
     def get_subscriptions(self, *args, **kwargs):
-        subscriptions_list = Subscription.objects.filter(
-            user=self.request.user)
-        use1r = []
-        for i in subscriptions_list:
-            new_user = UserSerializer(i.subscribed_to).data
-            new_user['is_subscribed'] = True
-            if 'recipes_limit' in self.request.GET:
+        """Пользователи, на которых подписан текущий пользователь.
+
+        Страница выбирается в БД до сериализации, признак подписки
+        задается в запросе, так что число запросов не зависит от
+        количества подписок.
+        """
+        subscriptions = User.objects.filter(
+            subscribers__user=self.request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).order_by('id')
+        page = self.paginate_queryset(subscriptions)
+        data = UserSerializer(
+            page, many=True, context=self.get_serializer_context()
+        ).data
+        if 'recipes_limit' in self.request.GET:
+            for new_user in data:
                 new_user['limit'] = self.request.GET['recipes_limit']
-            use1r.append(new_user)
-        paginator = self.paginator
-        result_page = paginator.paginate_queryset(use1r, self.request)
-        serializer = SubscribeSerializer(result_page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        return self.get_paginated_response(data)
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Фильтр по списку ID через запятую."""
 
 
 class MoneyFlowFilter(filters.FilterSet):
@@ -91,63 +127,92 @@ class MoneyFlowFilter(filters.FilterSet):
     created_at_after = filters.DateFilter(field_name='created_at', lookup_expr='gte')
     created_at_before = filters.DateFilter(field_name='created_at', lookup_expr='lte')
     
-    status = filters.CharFilter(
-        field_name='status__name',
-        lookup_expr='icontains'
-    )
-    type = filters.CharFilter(
-        field_name='type__name',
-        lookup_expr='icontains'
-    )
-    category = filters.CharFilter(
-        field_name='category__name',
-        lookup_expr='icontains'
-    )
-    subcategory = filters.CharFilter(
-        field_name='subcategory__name',
-        lookup_expr='icontains'
-    )
+    status = filters.CharFilter(method='filter_reference_name')
+    type = filters.CharFilter(method='filter_reference_name')
+    category = filters.CharFilter(method='filter_reference_name')
+    subcategory = filters.CharFilter(method='filter_reference_name')
+
+    status_id = filters.NumberFilter(field_name='status_id')
+    status_id__in = NumberInFilter(field_name='status_id', lookup_expr='in')
+    type_id = filters.NumberFilter(field_name='type_id')
+    type_id__in = NumberInFilter(field_name='type_id', lookup_expr='in')
+    category_id = filters.NumberFilter(field_name='category_id')
+    category_id__in = NumberInFilter(field_name='category_id', lookup_expr='in')
+    subcategory_id = filters.NumberFilter(field_name='subcategory_id')
+    subcategory_id__in = NumberInFilter(field_name='subcategory_id', lookup_expr='in')
+
+    q = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = MoneyFlow
-        fields = ['created_at', 'created_at_after', 'created_at_before', 'status', 'type', 'category', 'subcategory']
+        fields = ['created_at', 'created_at_after', 'created_at_before',
+                  'status', 'type', 'category', 'subcategory',
+                  'status_id', 'status_id__in', 'type_id', 'type_id__in',
+                  'category_id', 'category_id__in',
+                  'subcategory_id', 'subcategory_id__in', 'q']
+
+    def filter_reference_name(self, queryset, name, value):
+        """Поиск по названию справочника: сначала ID, затем IN по индексу."""
+        from .repositories import MoneyFlowRepository
+        return MoneyFlowRepository().filter_by_reference_name(
+            queryset, name, value
+        )
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по комментарию."""
+        from .repositories import MoneyFlowRepository
+        return MoneyFlowRepository().search(queryset, value)
+
+
+class CatalogInvalidationMixin:
+    """Сброс снимков каталога у владельцев изменяемого справочника."""
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        CatalogService().bump_owners_version(serializer.instance)
+
+    def perform_destroy(self, instance):
+        service = CatalogService()
+        owner_ids = service.owner_ids(instance)
+        super().perform_destroy(instance)
+        service.bump_versions(owner_ids)
 
 
-class StatusViewSet(viewsets.ModelViewSet):
+class StatusViewSet(CatalogInvalidationMixin, viewsets.ModelViewSet):
     """Вьюсет для работы со статусами (глобальный, read-only для анонимов)."""
     serializer_class = StatusSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     queryset = Status.objects.all()
 
 
-class TypeViewSet(viewsets.ModelViewSet):
+class TypeViewSet(CatalogInvalidationMixin, viewsets.ModelViewSet):
     """Вьюсет для работы с типами операций (глобальный, read-only для анонимов)."""
     serializer_class = TypeSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     queryset = Type.objects.all()
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CatalogInvalidationMixin, viewsets.ModelViewSet):
     """Вьюсет для работы с категориями (глобальный, read-only для анонимов)."""
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    queryset = Category.objects.all()
+    queryset = Category.objects.select_related('type')
 
 
-class SubcategoryViewSet(viewsets.ModelViewSet):
+class SubcategoryViewSet(CatalogInvalidationMixin, viewsets.ModelViewSet):
     """Вьюсет для работы с подкатегориями (глобальный, read-only для анонимов)."""
     serializer_class = SubcategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
-        queryset = Subcategory.objects.all()
+        queryset = Subcategory.objects.select_related('category')
         category_id = self.request.query_params.get('category')
         if category_id is not None:
             queryset = queryset.filter(category_id=category_id)
         return queryset
 
 
-class MyStatusViewSet(viewsets.ModelViewSet):
+class MyStatusViewSet(CatalogInvalidationMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = StatusSerializer
 
@@ -159,6 +224,7 @@ class MyStatusViewSet(viewsets.ModelViewSet):
         name = serializer.validated_data.get('name')
         status_obj, _ = Status.objects.get_or_create(name=name)
         StatusOwnership.objects.get_or_create(user=self.request.user, status=status_obj)
+        CatalogService().bump_version(self.request.user)
         serializer.instance = status_obj
 
     @transaction.atomic
@@ -166,9 +232,10 @@ class MyStatusViewSet(viewsets.ModelViewSet):
         StatusOwnership.objects.filter(user=self.request.user, status=instance).delete()
         if not instance.owners.exists():
             instance.delete()
+        CatalogService().bump_version(self.request.user)
 
 
-class MyTypeViewSet(viewsets.ModelViewSet):
+class MyTypeViewSet(CatalogInvalidationMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = TypeSerializer
 
@@ -178,8 +245,14 @@ class MyTypeViewSet(viewsets.ModelViewSet):
     @transaction.atomic
     def perform_create(self, serializer):
         name = serializer.validated_data.get('name')
-        type_obj, _ = Type.objects.get_or_create(name=name)
+        type_obj, _ = Type.objects.get_or_create(
+            name=name,
+            defaults={'sign': serializer.validated_data.get(
+                'sign', TYPE_SIGN_EXPENSE
+            )}
+        )
         TypeOwnership.objects.get_or_create(user=self.request.user, type=type_obj)
+        CatalogService().bump_version(self.request.user)
         serializer.instance = type_obj
 
     @transaction.atomic
@@ -187,14 +260,17 @@ class MyTypeViewSet(viewsets.ModelViewSet):
         TypeOwnership.objects.filter(user=self.request.user, type=instance).delete()
         if not instance.owners.exists():
             instance.delete()
+        CatalogService().bump_version(self.request.user)
 
 
-class MyCategoryViewSet(viewsets.ModelViewSet):
+class MyCategoryViewSet(CatalogInvalidationMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = CategorySerializer
 
     def get_queryset(self):
-        return Category.objects.filter(owners__user=self.request.user).distinct()
+        return Category.objects.filter(
+            owners__user=self.request.user
+        ).select_related('type').distinct()
 
     @transaction.atomic
     def perform_create(self, serializer):
@@ -207,6 +283,7 @@ class MyCategoryViewSet(viewsets.ModelViewSet):
             type=type_obj,
         )
         CategoryOwnership.objects.get_or_create(user=self.request.user, category=category_obj)
+        CatalogService().bump_version(self.request.user)
         serializer.instance = category_obj
 
     @transaction.atomic
@@ -214,14 +291,17 @@ class MyCategoryViewSet(viewsets.ModelViewSet):
         CategoryOwnership.objects.filter(user=self.request.user, category=instance).delete()
         if not instance.owners.exists():
             instance.delete()
+        CatalogService().bump_version(self.request.user)
 
 
-class MySubcategoryViewSet(viewsets.ModelViewSet):
+class MySubcategoryViewSet(CatalogInvalidationMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = SubcategorySerializer
 
     def get_queryset(self):
-        qs = Subcategory.objects.filter(owners__user=self.request.user).distinct()
+        qs = Subcategory.objects.filter(
+            owners__user=self.request.user
+        ).select_related('category').distinct()
         category_id = self.request.query_params.get('category')
         if category_id is not None:
             qs = qs.filter(category_id=category_id)
@@ -237,6 +317,7 @@ class MySubcategoryViewSet(viewsets.ModelViewSet):
             category=category_obj,
         )
         SubcategoryOwnership.objects.get_or_create(user=self.request.user, subcategory=subcategory_obj)
+        CatalogService().bump_version(self.request.user)
         serializer.instance = subcategory_obj
 
     @transaction.atomic
@@ -244,6 +325,29 @@ class MySubcategoryViewSet(viewsets.ModelViewSet):
         SubcategoryOwnership.objects.filter(user=self.request.user, subcategory=instance).delete()
         if not instance.owners.exists():
             instance.delete()
+        CatalogService().bump_version(self.request.user)
+
+
+class MyCatalogViewSet(viewsets.ViewSet):
+    """Все справочники пользователя одним запросом для форм.
+
+    ETag - версия каталога пользователя: при совпадении If-None-Match
+    ответ 304 отдается без запросов к справочникам.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        service = CatalogService()
+        version = service.get_version(request.user)
+        etag = version_etag('catalog', request.user.pk, version)
+        last_modified = service.versions.modified(request.user.pk)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = set_validators(
+                Response(service.get_tree(request.user, version)),
+                etag, last_modified
+            )
+        return response
 
 
 class MoneyFlowViewSet(viewsets.ModelViewSet):
@@ -251,7 +355,7 @@ class MoneyFlowViewSet(viewsets.ModelViewSet):
     serializer_class = MoneyFlowSerializer
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = MoneyFlowFilter
-    pagination_class = PageNumberPagination
+    pagination_class = MoneyFlowPagination
     permission_classes = [IsAuthenticated]  # Только авторизованные пользователи
     page_size = 10
 
@@ -265,38 +369,201 @@ class MoneyFlowViewSet(viewsets.ModelViewSet):
         if not self.request.user.is_authenticated:
             return MoneyFlow.objects.none()
         
-        # Получаем фильтры из запроса
+        # Получаем фильтры из запроса; фильтры по справочникам
+        # применяет MoneyFlowFilter
         filters_dict = {}
         start_date = self.request.query_params.get('start_date')
         end_date = self.request.query_params.get('end_date')
-        status_name = self.request.query_params.get('status')
-        type_filter = self.request.query_params.get('type')
-        category = self.request.query_params.get('category')
 
         if start_date:
             filters_dict['start_date'] = start_date
         if end_date:
             filters_dict['end_date'] = end_date
-        if status_name:
-            filters_dict['status'] = status_name
-        if type_filter:
-            filters_dict['type'] = type_filter
-        if category:
-            filters_dict['category'] = category
 
         return self.service.get_filtered_money_flows(filters_dict, self.request.user)
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return MoneyFlowListSerializer
+        return super().get_serializer_class()
+
+    def get_validators(self, request):
+        """ETag и Last-Modified по версиям операций и каталога пользователя.
+
+        Версии увеличивает каждая запись операций (через агрегаты) и
+        справочников, поэтому совпавший ETag означает те же данные. Отчеты
+        по умолчанию отсчитывают период от сегодняшнего дня, поэтому в
+        ETag входит дата, а Last-Modified не раньше начала суток.
+        """
+        user_id = request.user.pk
+        counters = (money_flow_versions, CatalogService.versions)
+        today = date.today()
+        etag = version_etag(
+            'money-flows', user_id,
+            *(counter.get(user_id) for counter in counters),
+            today.isoformat(), request_fingerprint(request)
+        )
+        last_modified = max(
+            int(datetime.combine(today, time.min).timestamp()),
+            *(counter.modified(user_id) or 0 for counter in counters)
+        )
+        return etag, last_modified
+
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        """Для списка читаем плоскую проекцию вместо моделей."""
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list':
+            queryset = queryset.values(*MoneyFlowListSerializer.projection)
+        return queryset
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        instance = serializer.save(user=self.request.user)
+        self.service.repository.rollups.add([instance.id])
+        # Справочники в validated_data - заглушки из каталога,
+        # ответ строим по перечитанной со связями записи.
+        serializer.instance = self.service.repository.get_by_id(instance.id)
 
+    @transaction.atomic
     def perform_update(self, serializer):
         if serializer.instance.user != self.request.user:
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied("Вы можете редактировать только свои операции")
-        serializer.save()
+        self.service.repository.rollups.subtract([serializer.instance.id])
+        instance = serializer.save()
+        self.service.repository.rollups.add([instance.id])
+        serializer.instance = self.service.repository.get_by_id(instance.id)
 
+    @transaction.atomic
     def perform_destroy(self, instance):
         if instance.user != self.request.user:
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied("Вы можете удалять только свои операции")
+        self.service.repository.rollups.subtract([instance.id])
         instance.delete()
+
+    @action(
+        detail=False,
+        url_path='import',
+        methods=['post'],
+        parser_classes=[MultiPartParser],
+    )
+    def import_flows(self, request):
+        """Потоковый импорт операций из CSV или NDJSON файла."""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'file': ['Файл не передан']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        file_format = request.data.get('file_format')
+        if not file_format:
+            extension = upload.name.rsplit('.', 1)[-1].lower()
+            file_format = 'ndjson' if extension in ('ndjson', 'jsonl') else extension
+        if file_format not in MoneyFlowImportService.readers:
+            return Response(
+                {'file_format': ['Поддерживаются форматы csv и ndjson']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        report = MoneyFlowImportService().import_file(
+            upload, file_format, request.user
+        )
+        return Response(report, status=status.HTTP_200_OK)
+
+    @action(
+        detail=False,
+        url_path='export',
+        renderer_classes=[CSVRenderer, NDJSONRenderer],
+    )
+    def export(self, request):
+        """Потоковая выгрузка операций в CSV или NDJSON (?format=)."""
+        file_format = request.accepted_renderer.format
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            MoneyFlowExportService().export(queryset, file_format),
+            content_type=MoneyFlowExportService.content_types[file_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="money-flows.{file_format}"'
+        )
+        return response
+
+    @action(detail=False, url_path='statistics')
+    @conditional_get
+    def statistics(self, request):
+        """Статистика операций пользователя за период."""
+        dates = {}
+        for name in ('start_date', 'end_date'):
+            value = request.query_params.get(name)
+            if value:
+                try:
+                    dates[name] = date.fromisoformat(value)
+                except ValueError:
+                    return Response(
+                        {name: ['Дата должна быть в формате ГГГГ-ММ-ДД']},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+        return Response(
+            self.service.get_statistics_report(request.user, **dates)
+        )
+
+    @action(detail=False, url_path='time-series')
+    @conditional_get
+    def time_series(self, request):
+        """Временной ряд операций с шагом день/неделя/месяц."""
+        query = TimeSeriesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(
+            AnalyticsService().get_time_series(
+                request.user, **query.validated_data
+            )
+        )
+
+    @action(detail=False, url_path='monthly-report')
+    @conditional_get
+    def monthly_report(self, request):
+        """Отчет за месяц или несколько месяцев (?start_month=ГГГГ-ММ)."""
+        query = MonthlyReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(
+            AnalyticsService().get_period_report(
+                request.user, **query.validated_data
+            )
+        )
+
+    @action(detail=False, url_path='balance')
+    @conditional_get
+    def balance(self, request):
+        """Дневной нарастающий баланс, страницы по ?limit= дней."""
+        query = BalanceQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        data = query.validated_data
+        paginator = DatePagination()
+        start_date, end_date = paginator.paginate_period(
+            data['start_date'], data['end_date'], request
+        )
+        return paginator.get_paginated_response(
+            AnalyticsService().get_running_balance(
+                request.user, start_date, end_date, data['by_status']
+            )
+        )
+
+    @action(detail=False, url_path='distribution')
+    @conditional_get
+    def distribution(self, request):
+        """Медианы, p90/p99, гистограмма и скользящие средние сумм."""
+        query = DistributionQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(
+            AnalyticsService().get_distribution(
+                request.user, **query.validated_data
+            )
+        )
@@ -0,0 +1,58 @@
+"""Конфигурация gunicorn для ASGI-развертывания.
+
+Uvicorn-воркеры обслуживают backend.asgi: чтения операций и статистики
+выполняются асинхронно (см. api/async_views.py), медленный отчет не
+занимает воркер целиком. Значения переопределяются переменными
+окружения.
+"""
+import multiprocessing
+import os
+import shutil
+import sys
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1
+))
+# Соединений с БД на воркер не больше ASYNC_READ_WORKERS + 1: следите,
+# чтобы workers * (ASYNC_READ_WORKERS + 1) укладывалось в max_connections
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+
+# Метрики Prometheus суммируются по всем воркерам через файлы каталога;
+# переменная должна быть задана до импорта prometheus_client воркером
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus')
+
+
+def shared_cache_configured():
+    """Общий ли кэш у воркеров: LocMem у каждого процесса свой."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    from django.conf import settings
+    backend = settings.CACHES['default']['BACKEND']
+    return not backend.endswith(('.LocMemCache', '.DummyCache'))
+
+
+def on_starting(server):
+    """Проверка общего кэша и очистка метрик прошлого запуска мастера.
+
+    Версии отчетов и каталога, блокировки ReportCache, привязка к
+    основной базе и ETag живут в кэше: с локальным кэшем каждый воркер
+    видел бы свои версии и отдавал устаревшие отчеты.
+    """
+    if server.cfg.workers > 1 and not shared_cache_configured():
+        server.log.error(
+            'Воркеров %s, а общий кэш не настроен: задайте REDIS_URL '
+            'или GUNICORN_WORKERS=1', server.cfg.workers
+        )
+        sys.exit(1)
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -130,6 +130,8 @@ const api = {
   }),
 
   // Reference data - user-specific
+  // Все справочники одним запросом; браузер перепроверяет копию по ETag
+  getCatalog: () => requestWithAuth(`/api/v1/my/catalog/`),
   getStatuses: ({ page } = {}) => {
     const params = new URLSearchParams()
     if (page) params.append('page', page)